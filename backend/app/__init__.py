@@ -5,8 +5,10 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from config import config
+from app.cache import VersionedCache
+from app.database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 
 def create_app(config_name=None):
@@ -16,19 +18,59 @@ def create_app(config_name=None):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    from app.serializers import json_provider_class
+    from app.passwords import PasswordHasher
+    from app.principals import PrincipalCache
+    from app.database import SQLiteProfile, ReplicaRouter
+    from app.instrumentation import RequestInstrumentation
+    from app.profiling import RequestProfiler
+    from app.stats.analytics import analytics_backend
+    from app.stats.history import HistoryCache
+    from app.search import SuggestIndex
+    app.json = json_provider_class(app.config['JSON_PROVIDER'])(app)
+    
+    sqlite_profile = SQLiteProfile.from_config(app.config)
+    sqlite_profile.configure(app.config)
+    
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        sqlite_profile.install(engine)
     jwt.init_app(app)
     CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True, allow_headers=["Content-Type", "Authorization"])
     Migrate(app, db)
+    app.extensions['password_hasher'] = PasswordHasher.from_config(app.config)
+    app.extensions['analytics'] = analytics_backend(app.config['ANALYTICS_BACKEND'])
+    if app.config['INSTRUMENTATION_ENABLED']:
+        app.extensions['instrumentation'] = RequestInstrumentation.from_config(app.config)
+        app.extensions['instrumentation'].init_app(app, engines)
+    if app.config['PROFILER_ENABLED']:
+        app.extensions['profiler'] = RequestProfiler.from_config(app.config)
+        app.extensions['profiler'].init_app(app)
+    app.extensions['catalog_cache'] = VersionedCache(
+        maxsize=app.config['CATALOG_CACHE_SIZE'],
+        ttl=app.config['CATALOG_CACHE_TTL'],
+        prefix='catalog'
+    )
+    app.extensions['exercise_suggest'] = SuggestIndex.from_config(app.config)
+    app.extensions['replica_router'] = ReplicaRouter.from_config(app.config)
+    app.extensions['principal_cache'] = PrincipalCache(
+        maxsize=app.config['PRINCIPAL_CACHE_SIZE'],
+        ttl=app.config['PRINCIPAL_CACHE_TTL']
+    )
+    app.extensions['history_cache'] = HistoryCache.from_config(app.config)
     
     # Register blueprints
     from app.api import api_bp
     from app.auth import auth_bp
     from app.stats import stats_bp
+    from app.jobs import jobs_bp
     
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(stats_bp, url_prefix='/stats')
+    app.register_blueprint(jobs_bp)
     
     return app
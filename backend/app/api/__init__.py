@@ -1,5 +1,7 @@
 from flask import Blueprint
+from app.database import read_from_replica
 
 api_bp = Blueprint('api', __name__)
+read_from_replica(api_bp)
 
-from app.api import workouts, exercises
\ No newline at end of file
+from app.api import workouts, exercises, imports, exports, jobs
\ No newline at end of file
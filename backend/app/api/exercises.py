@@ -1,37 +1,117 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import db
+from app import db, search
 from app.models import Exercise
 from app.api import api_bp
+from app.api.pagination import keyset_paginate, InvalidCursor
+from app.serializers import EXERCISE
+from app.database import use_primary
+
+def _catalog_response(key, build, exists=None):
+    # Serves a catalog read from the versioned cache, answering If-None-Match
+    # with 304 before any database work. Error responses are never cached.
+    # `exists` guards reads of one resource: the tag covers the whole catalog,
+    # so it also matches ids that were never there, which must still 404.
+    cache = current_app.extensions['catalog_cache']
+    version = cache.current_version()
+    etag = cache.etag
+    
+    if request.if_none_match.contains_weak(etag) and (exists is None or exists()):
+        response = current_app.response_class(status=304)
+    else:
+        # A None key builds the body every time without caching it
+        body = cache.get(key) if key is not None else None
+        if body is None:
+            # Built from the primary: a lagging replica would otherwise be
+            # cached under the new version for every user
+            with use_primary():
+                result = build()
+            if isinstance(result, tuple):
+                return result
+            body = current_app.json.dumps(result)
+            if key is not None:
+                cache.set(key, body, version=version)
+        response = current_app.response_class(body, mimetype='application/json')
+    
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True
+    return response
 
 @api_bp.route('/exercises', methods=['GET'])
 @jwt_required()
 def get_exercises():
     page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
     category = request.args.get('category')
+    q = request.args.get('q', '').strip()
+    cursor = request.args.get('cursor')
+    total = request.args.get('total', 'false').lower() == 'true'
     
-    query = Exercise.query
+    return _catalog_response(('list', category, q, page, per_page, cursor, total),
+                             lambda: _list_exercises(page, per_page, category, q, cursor, total))
+
+def _list_exercises(page, per_page, category, q, cursor, total):
+    query = db.session.query(*EXERCISE.columns)
     if category:
-        query = query.filter_by(category=category)
+        query = query.filter(Exercise.category == category)
+    rank = None
+    if q:
+        query, rank = search.apply_search(query, q)
     
-    query = query.order_by(Exercise.name.asc())
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Cursor mode: seek on (name, id), counting only when asked to. Search
+    # results come in name order here; relevance order needs page mode.
+    if cursor is not None:
+        try:
+            exercises, next_cursor = keyset_paginate(query, [Exercise.name, Exercise.id], cursor, per_page)
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        result = {
+            'exercises': EXERCISE.many(exercises),
+            'next_cursor': next_cursor,
+            'per_page': per_page
+        }
+        if total:
+            result['total'] = query.count()
+        return result
     
-    exercises = pagination.items
+    # Best matches first when searching
+    query = query.order_by(*([rank] if rank is not None else []), Exercise.name.asc(), Exercise.id.asc())
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
-    return jsonify({
-        'exercises': [exercise.to_dict() for exercise in exercises],
+    return {
+        'exercises': EXERCISE.many(pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'page': page,
         'per_page': per_page
-    })
+    }
+
+@api_bp.route('/exercises/suggest', methods=['GET'])
+@jwt_required()
+def suggest_exercises():
+    # Autocomplete from the in-memory name trie; no database work once built
+    prefix = request.args.get('prefix', '')
+    suggest = current_app.extensions['exercise_suggest']
+    limit = max(min(request.args.get('limit', 10, type=int), suggest.max_results), 1)
+    
+    catalog = current_app.extensions['catalog_cache']
+    return _catalog_response(None, lambda: [
+        {'id': exercise_id, 'name': name} for exercise_id, name in suggest.trie(catalog).complete(prefix, limit)
+    ])
 
 @api_bp.route('/exercises/<int:id>', methods=['GET'])
 def get_exercise(id):
-    exercise = Exercise.query.get_or_404(id)
-    return jsonify(exercise.to_dict())
+    return _catalog_response(
+        ('exercise', id),
+        lambda: Exercise.query.get_or_404(id).to_dict(),
+        exists=lambda: db.session.query(Exercise.id).filter(Exercise.id == id).first() is not None
+    )
+
+@api_bp.route('/exercises/cache', methods=['GET'])
+@jwt_required()
+def get_exercise_cache_stats():
+    return jsonify(current_app.extensions['catalog_cache'].stats())
 
 @api_bp.route('/exercises', methods=['POST'])
 @jwt_required()
@@ -49,6 +129,7 @@ def create_exercise():
     
     db.session.add(exercise)
     db.session.commit()
+    current_app.extensions['catalog_cache'].bump()
     
     return jsonify(exercise.to_dict()), 201
 
@@ -66,6 +147,7 @@ def update_exercise(id):
         exercise.category = data['category']
     
     db.session.commit()
+    current_app.extensions['catalog_cache'].bump()
     
     return jsonify(exercise.to_dict())
 
@@ -80,5 +162,6 @@ def delete_exercise(id):
     
     db.session.delete(exercise)
     db.session.commit()
+    current_app.extensions['catalog_cache'].bump()
     
     return '', 204
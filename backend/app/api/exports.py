@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+from datetime import datetime
+from flask import request, jsonify, Response, stream_with_context, current_app
+from flask_jwt_extended import jwt_required, current_user
+from sqlalchemy import select
+from app import db
+from app.models import Workout, WorkoutExercise, Exercise
+from app.api import api_bp
+from app.api.imports import HISTORY_FIELDS
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+@api_bp.route('/workouts/export', methods=['GET'])
+@jwt_required()
+def export_workouts():
+    user_id = current_user.id
+    export_format = request.args.get('format', 'ndjson')
+
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    try:
+        since = datetime.strptime(request.args['since'], '%Y-%m-%d').date() if request.args.get('since') else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+
+    records = _iter_history(user_id, since, current_app.config['EXPORT_BATCH_SIZE'])
+    chunks = _csv_chunks(records) if export_format == 'csv' else _ndjson_chunks(records)
+
+    return Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format], headers={
+        'Content-Disposition': f'attachment; filename=workouts.{export_format}'
+    })
+
+def _iter_history(user_id, since, batch_size):
+    # Plain column rows fetched batch_size at a time, so no ORM objects pile up
+    query = select(
+        Workout.date, Workout.name, Workout.duration, Workout.notes,
+        Exercise.name, WorkoutExercise.sets, WorkoutExercise.reps, WorkoutExercise.weight,
+        WorkoutExercise.duration, WorkoutExercise.distance, WorkoutExercise.notes
+    ).outerjoin(
+        WorkoutExercise, WorkoutExercise.workout_id == Workout.id
+    ).outerjoin(
+        Exercise, Exercise.id == WorkoutExercise.exercise_id
+    ).where(
+        Workout.user_id == user_id
+    ).order_by(
+        Workout.date, Workout.id, WorkoutExercise.id
+    ).execution_options(yield_per=batch_size)
+
+    if since:
+        query = query.where(Workout.date >= since)
+
+    result = db.session.execute(query)
+    for partition in result.partitions():
+        yield [dict(zip(HISTORY_FIELDS, row)) for row in partition]
+
+def _ndjson_chunks(batches):
+    for batch in batches:
+        yield ''.join(json.dumps({
+            field: value.isoformat() if field == 'date' else value
+            for field, value in record.items() if value is not None
+        }) + '\n' for record in batch)
+
+def _csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=HISTORY_FIELDS)
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header still goes out for an empty history
+    yield buffer.getvalue()
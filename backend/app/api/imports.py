@@ -0,0 +1,303 @@
+import csv
+import json
+import math
+import os
+import shutil
+import uuid
+from datetime import datetime
+from flask import request, jsonify, current_app
+from flask_jwt_extended import jwt_required, current_user
+from sqlalchemy import insert
+from app import db
+from app.models import Workout, WorkoutExercise, Exercise
+from app.api import api_bp
+from app.api.workouts import MAX_WORKOUT_DURATION, MAX_EXERCISE_VALUES
+from app.stats import rollup
+
+# Each imported record is one flat row with these fields. Consecutive rows with
+# the same date and workout name belong to the same workout; rows without an
+# exercise only create the workout. Exports use the same layout.
+HISTORY_FIELDS = [
+    'date', 'workout', 'duration', 'notes',
+    'exercise', 'sets', 'reps', 'weight', 'exercise_duration', 'distance', 'exercise_notes'
+]
+
+# Only the first errors are reported in full so the report stays bounded
+MAX_REPORTED_ERRORS = 1000
+
+class ImportRowError(ValueError):
+    pass
+
+@api_bp.route('/workouts/import', methods=['POST'])
+@jwt_required()
+def import_workouts():
+    user_id = current_user.id
+    import_format = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+
+    if import_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Format must be one of: csv, ndjson'}), 400
+
+    # Large files can be handed to the background worker instead
+    if request.args.get('async', 'false').lower() == 'true':
+        return _enqueue_import(user_id, import_format)
+
+    records = read_records(request.stream, import_format)
+
+    importer = WorkoutImporter(
+        user_id,
+        batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+        commit_every=current_app.config['IMPORT_COMMIT_EVERY']
+    )
+    report = importer.run(records)
+
+    return jsonify(report)
+
+def _enqueue_import(user_id, import_format):
+    from app.jobs import accepted
+    from app.jobs.queue import enqueue
+
+    # The body is spooled to disk as it arrives and the job deletes it when
+    # done, so the worker has to see the same JOB_SPOOL_DIR (see config.py)
+    spool_dir = current_app.config['JOB_SPOOL_DIR']
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, f'import-{uuid.uuid4().hex}.{import_format}')
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(request.stream, f, 64 * 1024)
+
+    try:
+        job = enqueue('workouts.import', user_id, {'path': path, 'format': import_format})
+    except Exception:
+        os.remove(path)
+        raise
+    db.session.commit()
+
+    return accepted(job)
+
+def read_records(stream, import_format):
+    # (line number, record or None, error or None) for each record in `stream`
+    invalid = []
+    lines = _iter_lines(stream, invalid)
+    return _read_csv(lines, invalid) if import_format == 'csv' else _read_ndjson(lines, invalid)
+
+def _iter_lines(stream, invalid, chunk_size=64 * 1024):
+    # Reads fixed-size chunks so a single huge body is never held in memory.
+    # Lines that aren't valid UTF-8 are decoded with replacement characters,
+    # so CSV parsing stays in step, and their numbers appended to `invalid`.
+    pending = b''
+    number = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        pending += chunk
+        *complete, pending = pending.split(b'\n')
+        for line in complete:
+            number += 1
+            yield _decode(line, number, invalid) + '\n'
+    if pending:
+        yield _decode(pending, number + 1, invalid)
+
+def _decode(line, number, invalid):
+    try:
+        return line.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        invalid.append(number)
+        return line.decode('utf-8-sig', errors='replace')
+
+def _read_ndjson(lines, invalid):
+    for number, line in enumerate(lines, start=1):
+        if invalid and invalid[-1] == number:
+            yield number, None, 'Invalid UTF-8'
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, None, 'Invalid JSON'
+            continue
+        if not isinstance(record, dict):
+            yield number, None, 'Each line must be a JSON object'
+            continue
+        yield number, record, None
+
+def _read_csv(lines, invalid):
+    reader = csv.DictReader(lines)
+    checked = 0
+    try:
+        for record in reader:
+            # A quoted field can span lines; any invalid one spoils the record
+            spans_invalid = False
+            while checked < len(invalid) and invalid[checked] <= reader.line_num:
+                spans_invalid = True
+                checked += 1
+            if spans_invalid:
+                yield reader.line_num, None, 'Invalid UTF-8'
+            else:
+                yield reader.line_num, record, None
+    except csv.Error as e:
+        yield reader.line_num, None, f'Invalid CSV: {e}'
+
+def _number(record, field, cast, maximum):
+    value = record.get(field)
+    if value is None or value == '':
+        return None
+    try:
+        if isinstance(value, bool):
+            raise TypeError(value)
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f"'{field}' must be a number")
+    if not math.isfinite(number):
+        raise ImportRowError(f"'{field}' must be a number")
+    if not 0 <= number <= maximum:
+        raise ImportRowError(f"'{field}' must be between 0 and {maximum}")
+    if cast is int:
+        # Counts aren't rounded: 3.7 reps is an error, not 3
+        if not number.is_integer():
+            raise ImportRowError(f"'{field}' must be a whole number")
+        return int(value) if isinstance(value, int) else int(number)
+    return number
+
+def _text(record, field):
+    value = record.get(field)
+    if value is None or value == '':
+        return None
+    return str(value)
+
+class WorkoutImporter:
+    def __init__(self, user_id, batch_size=1000, commit_every=10):
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.commit_every = commit_every
+        self.exercise_ids = None
+        self.workouts = []
+        self.rows = 0
+        self.batches = 0
+        self.report = {
+            'lines': 0,
+            'workouts_created': 0,
+            'exercises_created': 0,
+            'error_count': 0,
+            'errors': []
+        }
+
+    def run(self, records):
+        try:
+            self._import(records)
+        except Exception:
+            # Batches committed before the failure stay, so the totals and the
+            # version that validates cached reads must still include them
+            db.session.rollback()
+            rollup.rebuild(self.user_id)
+            db.session.commit()
+            raise
+
+        # Totals are recomputed once rather than per imported row
+        rollup.rebuild(self.user_id)
+        db.session.commit()
+
+        return self.report
+
+    def _import(self, records):
+        current_key = None
+        for number, record, error in records:
+            self.report['lines'] += 1
+            if error is None:
+                try:
+                    key, workout, exercise = self._parse(record)
+                except ImportRowError as e:
+                    error = str(e)
+
+            if error is not None:
+                self._error(number, error)
+                continue
+
+            if key != current_key:
+                if self.rows >= self.batch_size:
+                    self._flush()
+                self.workouts.append((workout, []))
+                self.rows += 1
+                current_key = key
+            if exercise is not None:
+                self.workouts[-1][1].append(exercise)
+                self.rows += 1
+
+        self._flush()
+
+    def _parse(self, record):
+        name = _text(record, 'workout')
+        if not name:
+            raise ImportRowError("'workout' is required")
+        try:
+            date = datetime.strptime(_text(record, 'date') or '', '%Y-%m-%d').date()
+        except ValueError:
+            raise ImportRowError("'date' must be in YYYY-MM-DD format")
+
+        workout = {
+            'user_id': self.user_id,
+            'name': name,
+            'date': date,
+            'duration': _number(record, 'duration', int, MAX_WORKOUT_DURATION),
+            'notes': _text(record, 'notes')
+        }
+
+        exercise = None
+        exercise_name = _text(record, 'exercise')
+        if exercise_name:
+            exercise = {
+                'exercise_id': self._resolve_exercise(exercise_name),
+                'sets': _number(record, 'sets', int, MAX_EXERCISE_VALUES['sets']),
+                'reps': _number(record, 'reps', int, MAX_EXERCISE_VALUES['reps']),
+                'weight': _number(record, 'weight', float, MAX_EXERCISE_VALUES['weight']),
+                'duration': _number(record, 'exercise_duration', int, MAX_EXERCISE_VALUES['duration']),
+                'distance': _number(record, 'distance', float, MAX_EXERCISE_VALUES['distance']),
+                'notes': _text(record, 'exercise_notes')
+            }
+
+        return (date, name), workout, exercise
+
+    def _resolve_exercise(self, name):
+        # The catalog is read once per import and matched case-insensitively
+        if self.exercise_ids is None:
+            self.exercise_ids = {}
+            for id, exercise_name in db.session.query(Exercise.id, Exercise.name):
+                key = exercise_name.strip().lower()
+                self.exercise_ids[key] = min(id, self.exercise_ids.get(key, id))
+
+        exercise_id = self.exercise_ids.get(name.strip().lower())
+        if exercise_id is None:
+            raise ImportRowError(f"Unknown exercise '{name}'")
+        return exercise_id
+
+    def _flush(self):
+        if not self.workouts:
+            return
+
+        # executemany inserts; workout ids come back in parameter order
+        workout_ids = db.session.scalars(
+            insert(Workout).returning(Workout.id, sort_by_parameter_order=True),
+            [workout for workout, _ in self.workouts]
+        ).all()
+
+        exercise_rows = [
+            dict(exercise, workout_id=workout_id)
+            for workout_id, (_, exercises) in zip(workout_ids, self.workouts)
+            for exercise in exercises
+        ]
+        if exercise_rows:
+            db.session.execute(insert(WorkoutExercise), exercise_rows)
+
+        self.report['workouts_created'] += len(workout_ids)
+        self.report['exercises_created'] += len(exercise_rows)
+        self.workouts = []
+        self.rows = 0
+
+        self.batches += 1
+        if self.batches % self.commit_every == 0:
+            db.session.commit()
+
+    def _error(self, line, message):
+        self.report['error_count'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'line': line, 'error': message})
@@ -0,0 +1,14 @@
+from flask import jsonify
+from flask_jwt_extended import jwt_required, current_user
+from app.models import Job
+from app.api import api_bp
+from app.database import use_primary
+
+@api_bp.route('/jobs/<int:id>', methods=['GET'])
+@jwt_required()
+def get_job(id):
+    # Status is polled while a worker updates it, so a lagging replica won't do
+    with use_primary():
+        job = Job.query.filter_by(id=id, user_id=current_user.id).first_or_404()
+    
+    return jsonify(job.to_dict())
@@ -0,0 +1,69 @@
+import base64
+import json
+from datetime import date
+from sqlalchemy import and_, or_, false
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, date) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(token, columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        raise InvalidCursor(token)
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor(token)
+
+    try:
+        return [
+            None if value is None and column.expression.nullable else
+            date.fromisoformat(value) if column.type.python_type is date else column.type.python_type(value)
+            for column, value in zip(columns, values)
+        ]
+    except (TypeError, ValueError):
+        raise InvalidCursor(token)
+
+def _past(column, value, descending):
+    # Rows strictly after `value` in the column's order, where NULLs sort
+    # before every value as SQLite sorts them: first ascending, last descending
+    if value is None:
+        return false() if descending else column.isnot(None)
+    past = column < value if descending else column > value
+    if descending and column.expression.nullable:
+        past = or_(past, column.is_(None))
+    return past
+
+def _order(column, descending):
+    order = column.desc() if descending else column.asc()
+    if column.expression.nullable:
+        order = order.nulls_last() if descending else order.nulls_first()
+    return order
+
+def keyset_paginate(query, columns, cursor, per_page, descending=False):
+    # Seeks past the cursor position instead of scanning an OFFSET. `columns`
+    # must end with a unique column so that every row has a distinct position.
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        condition = None
+        for column, value in reversed(list(zip(columns, values))):
+            past = _past(column, value, descending)
+            if condition is not None:
+                past = or_(past, and_(column.is_(None) if value is None else column == value, condition))
+            condition = past
+        query = query.filter(condition)
+
+    query = query.order_by(*[_order(column, descending) for column in columns])
+
+    # One extra row tells us whether there is a next page without a COUNT
+    items = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in columns])
+
+    return items, next_cursor
@@ -1,153 +1,411 @@
+import math
 from flask import request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, current_user
 from datetime import datetime
+from sqlalchemy import insert
 from app import db
 from app.models import Workout, WorkoutExercise, Exercise
 from app.api import api_bp
+from app.api.pagination import keyset_paginate, InvalidCursor
+from app.stats import rollup, records, history
+from app.conditional import conditional
+from app.serializers import WORKOUT, WORKOUT_EXERCISE
+
+def _serialize_workouts(rows, include_exercises=False):
+    workouts = WORKOUT.many(rows)
+    if include_exercises:
+        exercises = _exercises_by_workout([workout['id'] for workout in workouts])
+        for workout in workouts:
+            workout['exercises'] = exercises.get(workout['id'], [])
+    return workouts
+
+def _exercises_by_workout(workout_ids):
+    # Every listed workout's exercise rows and catalog entries in one query
+    grouped = {}
+    if not workout_ids:
+        return grouped
+    
+    rows = db.session.query(*WORKOUT_EXERCISE.columns).outerjoin(
+        Exercise, Exercise.id == WorkoutExercise.exercise_id
+    ).filter(
+        WorkoutExercise.workout_id.in_(workout_ids)
+    ).order_by(WorkoutExercise.id)
+    
+    for exercise in WORKOUT_EXERCISE.many(rows):
+        grouped.setdefault(exercise['workout_id'], []).append(exercise)
+    return grouped
 
 @api_bp.route('/workouts', methods=['GET'])
 @jwt_required()
+@conditional()
 def get_workouts():
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     page = request.args.get('page', 1, type=int)
-    per_page = min(request.args.get('per_page', 10, type=int), 100)
+    per_page = max(1, min(request.args.get('per_page', 10, type=int), 100))
+    include_exercises = 'exercises' in request.args.get('include', '').split(',')
     
-    query = Workout.query.filter_by(user_id=user_id).order_by(Workout.date.desc())
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        filters = _workout_filters(request.args)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
     
-    workouts = pagination.items
+    query = db.session.query(*WORKOUT.columns).filter(Workout.user_id == user_id, *filters)
+    
+    # Cursor mode: seek on (date, id), counting only when asked to
+    if 'cursor' in request.args:
+        try:
+            rows, next_cursor = keyset_paginate(query, [Workout.date, Workout.id], request.args['cursor'], per_page, descending=True)
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        result = {
+            'workouts': _serialize_workouts(rows, include_exercises),
+            'next_cursor': next_cursor,
+            'per_page': per_page
+        }
+        if request.args.get('total', 'false').lower() == 'true':
+            result['total'] = query.count()
+        return jsonify(result)
+    
+    query = query.order_by(Workout.date.desc())
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'workouts': [workout.to_dict() for workout in workouts],
+        'workouts': _serialize_workouts(pagination.items, include_exercises),
         'total': pagination.total,
         'pages': pagination.pages,
         'page': page,
         'per_page': per_page
     })
 
+def _workout_filters(args):
+    # Optional search filters for the workout list, all ANDed together. Each
+    # one narrows a scan of the user's (user_id, date) index range, and the
+    # exercise filter is a semi-join probing (workout_id, exercise_id).
+    filters = []
+    try:
+        start = datetime.strptime(args['from'], '%Y-%m-%d').date() if args.get('from') else None
+        end = datetime.strptime(args['to'], '%Y-%m-%d').date() if args.get('to') else None
+    except ValueError:
+        raise ValueError("'from' and 'to' must be in YYYY-MM-DD format")
+    if start and end and start > end:
+        raise ValueError("'from' must not be after 'to'")
+    if start:
+        filters.append(Workout.date >= start)
+    if end:
+        filters.append(Workout.date <= end)
+    
+    if args.get('name'):
+        # Case-insensitive substring; LIKE wildcards in the input match literally
+        name = args['name'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        filters.append(Workout.name.ilike(f'%{name}%', escape='\\'))
+    
+    for exercise_id in args.getlist('exercise_id'):
+        if not exercise_id.isdigit():
+            raise ValueError("'exercise_id' must be an integer")
+        filters.append(db.session.query(WorkoutExercise.id).filter(
+            WorkoutExercise.workout_id == Workout.id,
+            WorkoutExercise.exercise_id == int(exercise_id)
+        ).exists())
+    
+    bounds = {}
+    for key in ('min_duration', 'max_duration'):
+        if args.get(key):
+            if not args[key].isdigit():
+                raise ValueError(f"'{key}' must be a whole number of minutes")
+            bounds[key] = int(args[key])
+    if 'min_duration' in bounds:
+        filters.append(Workout.duration >= bounds['min_duration'])
+    if 'max_duration' in bounds:
+        filters.append(Workout.duration <= bounds['max_duration'])
+    
+    return filters
+
+# Largest accepted value of each number, so stored values and the totals built
+# from them stay well inside what SQLite and the stats code can hold. Negative
+# values are rejected too.
+MAX_WORKOUT_DURATION = 100000  # minutes
+MAX_EXERCISE_VALUES = {'sets': 1000, 'reps': 10000, 'weight': 10000, 'duration': 1000000, 'distance': 100000}
+
+def _number(data, field, cast, maximum):
+    # JSON numbers, or the numeric strings the web form's text fields send;
+    # missing and empty values are None. Raises ValueError for anything else.
+    value = data.get(field)
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"'{field}' must be a number")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{field}' must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"'{field}' must be a number")
+    if not 0 <= number <= maximum:
+        raise ValueError(f"'{field}' must be between 0 and {maximum}")
+    if cast is int:
+        if not number.is_integer():
+            raise ValueError(f"'{field}' must be a whole number")
+        return int(value) if isinstance(value, int) else int(number)
+    return number
+
+# Fields a workout exercise row can set, shared by add and update operations,
+# with the type numeric ones are coerced to
+WORKOUT_EXERCISE_FIELDS = {'sets': int, 'reps': int, 'weight': float, 'duration': int, 'distance': float, 'notes': None}
+
+def _exercise_values(data):
+    # The row fields present in `data`, numbers coerced before they reach the
+    # personal record hooks. Raises ValueError for non-numeric or out-of-range values.
+    return {
+        field: data[field] if cast is None else _number(data, field, cast, MAX_EXERCISE_VALUES[field])
+        for field, cast in WORKOUT_EXERCISE_FIELDS.items() if field in data
+    }
+
 @api_bp.route('/workouts/<int:id>', methods=['GET'])
 @jwt_required()
+@conditional()
 def get_workout(id):
-    user_id = get_jwt_identity()
-    workout = Workout.query.filter_by(id=id, user_id=user_id).first_or_404()
+    user_id = current_user.id
+    row = db.session.query(*WORKOUT.columns).filter(Workout.id == id, Workout.user_id == user_id).first_or_404()
     
-    return jsonify(workout.to_dict(include_exercises=True))
+    return jsonify(_serialize_workouts([row], include_exercises=True)[0])
 
 @api_bp.route('/workouts', methods=['POST'])
 @jwt_required()
 def create_workout():
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     data = request.get_json() or {}
     
     if 'name' not in data:
         return jsonify({'error': 'Name is required'}), 400
+    try:
+        duration = _number(data, 'duration', int, MAX_WORKOUT_DURATION)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
     
     workout = Workout(
         user_id=user_id,
         name=data['name'],
         date=datetime.strptime(data.get('date', datetime.utcnow().strftime('%Y-%m-%d')), '%Y-%m-%d').date(),
-        duration=data.get('duration'),
+        duration=duration,
         notes=data.get('notes')
     )
     
     db.session.add(workout)
+    db.session.flush()
+    rollup.workout_added(workout)
     db.session.commit()
+    history.invalidate(user_id)
     
     return jsonify(workout.to_dict()), 201
 
 @api_bp.route('/workouts/<int:id>', methods=['PUT'])
 @jwt_required()
 def update_workout(id):
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     workout = Workout.query.filter_by(id=id, user_id=user_id).first_or_404()
     data = request.get_json() or {}
+    old_date, old_duration = workout.date, workout.duration
+    try:
+        duration = _number(data, 'duration', int, MAX_WORKOUT_DURATION)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
     
     if 'name' in data:
         workout.name = data['name']
     if 'date' in data:
         workout.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
     if 'duration' in data:
-        workout.duration = data['duration']
+        workout.duration = duration
     if 'notes' in data:
         workout.notes = data['notes']
     
+    db.session.flush()
+    rollup.workout_updated(workout, old_date, old_duration)
     db.session.commit()
+    history.invalidate(user_id)
     
     return jsonify(workout.to_dict())
 
 @api_bp.route('/workouts/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_workout(id):
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     workout = Workout.query.filter_by(id=id, user_id=user_id).first_or_404()
+    exercise_ids = [workout_exercise.exercise_id for workout_exercise in workout.exercises]
+    removed = [records.entry_of(workout_exercise) for workout_exercise in workout.exercises]
     
     db.session.delete(workout)
+    db.session.flush()
+    rollup.workout_deleted(user_id, workout.date, workout.duration, exercise_ids)
+    records.changed(user_id, removed=removed)
     db.session.commit()
+    history.invalidate(user_id)
     
     return '', 204
 
 @api_bp.route('/workouts/<int:workout_id>/exercises', methods=['POST'])
 @jwt_required()
 def add_exercise_to_workout(workout_id):
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     workout = Workout.query.filter_by(id=workout_id, user_id=user_id).first_or_404()
     data = request.get_json() or {}
     
     if 'exercise_id' not in data:
         return jsonify({'error': 'Exercise ID is required'}), 400
     
+    try:
+        values = _exercise_values(data)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    
     exercise = Exercise.query.get_or_404(data['exercise_id'])
     
     workout_exercise = WorkoutExercise(
         workout_id=workout.id,
         exercise_id=exercise.id,
-        sets=data.get('sets'),
-        reps=data.get('reps'),
-        weight=data.get('weight'),
-        duration=data.get('duration'),
-        distance=data.get('distance'),
-        notes=data.get('notes')
+        sets=values.get('sets'),
+        reps=values.get('reps'),
+        weight=values.get('weight'),
+        duration=values.get('duration'),
+        distance=values.get('distance'),
+        notes=values.get('notes')
     )
     
     db.session.add(workout_exercise)
+    db.session.flush()
+    rollup.exercise_added(user_id, exercise.id)
+    records.changed(user_id, added=[records.entry_of(workout_exercise)])
     db.session.commit()
+    history.invalidate(user_id)
     
     return jsonify(workout_exercise.to_dict()), 201
 
 @api_bp.route('/workouts/<int:workout_id>/exercises/<int:exercise_id>', methods=['PUT'])
 @jwt_required()
 def update_workout_exercise(workout_id, exercise_id):
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     workout = Workout.query.filter_by(id=workout_id, user_id=user_id).first_or_404()
     workout_exercise = WorkoutExercise.query.filter_by(workout_id=workout_id, id=exercise_id).first_or_404()
     
     data = request.get_json() or {}
+    try:
+        values = _exercise_values(data)
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+    old = records.entry_of(workout_exercise)
     
-    if 'sets' in data:
-        workout_exercise.sets = data['sets']
-    if 'reps' in data:
-        workout_exercise.reps = data['reps']
-    if 'weight' in data:
-        workout_exercise.weight = data['weight']
-    if 'duration' in data:
-        workout_exercise.duration = data['duration']
-    if 'distance' in data:
-        workout_exercise.distance = data['distance']
-    if 'notes' in data:
-        workout_exercise.notes = data['notes']
+    for field, value in values.items():
+        setattr(workout_exercise, field, value)
     
+    db.session.flush()
+    rollup.exercise_updated(user_id)
+    new = records.entry_of(workout_exercise)
+    if new != old:
+        records.changed(user_id, added=[new], removed=[old])
     db.session.commit()
+    history.invalidate(user_id)
     
     return jsonify(workout_exercise.to_dict())
 
 @api_bp.route('/workouts/<int:workout_id>/exercises/<int:exercise_id>', methods=['DELETE'])
 @jwt_required()
 def remove_exercise_from_workout(workout_id, exercise_id):
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     workout = Workout.query.filter_by(id=workout_id, user_id=user_id).first_or_404()
     workout_exercise = WorkoutExercise.query.filter_by(workout_id=workout_id, id=exercise_id).first_or_404()
     
     db.session.delete(workout_exercise)
+    db.session.flush()
+    rollup.exercise_removed(user_id, workout_exercise.exercise_id)
+    records.changed(user_id, removed=[records.entry_of(workout_exercise)])
     db.session.commit()
+    history.invalidate(user_id)
     
     return '', 204
+
+MAX_BATCH_OPERATIONS = 500
+
+def _is_id(value):
+    # JSON true/false arrive as bools, which are ints to isinstance
+    return isinstance(value, int) and not isinstance(value, bool)
+
+@api_bp.route('/workouts/<int:workout_id>/exercises', methods=['PATCH'])
+@jwt_required()
+def batch_update_workout_exercises(workout_id):
+    # Applies [{"op": "add" | "update" | "delete", ...}] in one transaction:
+    # one ownership check, one IN query per kind of id, one flush
+    user_id = current_user.id
+    workout = Workout.query.filter_by(id=workout_id, user_id=user_id).first_or_404()
+    operations = request.get_json(silent=True)
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'Body must be a non-empty array of operations'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per request'}), 400
+    
+    exercise_ids, row_ids, values = set(), set(), []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in ('add', 'update', 'delete'):
+            return jsonify({'error': "Each operation needs an 'op' of add, update or delete", 'index': index}), 400
+        try:
+            values.append(_exercise_values(operation))
+        except ValueError as error:
+            return jsonify({'error': str(error), 'index': index}), 400
+        if operation['op'] == 'add':
+            if not _is_id(operation.get('exercise_id')):
+                return jsonify({'error': 'Exercise ID is required', 'index': index}), 400
+            exercise_ids.add(operation['exercise_id'])
+        else:
+            if not _is_id(operation.get('id')):
+                return jsonify({'error': 'Workout exercise ID is required', 'index': index}), 400
+            if operation['id'] in row_ids:
+                return jsonify({'error': 'Each workout exercise can only be changed once per request', 'index': index}), 400
+            row_ids.add(operation['id'])
+    
+    known_exercises = {id for (id,) in db.session.query(Exercise.id).filter(Exercise.id.in_(exercise_ids))} if exercise_ids else set()
+    if exercise_ids - known_exercises:
+        return jsonify({'error': 'Unknown exercise IDs', 'ids': sorted(exercise_ids - known_exercises)}), 400
+    
+    rows = {row.id: row for row in WorkoutExercise.query.filter(
+        WorkoutExercise.workout_id == workout.id,
+        WorkoutExercise.id.in_(row_ids)
+    )} if row_ids else {}
+    if row_ids - rows.keys():
+        return jsonify({'error': 'Workout exercise IDs not in this workout', 'ids': sorted(row_ids - rows.keys())}), 400
+    
+    deltas, added = {}, []
+    record_changes = {'added': [], 'removed': []}
+    for operation, fields in zip(operations, values):
+        if operation['op'] == 'add':
+            fields = {field: fields.get(field) for field in WORKOUT_EXERCISE_FIELDS}
+            added.append(dict(fields, workout_id=workout.id, exercise_id=operation['exercise_id']))
+            deltas[operation['exercise_id']] = deltas.get(operation['exercise_id'], 0) + 1
+            record_changes['added'].append(records.entry(
+                operation['exercise_id'], fields['weight'], fields['reps'], fields['distance'], fields['duration']
+            ))
+        elif operation['op'] == 'update':
+            row = rows[operation['id']]
+            old = records.entry_of(row)
+            for field, value in fields.items():
+                setattr(row, field, value)
+            if records.entry_of(row) != old:
+                record_changes['removed'].append(old)
+                record_changes['added'].append(records.entry_of(row))
+        else:
+            row = rows[operation['id']]
+            db.session.delete(row)
+            deltas[row.exercise_id] = deltas.get(row.exercise_id, 0) - 1
+            record_changes['removed'].append(records.entry_of(row))
+    
+    # New rows go in as one executemany; their ids come back with the workout
+    if added:
+        db.session.execute(insert(WorkoutExercise), added)
+    db.session.flush()
+    rollup.exercises_changed(user_id, deltas)
+    records.changed(user_id, **record_changes)
+    db.session.commit()
+    history.invalidate(user_id)
+    
+    row = db.session.query(*WORKOUT.columns).filter(Workout.id == workout_id).one()
+    return jsonify(_serialize_workouts([row], include_exercises=True)[0])
@@ -1,8 +1,10 @@
-from flask import request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask import request, jsonify, current_app
+from flask_jwt_extended import create_access_token, jwt_required, current_user
 from app import db
 from app.models import User
 from app.auth import auth_bp
+from app.passwords import HashingBusy
+from app.principals import principal_cache
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
@@ -28,8 +30,9 @@ def register():
     db.session.add(user)
     db.session.commit()
     
-    # Create access token
+    # Create access token; the principal is cached for the requests that follow
     access_token = create_access_token(identity=user.id)
+    principal_cache().remember(user)
     
     return jsonify({
         'message': 'User registered successfully',
@@ -50,8 +53,14 @@ def login():
     if not user or not user.check_password(data['password']):
         return jsonify({'error': 'Invalid username or password'}), 401
     
-    # Create access token
+    # Upgrade hashes made with an older algorithm or cost
+    if user.password_needs_rehash():
+        user.set_password(data['password'])
+        db.session.commit()
+    
+    # Create access token; the principal is cached for the requests that follow
     access_token = create_access_token(identity=user.id)
+    principal_cache().remember(user)
     
     return jsonify({
         'message': 'Login successful',
@@ -62,16 +71,12 @@ def login():
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
-    user_id = get_jwt_identity()
-    user = User.query.get_or_404(user_id)
-    
-    return jsonify(user.to_dict())
+    return jsonify(current_user.to_dict())
 
 @auth_bp.route('/profile', methods=['PUT'])
 @jwt_required()
 def update_profile():
-    user_id = get_jwt_identity()
-    user = User.query.get_or_404(user_id)
+    user = User.query.get_or_404(current_user.id)
     data = request.get_json() or {}
     
     # Update username if provided and not taken
@@ -90,9 +95,24 @@ def update_profile():
     if 'password' in data:
         user.set_password(data['password'])
     
+    # Committing drops the cached principal, so the next request reloads it
     db.session.commit()
     
     return jsonify({
         'message': 'Profile updated successfully',
         'user': user.to_dict()
     })
+
+@auth_bp.route('/hashing', methods=['GET'])
+@jwt_required()
+def get_hashing_stats():
+    return jsonify(current_app.extensions['password_hasher'].executor.stats())
+
+@auth_bp.route('/principals', methods=['GET'])
+@jwt_required()
+def get_principal_cache_stats():
+    return jsonify(principal_cache().stats())
+
+@auth_bp.errorhandler(HashingBusy)
+def hashing_busy(error):
+    return jsonify({'error': 'Server is busy, please try again shortly'}), 503, {'Retry-After': '1'}
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """Bounded least-recently-used map with hit/miss counters."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+class TTLCache(LRUCache):
+    """LRU cache whose entries also expire `ttl` seconds after being set."""
+
+    def __init__(self, maxsize=256, ttl=60):
+        super().__init__(maxsize)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def _store(self, key, value):
+        super()._store(key, (time.monotonic() + self.ttl, value))
+
+    def pop(self, key, default=None):
+        entry = super().pop(key)
+        return default if entry is None else entry[1]
+
+    def stats(self):
+        stats = super().stats()
+        stats['ttl'] = self.ttl
+        return stats
+
+class VersionedCache(LRUCache):
+    """LRU cache whose entries are all dropped when the version is bumped.
+
+    The version is process-local, so it also rolls over every `ttl` seconds to
+    bound how stale another worker's copy can get. ETags include a per-process
+    token so two workers never hand out the same tag for different data.
+    """
+
+    def __init__(self, maxsize=256, ttl=300, prefix='v'):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.version = 0
+        self._token = f'{os.getpid():x}{int(time.time() * 1000):x}'
+        self._version_started = time.monotonic()
+
+    def set(self, key, value, version=None):
+        # Skips the store if the data was built under a version since bumped
+        with self._lock:
+            if version is None or version == self.version:
+                self._store(key, value)
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._version_started = time.monotonic()
+            self._data.clear()
+
+    def current_version(self):
+        if self.ttl and time.monotonic() - self._version_started > self.ttl:
+            self.bump()
+        return self.version
+
+    @property
+    def etag(self):
+        return f'{self.prefix}-{self._token}-{self.current_version()}'
+
+    def stats(self):
+        stats = super().stats()
+        stats['version'] = self.version
+        return stats
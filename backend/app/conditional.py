@@ -0,0 +1,72 @@
+import hashlib
+from datetime import datetime, time, timezone
+from functools import wraps
+from flask import g, request, current_app, make_response
+from flask_jwt_extended import current_user
+from sqlalchemy import func, select
+from app import db
+from app.models import Exercise, UserStats
+
+def user_scope_validator(daily=False):
+    # (etag, last_modified) for everything the current user can read, from one
+    # query. Responses that mention exercise names also depend on the catalog,
+    # stamped by its latest updated_at (exercises still in use can't be
+    # deleted), and `daily` responses on the current date. It all comes from
+    # the database, so every worker process hands out the same validators.
+    user_id = current_user.id
+    version, updated_at, catalog_modified = db.session.query(
+        select(UserStats.version).where(UserStats.user_id == user_id).scalar_subquery(),
+        select(UserStats.updated_at).where(UserStats.user_id == user_id).scalar_subquery(),
+        select(func.max(Exercise.updated_at)).scalar_subquery()
+    ).one()
+    g.stats_versions = {user_id: version}  # saves app/stats/history.py a query
+
+    # A user without a rollup row hasn't written anything since rollups were
+    # added, and their first write creates it, so the missing version is still
+    # a valid tag. There is no modification time to go on, though.
+    parts = [user_id, version, catalog_modified]
+    last_modified = None
+    if version is not None:
+        last_modified = max(updated_at, catalog_modified or updated_at)
+    if daily:
+        today = datetime.utcnow().date()
+        parts.append(today.isoformat())
+        if last_modified is not None:
+            last_modified = max(last_modified, datetime.combine(today, time()))
+
+    etag = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return etag, last_modified and last_modified.replace(tzinfo=timezone.utc)
+
+def conditional(daily=False):
+    """Answers GET requests with 304 when the client's copy is still current.
+
+    The validator runs before the view, so an unchanged resource costs one
+    cheap query instead of the full handler. Must be applied inside
+    @jwt_required().
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = user_scope_validator(daily=daily)
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            elif request.if_modified_since and last_modified is not None:
+                not_modified = last_modified.replace(microsecond=0) <= request.if_modified_since
+            else:
+                not_modified = False
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
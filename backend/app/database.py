@@ -0,0 +1,142 @@
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+from app.cache import TTLCache
+
+# Named SQLite tunings, picked with SQLITE_PROFILE. Pragmas run on every new
+# connection; engine options are merged under SQLALCHEMY_ENGINE_OPTIONS.
+SQLITE_PROFILES = {
+    'default': {
+        'pragmas': {},
+        'engine_options': {}
+    },
+    'production': {
+        # WAL lets readers carry on while one writer commits, and NORMAL
+        # sync is durable against crashes of the app, which is all WAL needs
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,  # in milliseconds
+            'cache_size': -16000,  # negative means KiB, so 16 MiB per connection
+            'mmap_size': 128 * 1024 * 1024,
+            'temp_store': 'MEMORY'
+        },
+        # Connections stay open between requests so the pragmas and page
+        # cache are paid for once per connection, not per request
+        'engine_options': {
+            'pool_size': 5,
+            'max_overflow': 5,
+            'pool_timeout': 10
+        }
+    }
+}
+
+class SQLiteProfile:
+    def __init__(self, name='default'):
+        if name not in SQLITE_PROFILES:
+            raise ValueError(f"Unknown SQLITE_PROFILE '{name}', expected one of: {', '.join(SQLITE_PROFILES)}")
+        self.name = name
+        self.pragmas = SQLITE_PROFILES[name]['pragmas']
+        self.engine_options = SQLITE_PROFILES[name]['engine_options']
+
+    @classmethod
+    def from_config(cls, config):
+        # Other databases get their driver's defaults
+        if not config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite:'):
+            return cls('default')
+        return cls(config.get('SQLITE_PROFILE', 'default'))
+
+    def configure(self, config):
+        # Options set explicitly in the config win over the profile's
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(self.engine_options, **config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+
+    def install(self, engine):
+        # Called for every engine, replica binds included; only SQLite ones
+        # take the pragmas
+        if not self.pragmas or engine.dialect.name != 'sqlite':
+            return
+
+        @event.listens_for(engine, 'connect')
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in self.pragmas.items():
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+            cursor.close()
+
+class RoutingSession(Session):
+    """Sends plain SELECTs to the 'replica' bind while serving read-only routes.
+
+    Blueprints opt in with `read_from_replica`. Everything else stays on the
+    primary: writes, reads made during or after a flush in this session, reads
+    inside `use_primary()`, and reads by a user who committed a write within
+    the last REPLICA_STICKY_SECONDS, so they always see their own changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        if not isinstance(clause, Select) or self._flushing or self.info.get('wrote'):
+            return False
+        if not has_request_context() or not g.get('read_replica'):
+            return False
+        router = current_app.extensions.get('replica_router')
+        return router is not None and not router.is_sticky(_request_user_id())
+
+class ReplicaRouter:
+    def __init__(self, sticky_seconds=5, maxsize=4096):
+        self.recent_writers = TTLCache(maxsize, sticky_seconds)
+
+    @classmethod
+    def from_config(cls, config):
+        # Routing is off unless a 'replica' bind is configured
+        if 'replica' not in config.get('SQLALCHEMY_BINDS', {}):
+            return None
+        return cls(config['REPLICA_STICKY_SECONDS'])
+
+    def wrote(self, user_id):
+        self.recent_writers.set(user_id, True)
+
+    def is_sticky(self, user_id):
+        return user_id is not None and self.recent_writers.get(user_id) is not None
+
+def read_from_replica(blueprint):
+    @blueprint.before_request
+    def route_reads():
+        g.read_replica = request.method in ('GET', 'HEAD')
+
+@contextmanager
+def use_primary():
+    previous = g.get('read_replica')
+    g.read_replica = False
+    try:
+        yield
+    finally:
+        g.read_replica = previous
+
+def _request_user_id():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:  # no token was verified for this request
+        return None
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_writer(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        router = current_app.extensions.get('replica_router')
+        user_id = _request_user_id()
+        if router is not None and user_id is not None:
+            router.wrote(user_id)
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_writes(session):
+    session.info.pop('wrote', None)
@@ -0,0 +1,135 @@
+import hmac
+import threading
+import time
+from flask import current_app, g, request, has_request_context
+from sqlalchemy import event
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # in seconds
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class Histogram:
+    """Cumulative Prometheus-style histogram, one series per label set."""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{label_text}}} {series["sum"]:.6g}')
+                lines.append(f'{self.name}_count{{{label_text}}} {series["count"]}')
+        return lines
+
+class RequestInstrumentation:
+    """Counts and times SQL statements per request.
+
+    Each response gets a Server-Timing header, requests over the query or
+    duration budget are logged as warnings, and per-endpoint histograms are
+    served at /metrics in Prometheus text format. Metrics are per process.
+    Without METRICS_TOKEN, /metrics is open to anyone who can reach the app
+    and must not be exposed publicly.
+    Statements run while a streamed body is sent (exports) come after the
+    response is finished here, so they are not included.
+    """
+
+    def __init__(self, query_budget=20, duration_budget_ms=500, metrics_token=None):
+        self.query_budget = query_budget
+        self.duration_budget_ms = duration_budget_ms
+        self.metrics_token = metrics_token
+        self.duration = Histogram('http_request_duration_seconds', 'Time spent serving the request.', DURATION_BUCKETS)
+        self.db_duration = Histogram('http_request_db_seconds', 'Time spent executing SQL for the request.', DURATION_BUCKETS)
+        self.queries = Histogram('http_request_queries', 'SQL statements executed for the request.', QUERY_BUCKETS)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['SQL_QUERY_BUDGET'], config['REQUEST_DURATION_BUDGET_MS'], config['METRICS_TOKEN'])
+
+    def init_app(self, app, engines):
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._instrumentation_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'sql_count' in g:
+            g.sql_count += 1
+            g.sql_time += time.perf_counter() - context._instrumentation_started
+
+    def _start_request(self):
+        g.request_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_time = 0.0
+
+    def _finish_request(self, response):
+        if 'request_started' not in g:  # a before_request handler ended the request first
+            return response
+
+        total = self._record()
+        response.headers['Server-Timing'] = (
+            f'db;dur={g.sql_time * 1000:.2f};desc="{g.sql_count} queries", '
+            f'app;dur={(total - g.sql_time) * 1000:.2f}, total;dur={total * 1000:.2f}'
+        )
+        return response
+
+    def _teardown_request(self, error):
+        # An exception that propagates out of the view (debug, testing or
+        # PROPAGATE_EXCEPTIONS) skips after_request; those requests still count
+        if 'request_started' in g and not g.get('request_recorded'):
+            self._record()
+
+    def _record(self):
+        g.request_recorded = True
+        total = time.perf_counter() - g.request_started
+
+        if g.sql_count > self.query_budget or total * 1000 > self.duration_budget_ms:
+            current_app.logger.warning(
+                'Request over budget: %s %s took %.1f ms with %d queries (%.1f ms in SQL)',
+                request.method, request.path, total * 1000, g.sql_count, g.sql_time * 1000
+            )
+
+        labels = (('endpoint', request.endpoint or 'unmatched'), ('method', request.method))
+        self.duration.observe(labels, total)
+        self.db_duration.observe(labels, g.sql_time)
+        self.queries.observe(labels, g.sql_count)
+        return total
+
+    def render(self):
+        lines = []
+        for histogram in (self.duration, self.db_duration, self.queries):
+            lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+    def _metrics_view(self):
+        # With METRICS_TOKEN set, scrapers send it as a bearer token
+        if self.metrics_token:
+            header = request.headers.get('Authorization', '')
+            # Compared as bytes: compare_digest rejects non-ASCII str
+            if not hmac.compare_digest(header.encode(), f'Bearer {self.metrics_token}'.encode()):
+                return current_app.response_class(status=401, headers={'WWW-Authenticate': 'Bearer'})
+        return current_app.response_class(self.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,15 @@
+from flask import Blueprint, jsonify
+
+# No routes of its own; cli_group=None puts the worker at `flask worker`
+jobs_bp = Blueprint('jobs', __name__, cli_group=None)
+
+from app.jobs import handlers, commands
+from app.jobs.queue import QueueFull
+
+def accepted(job):
+    # 202 pointing at the status endpoint for a freshly enqueued job
+    return jsonify(job.to_dict()), 202, {'Location': f'/api/jobs/{job.id}'}
+
+@jobs_bp.app_errorhandler(QueueFull)
+def queue_full(error):
+    return jsonify({'error': 'Too many background jobs pending, please try again later'}), 429, {'Retry-After': '30'}
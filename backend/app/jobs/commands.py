@@ -0,0 +1,16 @@
+import click
+from flask import current_app
+from app.jobs import jobs_bp
+from app.jobs.queue import JobWorker
+
+@jobs_bp.cli.command('worker')
+@click.option('--threads', type=int, help='Jobs run at once; defaults to JOB_WORKERS.')
+@click.option('--burst', is_flag=True, help='Exit once the queue has no due jobs.')
+def worker_command(threads, burst):
+    """Run queued background jobs."""
+    app = current_app._get_current_object()
+    worker = JobWorker(app, threads or app.config['JOB_WORKERS'], app.config['JOB_POLL_INTERVAL'])
+
+    click.echo(f'Worker {worker.name} running {worker.threads} thread(s)')
+    worker.run(burst=burst)
+    click.echo(f'Processed {worker.processed} job(s)')
@@ -0,0 +1,30 @@
+import os
+from flask import current_app
+from app import db
+from app.jobs.queue import handler
+from app.stats import rollup
+
+@handler('stats.rebuild')
+def rebuild_stats(job, payload):
+    stats = rollup.rebuild(job.user_id)
+    db.session.commit()
+    return {'total_workouts': stats.total_workouts, 'total_duration': stats.total_duration}
+
+# Imports commit in batches, so a retry could insert rows twice
+@handler('workouts.import', max_attempts=1)
+def import_workouts(job, payload):
+    from app.api.imports import WorkoutImporter, read_records
+
+    if not os.path.exists(payload['path']):
+        raise FileNotFoundError(f"Import spool file {payload['path']} not found; "
+                                'JOB_SPOOL_DIR must be shared by the web and worker processes')
+    try:
+        with open(payload['path'], 'rb') as f:
+            importer = WorkoutImporter(
+                job.user_id,
+                batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+                commit_every=current_app.config['IMPORT_COMMIT_EVERY']
+            )
+            return importer.run(read_records(f, payload['format']))
+    finally:
+        os.remove(payload['path'])
@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+# kind -> handler(job, payload) returning a JSON-serializable result
+HANDLERS = {}
+
+class QueueFull(Exception):
+    pass
+
+def handler(kind, max_attempts=None):
+    """Registers a job handler. Handlers that aren't safe to repeat should
+    pass max_attempts=1."""
+    def register(fn):
+        fn.max_attempts = max_attempts
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+def enqueue(kind, user_id, payload=None):
+    # Flushes but doesn't commit, so the job lands with the caller's transaction
+    config = current_app.config
+    queued = db.session.query(func.count(Job.id)).filter(
+        Job.user_id == user_id,
+        Job.status.in_([Job.QUEUED, Job.RUNNING])
+    ).scalar()
+    if queued >= config['JOB_USER_QUEUE_LIMIT']:
+        raise QueueFull()
+
+    job = Job(
+        user_id=user_id,
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        max_attempts=HANDLERS[kind].max_attempts or config['JOB_MAX_ATTEMPTS']
+    )
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+def claim(worker_id, user_concurrency=1):
+    """Atomically marks the next due job as running and returns it.
+
+    Jobs belonging to users who already have `user_concurrency` jobs running
+    are skipped. SQLite runs the single UPDATE under its write lock, so two
+    workers can never claim the same job.
+    """
+    now = datetime.utcnow()
+    queued = aliased(Job)
+    running = aliased(Job)
+
+    running_for_user = select(func.count(running.id)).where(
+        running.user_id == queued.user_id,
+        running.status == Job.RUNNING
+    ).scalar_subquery()
+    next_job = select(queued.id).where(
+        queued.status == Job.QUEUED,
+        queued.run_after <= now,
+        running_for_user < user_concurrency
+    ).order_by(queued.run_after, queued.id).limit(1).scalar_subquery()
+
+    job_id = db.session.execute(
+        update(Job)
+        .where(Job.id == next_job, Job.status == Job.QUEUED)
+        .values(status=Job.RUNNING, locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1, updated_at=now)
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    db.session.commit()
+
+    return db.session.get(Job, job_id, populate_existing=True) if job_id else None
+
+def requeue_stale(lease_seconds, worker=None):
+    # Jobs whose worker died mid-run go back on the queue, as the attempt
+    # counts; those that were on their last attempt fail instead, so handlers
+    # registered with max_attempts=1 never run twice. Jobs held by the threads
+    # of `worker`, which is still alive, are left running however long they take.
+    now = datetime.utcnow()
+    stale = [Job.status == Job.RUNNING, Job.locked_at < now - timedelta(seconds=lease_seconds)]
+    if worker is not None:
+        stale.append(~Job.locked_by.startswith(f'{worker}/', autoescape=True))
+    failed = db.session.execute(
+        update(Job)
+        .where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status=Job.FAILED, error='Worker stopped during the last attempt', locked_by=None, locked_at=None,
+                finished_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    count = db.session.execute(
+        update(Job)
+        .where(*stale)
+        .values(status=Job.QUEUED, locked_by=None, locked_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if failed:
+        logger.warning('Failed %s stale job(s) that had no attempts left', failed)
+    return count
+
+def backoff(attempts, base, limit):
+    return min(base * 2 ** (attempts - 1), limit)
+
+def execute(job):
+    config = current_app.config
+    # Read up front: a handler that committed and then raised leaves `job`
+    # expired, and reloading it could fail again inside the error path
+    job_id, kind, attempts = job.id, job.kind, job.attempts
+    try:
+        result = HANDLERS[kind](job, json.loads(job.payload))
+    except Exception as e:
+        logger.exception('Job %s (%s) failed on attempt %s', job_id, kind, attempts)
+        db.session.rollback()
+        job = db.session.get(Job, job_id, populate_existing=True)
+        job.error = f'{type(e).__name__}: {e}'
+        job.locked_by = None
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished_at = datetime.utcnow()
+        else:
+            delay = backoff(job.attempts, config['JOB_RETRY_BACKOFF'], config['JOB_RETRY_BACKOFF_MAX'])
+            job.status = Job.QUEUED
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = json.dumps(result)
+        job.error = None
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+class JobWorker:
+    """Pool of threads that claim and run jobs until stopped.
+
+    With `burst`, each thread exits once no job is due instead of polling.
+    """
+
+    def __init__(self, app, threads=2, poll_interval=1.0, name=None):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.name = name or f'{os.uname().nodename}:{os.getpid()}'
+        self.processed = 0
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def work_once(self, thread_name=None):
+        job = claim(thread_name or self.name, self.app.config['JOB_USER_CONCURRENCY'])
+        if job is None:
+            return None
+        job = execute(job)
+        with self._lock:
+            self.processed += 1
+        return job
+
+    def _loop(self, index, burst):
+        with self.app.app_context():
+            thread_name = f'{self.name}/{index}'
+            while not self._stopped.is_set():
+                try:
+                    job = self.work_once(thread_name)
+                except Exception:
+                    # e.g. the database was locked past the busy timeout
+                    logger.exception('Worker %s could not claim a job', thread_name)
+                    db.session.rollback()
+                    job = None
+                if job is None:
+                    if burst:
+                        return
+                    self._stopped.wait(self.poll_interval)
+            db.session.remove()
+
+    def requeue_stale(self, own_jobs_alive=False):
+        with self.app.app_context():
+            requeued = requeue_stale(self.app.config['JOB_LEASE_SECONDS'], self.name if own_jobs_alive else None)
+            if requeued:
+                logger.warning('Requeued %s stale job(s)', requeued)
+
+    def run(self, burst=False):
+        self.requeue_stale()
+
+        workers = [threading.Thread(target=self._loop, args=(i, burst), daemon=True) for i in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        # Other workers can die while this one runs, so their jobs are swept
+        # once per lease rather than only when a worker starts
+        lease = self.app.config['JOB_LEASE_SECONDS']
+        next_sweep = time.monotonic() + lease
+        try:
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(0.2)
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + lease
+                    try:
+                        self.requeue_stale(own_jobs_alive=True)
+                    except Exception:
+                        logger.exception('Worker %s could not requeue stale jobs', self.name)
+        except KeyboardInterrupt:
+            self.stop()
+        for worker in workers:
+            worker.join()
+
+    def stop(self):
+        self._stopped.set()
@@ -1,2 +1,4 @@
 from app.models.user import User
-from app.models.workout import Workout, Exercise, WorkoutExercise
\ No newline at end of file
+from app.models.workout import Workout, Exercise, WorkoutExercise
+from app.models.stats import UserStats, UserExerciseStats, PersonalRecord, WorkoutStreak
+from app.models.job import Job
\ No newline at end of file
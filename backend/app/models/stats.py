@@ -0,0 +1,61 @@
+from datetime import datetime
+from app import db
+
+class UserStats(db.Model):
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_workouts = db.Column(db.Integer, nullable=False, default=0)
+    total_duration = db.Column(db.Integer, nullable=False, default=0)  # in minutes
+    last_workout_date = db.Column(db.Date)
+    most_frequent_exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id'))
+    most_frequent_exercise_count = db.Column(db.Integer, nullable=False, default=0)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # in consecutive days
+    version = db.Column(db.Integer, nullable=False, default=0)  # bumped on every write to the user's workouts
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    most_frequent_exercise = db.relationship('Exercise')
+
+class UserExerciseStats(db.Model):
+    __tablename__ = 'user_exercise_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id'), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class PersonalRecord(db.Model):
+    __tablename__ = 'personal_records'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id'), primary_key=True)
+    max_weight = db.Column(db.Float)  # in kg
+    max_reps = db.Column(db.Integer)
+    max_distance = db.Column(db.Float)  # in km
+    best_duration = db.Column(db.Integer)  # longest, in seconds
+    estimated_one_rep_max = db.Column(db.Float)  # Epley, in kg
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    exercise = db.relationship('Exercise')
+
+    def to_dict(self):
+        return {
+            'exercise_id': self.exercise_id,
+            'exercise': self.exercise.name,
+            'max_weight': self.max_weight,
+            'max_reps': self.max_reps,
+            'max_distance': self.max_distance,
+            'best_duration': self.best_duration,
+            'estimated_one_rep_max': round(self.estimated_one_rep_max, 1) if self.estimated_one_rep_max is not None else None,
+            'updated_at': self.updated_at.isoformat()
+        }
+
+class WorkoutStreak(db.Model):
+    """A maximal run of consecutive days with at least one workout."""
+    __tablename__ = 'workout_streaks'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    start_date = db.Column(db.Date, primary_key=True)
+    end_date = db.Column(db.Date, nullable=False)
+    days = db.Column(db.Integer, nullable=False)
@@ -3,9 +3,13 @@ from app import db
 
 class Exercise(db.Model):
     __tablename__ = 'exercises'
+    __table_args__ = (
+        db.Index('ix_exercises_category_name', 'category', 'name'),
+        db.Index('ix_exercises_updated_at', 'updated_at'),  # the catalog's stamp in app/conditional.py
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.Text)
     category = db.Column(db.String(50))  # e.g., cardio, strength, flexibility
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -23,6 +27,9 @@ class Exercise(db.Model):
 
 class Workout(db.Model):
     __tablename__ = 'workouts'
+    __table_args__ = (
+        db.Index('ix_workouts_user_id_date', 'user_id', 'date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -34,7 +41,7 @@ class Workout(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    exercises = db.relationship('WorkoutExercise', backref='workout', lazy='dynamic', cascade='all, delete-orphan')
+    exercises = db.relationship('WorkoutExercise', backref='workout', order_by='WorkoutExercise.id', cascade='all, delete-orphan')
     
     def to_dict(self, include_exercises=False):
         result = {
@@ -55,10 +62,14 @@ class Workout(db.Model):
 
 class WorkoutExercise(db.Model):
     __tablename__ = 'workout_exercises'
+    __table_args__ = (
+        # Serves lookups by workout and the "contains exercise" semi-join
+        db.Index('ix_workout_exercises_workout_id_exercise_id', 'workout_id', 'exercise_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     workout_id = db.Column(db.Integer, db.ForeignKey('workouts.id'))
-    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id'))
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id'), index=True)
     sets = db.Column(db.Integer)
     reps = db.Column(db.Integer)
     weight = db.Column(db.Float)  # in kg
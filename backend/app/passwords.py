@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full or a hash took too long."""
+
+class HashingExecutor:
+    """Runs password hashing on a small, separately sized thread pool.
+
+    At most `workers` hashes run at once and at most `max_queue` more wait for
+    a slot; anything beyond that is rejected with HashingBusy instead of
+    tying up request threads. hashlib releases the GIL while it runs PBKDF2,
+    so other requests keep being served meanwhile.
+
+    The limits are per process and only help when a process serves several
+    requests at once, i.e. gunicorn's gthread (or gevent) workers: with sync
+    workers each process has one request in flight and nothing ever queues.
+    Keep workers + max_queue below the threads per process so some are always
+    left for other requests; Dockerfile.backend runs 16 threads against the
+    defaults of 2 + 8.
+    """
+
+    def __init__(self, workers=2, max_queue=16, timeout=10):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash') if workers else None
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self.peak_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait_seconds = 0.0
+        self.total_hash_seconds = 0.0
+
+    def run(self, fn, *args):
+        if self._pool is None:
+            return fn(*args)
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy('Password hashing queue is full')
+
+        with self._lock:
+            self._in_flight += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self._in_flight - self._running)
+
+        submitted = time.perf_counter()
+        future = self._pool.submit(self._timed, fn, args, submitted)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise HashingBusy('Password hashing timed out')
+
+    def _timed(self, fn, args, submitted):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self.total_wait_seconds += started - submitted
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._in_flight -= 1
+                self.completed += 1
+                self.total_hash_seconds += time.perf_counter() - started
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'queue_depth': self._in_flight - self._running,
+                'peak_queue_depth': self.peak_queue_depth,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_wait_ms': round(self.total_wait_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+                'avg_hash_ms': round(self.total_hash_seconds / self.completed * 1000, 3) if self.completed else 0.0
+            }
+
+class PasswordHasher:
+    """Werkzeug PBKDF2 hashing with a configurable digest and iteration count."""
+
+    def __init__(self, algorithm='sha256', iterations=260000, executor=None):
+        self.method = f'pbkdf2:{algorithm}:{iterations}'
+        self.executor = executor or HashingExecutor(workers=0)
+
+    def hash(self, password):
+        return self.executor.run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self.executor.run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        # Hashes start with the method they were made with, e.g. pbkdf2:sha256:260000
+        return password_hash.split('$', 1)[0] != self.method
+
+    @classmethod
+    def from_config(cls, config):
+        executor = HashingExecutor(
+            workers=config['PASSWORD_HASH_WORKERS'],
+            max_queue=config['PASSWORD_HASH_QUEUE'],
+            timeout=config['PASSWORD_HASH_TIMEOUT']
+        )
+        return cls(config['PASSWORD_HASH_ALGORITHM'], config['PASSWORD_HASH_ITERATIONS'], executor)
+
+_default_hasher = PasswordHasher()
+
+def get_hasher():
+    # Outside an app (scripts, shells) hashes are made inline with the defaults
+    if has_app_context():
+        return current_app.extensions['password_hasher']
+    return _default_hasher
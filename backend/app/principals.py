@@ -0,0 +1,108 @@
+from collections import namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from app import db, jwt
+from app.cache import TTLCache
+from app.models import User
+
+# Fields copied off the user row; changing one of them invalidates the cache
+PRINCIPAL_FIELDS = ('id', 'username', 'email', 'created_at', 'updated_at')
+
+class Principal(namedtuple('Principal', PRINCIPAL_FIELDS)):
+    """Immutable snapshot of the authenticated user, safe to share between requests."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(*(getattr(user, field) for field in PRINCIPAL_FIELDS))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+class PrincipalCache(TTLCache):
+    """JWT identity to Principal map, plus the set of revoked user ids.
+
+    Both are process-local. Changes committed through this process take
+    effect immediately; other workers pick up profile changes within `ttl`
+    seconds, and fall back to the database for deleted users once their
+    cached entry expires.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        super().__init__(maxsize, ttl)
+        self.revoked = set()
+
+    def load(self, user_id):
+        principal = self.get(user_id)
+        if principal is None:
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            principal = self.remember(user)
+        return principal
+
+    def remember(self, user):
+        principal = Principal.from_user(user)
+        self.set(user.id, principal)
+        return principal
+
+    def revoke(self, user_id):
+        self.revoked.add(user_id)
+        self.pop(user_id)
+
+    def stats(self):
+        stats = super().stats()
+        stats['revoked'] = len(self.revoked)
+        return stats
+
+def principal_cache():
+    return current_app.extensions['principal_cache']
+
+@jwt.token_in_blocklist_loader
+def _is_revoked(jwt_header, jwt_data):
+    return jwt_data['sub'] in principal_cache().revoked
+
+@jwt.user_lookup_loader
+def _load_principal(jwt_header, jwt_data):
+    return principal_cache().load(jwt_data['sub'])
+
+# User changes are collected at flush and applied only once they commit, so a
+# rolled-back delete never revokes anyone
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_user_changes(session, flush_context):
+    changes = session.info.setdefault('principal_changes', {})
+    for user in session.new:
+        if isinstance(user, User):
+            changes[user.id] = 'created'
+    for user in session.dirty:
+        if isinstance(user, User) and session.is_modified(user):
+            changes.setdefault(user.id, 'updated')
+    for user in session.deleted:
+        if isinstance(user, User):
+            changes[user.id] = 'deleted'
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_user_changes(session):
+    changes = session.info.pop('principal_changes', None)
+    if not changes or not has_app_context():
+        return
+    cache = principal_cache()
+    for user_id, change in changes.items():
+        if change == 'deleted':
+            cache.revoke(user_id)
+        else:
+            # SQLite can hand a deleted user's id to a new row
+            cache.revoked.discard(user_id)
+            cache.pop(user_id)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_user_changes(session):
+    session.info.pop('principal_changes', None)
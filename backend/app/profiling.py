@@ -0,0 +1,157 @@
+import cProfile
+import hmac
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+PROFILE_HEADER = 'X-Profile'
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval.
+
+    Counts are kept per stack, root frame first, so they can be written in
+    the collapsed format flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+class RequestProfiler:
+    """Profiles selected requests into a size-capped directory.
+
+    A request is profiled when it carries `X-Profile: <PROFILER_TOKEN>`, or
+    when it passes the PROFILER_SAMPLE_RATE dice roll and matches the
+    endpoint and user allowlists (an empty allowlist matches everything).
+    Each profile is a .pstats file from cProfile plus a .collapsed file of
+    sampled stacks, named in the X-Profile-Id response header. The oldest
+    files are removed once the directory exceeds the file or size cap.
+    """
+
+    def __init__(self, directory, token=None, sample_rate=0.0, endpoints=(), user_ids=(),
+                 max_files=200, max_bytes=50 * 1024 * 1024, interval=0.005):
+        self.directory = directory
+        self.token = token
+        self.sample_rate = sample_rate
+        self.endpoints = frozenset(endpoints)
+        self.user_ids = frozenset(user_ids)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config['PROFILER_DIR'],
+            token=config['PROFILER_TOKEN'],
+            sample_rate=config['PROFILER_SAMPLE_RATE'],
+            endpoints=config['PROFILER_ENDPOINTS'],
+            user_ids=config['PROFILER_USER_IDS'],
+            max_files=config['PROFILER_MAX_FILES'],
+            max_bytes=config['PROFILER_MAX_MB'] * 1024 * 1024,
+            interval=config['PROFILER_INTERVAL_MS'] / 1000
+        )
+
+    def init_app(self, app):
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._abandon)
+
+    def should_profile(self):
+        header = request.headers.get(PROFILE_HEADER)
+        if header is not None:
+            # Compared as bytes: compare_digest rejects non-ASCII str
+            return bool(self.token) and hmac.compare_digest(header.encode(), self.token.encode())
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return False
+        if self.endpoints and request.endpoint not in self.endpoints:
+            return False
+        return not self.user_ids or _request_user_id() in self.user_ids
+
+    def _start(self):
+        if not self.should_profile():
+            return
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        profile = cProfile.Profile()
+        g.profiling = (profile, sampler)
+        sampler.start()
+        profile.enable()
+
+    def _stop(self):
+        profile, sampler = g.pop('profiling')
+        profile.disable()
+        sampler.stop()
+        return profile, sampler
+
+    def _finish(self, response):
+        if 'profiling' in g:
+            profile, sampler = self._stop()
+            response.headers['X-Profile-Id'] = self.save(profile, sampler)
+        return response
+
+    def _abandon(self, error=None):
+        # after_request is skipped when the view raised; keep that profile too
+        if 'profiling' in g:
+            self.save(*self._stop())
+
+    def save(self, profile, sampler):
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.endpoint or 'unmatched'}-{os.getpid()}"
+        path = os.path.join(self.directory, name)
+        profile.dump_stats(path + '.pstats')
+        with open(path + '.collapsed', 'w') as f:
+            f.write(sampler.collapsed())
+        self._rotate()
+        return name
+
+    def _rotate(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(('.pstats', '.collapsed')):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_files * 2 or total > self.max_bytes):
+                _, size, path = entries.pop(0)
+                total -= size
+                try:
+                    os.remove(path)
+                except FileNotFoundError:  # another worker rotated it first
+                    pass
+
+def _request_user_id():
+    # Only reached for sampled requests when a user allowlist is set
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
@@ -0,0 +1,147 @@
+import re
+import threading
+from sqlalchemy import DDL, Float, Integer, event, false, or_, text
+from app import db
+from app.models import Exercise
+from app.database import use_primary
+
+# Full-text search over the exercise catalog. On SQLite, `exercises_fts` is
+# an external-content FTS5 table over exercises.name and description, kept
+# in sync by triggers (the migration creates them for existing databases, the
+# DDL below for create_all). Other databases fall back to a LIKE filter.
+#
+# A batch_alter_table on `exercises` recreates the table and drops its
+# triggers; such a migration has to recreate them and rebuild the index.
+
+FTS_TABLE = 'exercises_fts'
+
+FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, description, content='exercises', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON exercises BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON exercises BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF name, description ON exercises BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+)
+
+for statement in FTS_DDL:
+    event.listen(Exercise.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Exercise.__table__, 'after_drop', DDL(f'DROP TABLE IF EXISTS {FTS_TABLE}').execute_if(dialect='sqlite'))
+
+def _terms(value):
+    return re.findall(r'\w+', value.casefold())
+
+def match_expression(q):
+    """FTS5 query for free text: every word must match, the last one as a
+    prefix so results follow the user's typing. None if there are no words."""
+    terms = _terms(q)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+def apply_search(query, q):
+    # Returns the query restricted to exercises matching `q` and the column
+    # that orders them by relevance (None when there is no ranking)
+    expression = match_expression(q)
+    if expression is None:
+        return query.filter(false()), None
+
+    if db.engine.dialect.name != 'sqlite':
+        clauses = [or_(Exercise.name.ilike(f'%{term}%'), Exercise.description.ilike(f'%{term}%')) for term in _terms(q)]
+        return query.filter(*clauses), None
+
+    matches = text(
+        f'SELECT rowid, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match'
+    ).bindparams(match=expression).columns(rowid=Integer, rank=Float).subquery('matches')
+    return query.join(matches, matches.c.rowid == Exercise.id), matches.c.rank
+
+class ExerciseTrie:
+    """Prefix trie over exercise names for autocomplete.
+
+    Every node keeps the ids of its best `max_results` completions, so a
+    lookup walks the prefix and slices one list. Names are indexed whole and
+    from each later word, so 'pre' finds 'Bench Press'; matches at the start
+    of a name rank before matches inside one, then by name.
+    """
+
+    __slots__ = ('max_results', 'root', 'names')
+
+    def __init__(self, exercises, max_results=20):
+        self.max_results = max_results
+        self.root = _Node()
+        self.names = {}
+
+        exercises = sorted(exercises, key=lambda exercise: (exercise[1].casefold(), exercise[0]))
+        later_words = []
+        for exercise_id, name in exercises:
+            self.names[exercise_id] = name
+            words = _terms(name)
+            self._insert(' '.join(words), exercise_id)
+            later_words.extend((' '.join(words[i:]), exercise_id) for i in range(1, len(words)))
+        for key, exercise_id in later_words:
+            self._insert(key, exercise_id)
+
+    def _insert(self, key, exercise_id):
+        node = self.root
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+            node = child
+            if len(node.top) < self.max_results and exercise_id not in node.top:
+                node.top.append(exercise_id)
+
+    def complete(self, prefix, limit=10):
+        # [(id, name)] for up to `limit` exercises matching `prefix`
+        node = self.root
+        for char in ' '.join(_terms(prefix)):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if node is self.root:
+            return []
+        return [(exercise_id, self.names[exercise_id]) for exercise_id in node.top[:limit]]
+
+    def __len__(self):
+        return len(self.names)
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+class SuggestIndex:
+    """The catalog's ExerciseTrie, rebuilt when the catalog cache version
+    moves: on every catalog write in this process, and at the cache's TTL
+    rollover for writes made by other processes."""
+
+    def __init__(self, max_results=20):
+        self.max_results = max_results
+        self.version = None
+        self.builds = 0
+        self._trie = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['SUGGEST_MAX_RESULTS'])
+
+    def trie(self, catalog):
+        version = catalog.current_version()
+        if self._trie is None or self.version != version:
+            with self._lock:
+                if self._trie is None or self.version != version:
+                    # Read along the name index, which covers (name, id)
+                    with use_primary():
+                        exercises = db.session.query(Exercise.id, Exercise.name).order_by(Exercise.name).all()
+                    self._trie = ExerciseTrie(exercises, self.max_results)
+                    self.version = version
+                    self.builds += 1
+        return self._trie
@@ -0,0 +1,113 @@
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+from app.models import Workout, WorkoutExercise, Exercise
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib provider is used without it
+    orjson = None
+
+class RowSerializer:
+    """Turns plain result rows into dicts using a fixed field spec.
+
+    Query `serializer.columns` and pass the resulting rows straight in; no ORM
+    objects are built. Nested serializers read the columns that follow the
+    parent's own, and come out as None when their first column (the id) is
+    NULL, e.g. from an outer join. Dates are left to the JSON provider.
+    """
+
+    def __init__(self, fields, nested=None):
+        self.names = tuple(name for name, _ in fields)
+        self.columns = [column for _, column in fields]
+        self.nested = []
+        for name, serializer in (nested or {}).items():
+            self.nested.append((name, len(self.columns), len(self.columns) + len(serializer.columns), serializer))
+            self.columns.extend(serializer.columns)
+
+    def __call__(self, row):
+        result = dict(zip(self.names, row))
+        for name, start, end, serializer in self.nested:
+            result[name] = serializer(row[start:end]) if row[start] is not None else None
+        return result
+
+    def many(self, rows):
+        if not self.nested:
+            names = self.names
+            return [dict(zip(names, row)) for row in rows]
+        return [self(row) for row in rows]
+
+EXERCISE = RowSerializer([
+    ('id', Exercise.id),
+    ('name', Exercise.name),
+    ('description', Exercise.description),
+    ('category', Exercise.category),
+    ('created_at', Exercise.created_at),
+    ('updated_at', Exercise.updated_at)
+])
+
+WORKOUT = RowSerializer([
+    ('id', Workout.id),
+    ('user_id', Workout.user_id),
+    ('name', Workout.name),
+    ('date', Workout.date),
+    ('duration', Workout.duration),
+    ('notes', Workout.notes),
+    ('created_at', Workout.created_at),
+    ('updated_at', Workout.updated_at)
+])
+
+WORKOUT_EXERCISE = RowSerializer([
+    ('id', WorkoutExercise.id),
+    ('workout_id', WorkoutExercise.workout_id),
+    ('exercise_id', WorkoutExercise.exercise_id),
+    ('sets', WorkoutExercise.sets),
+    ('reps', WorkoutExercise.reps),
+    ('weight', WorkoutExercise.weight),
+    ('duration', WorkoutExercise.duration),
+    ('distance', WorkoutExercise.distance),
+    ('notes', WorkoutExercise.notes),
+    ('created_at', WorkoutExercise.created_at),
+    ('updated_at', WorkoutExercise.updated_at)
+], nested={'exercise': EXERCISE})
+
+class JSONProvider(DefaultJSONProvider):
+    # Dates go out as ISO 8601, matching the models' to_dict() output
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+class OrjsonProvider(JSONProvider):
+    # Sorted keys and ISO dates keep the output identical to JSONProvider
+
+    option = orjson.OPT_SORT_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype
+        )
+
+JSON_PROVIDERS = {
+    'stdlib': JSONProvider,
+    'orjson': OrjsonProvider
+}
+
+def json_provider_class(name='auto'):
+    if name == 'auto':
+        name = 'orjson' if orjson else 'stdlib'
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_PROVIDER is 'orjson' but orjson is not installed")
+    return JSON_PROVIDERS[name]
@@ -1,5 +1,7 @@
 from flask import Blueprint
+from app.database import read_from_replica
 
 stats_bp = Blueprint('stats', __name__)
+read_from_replica(stats_bp)
 
-from app.stats import routes
\ No newline at end of file
+from app.stats import routes, commands
\ No newline at end of file
@@ -0,0 +1,230 @@
+from collections import Counter
+from datetime import date
+from app.stats import timeseries
+from app.stats.records import estimated_one_rep_max
+
+try:
+    import numpy as np
+except ImportError:  # optional, the pure-Python backend is used without it
+    np = None
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Brzycki's formula is undefined from 37 reps on
+BRZYCKI_MAX_REPS = 37
+
+# Every computation reads a UserHistory snapshot (app/stats/history.py) and
+# takes days as date ordinals. Set rows missing sets, reps or weight have a
+# NaN tonnage and count as zero, as NULL volumes do in SQL.
+
+class PythonAnalytics:
+    """Reference implementation in plain Python, used when NumPy is missing."""
+
+    name = 'python'
+
+    def training_load(self, history, first_day, length):
+        # Daily tonnage (sets x reps x weight) for `length` days from
+        # `first_day`, with trailing acute and chronic means and their ratio.
+        # Days before `first_day` count as zero.
+        start, stop = history.set_range(first_day, first_day + length - 1)
+        daily = [0.0] * length
+        for day, sets, reps, weight in zip(history.set_days[start:stop], history.sets[start:stop],
+                                           history.reps[start:stop], history.weight[start:stop]):
+            tonnage = sets * reps * weight
+            if tonnage == tonnage:  # NaN when any of them is unset
+                daily[day - first_day] += tonnage
+
+        acute = self._rolling_mean(daily, ACUTE_DAYS)
+        chronic = self._rolling_mean(daily, CHRONIC_DAYS)
+        ratio = [a / c if c else None for a, c in zip(acute, chronic)]
+        return daily, acute, chronic, ratio
+
+    def _rolling_mean(self, values, window):
+        # From prefix sums, like the NumPy version, so both round the same
+        prefix = [0.0]
+        for value in values:
+            prefix.append(prefix[-1] + value)
+        return [(prefix[i + 1] - prefix[max(i + 1 - window, 0)]) / window for i in range(len(values))]
+
+    def progress(self, history, exercise_id, first_day=None, last_day=None):
+        # Best weight, Epley and Brzycki estimates per training day, from the
+        # exercise's sets with a positive weight and rep count
+        start, stop = history.set_range(first_day, last_day)
+        days, best = [], []
+        for day, exercise, reps, weight in zip(history.set_days[start:stop], history.exercise_ids[start:stop],
+                                               history.reps[start:stop], history.weight[start:stop]):
+            if exercise != exercise_id or not (weight > 0 and reps > 0):  # NaN fails both comparisons
+                continue
+            epley = estimated_one_rep_max(weight, reps)
+            brzycki = weight * 36 / (37 - reps) if reps < BRZYCKI_MAX_REPS else None
+            if not days or days[-1] != day:
+                days.append(day)
+                best.append([weight, epley, brzycki])
+                continue
+            current = best[-1]
+            current[0] = max(current[0], weight)
+            current[1] = max(current[1], epley)
+            if brzycki is not None:
+                current[2] = brzycki if current[2] is None else max(current[2], brzycki)
+
+        max_weight, epley, brzycki = ([values[i] for values in best] for i in range(3)) if best else ([], [], [])
+        return days, max_weight, epley, brzycki
+
+    def trend(self, days, values):
+        # Least-squares line through the (day, value) points that have a value
+        points = [(day, value) for day, value in zip(days, values) if value is not None]
+        if len(points) < 2:
+            return None
+        n = len(points)
+        mean_x = sum(day for day, _ in points) / n
+        mean_y = sum(value for _, value in points) / n
+        variance = sum((day - mean_x) ** 2 for day, _ in points)
+        if not variance:
+            return None
+        slope = sum((day - mean_x) * (value - mean_y) for day, value in points) / variance
+        return slope, mean_y - slope * mean_x
+
+    def buckets(self, history, bucket, first_day, last_day):
+        # {bucket start ordinal: (workouts, minutes, volume)} for buckets with workouts
+        keys = {}
+
+        def key(day):
+            if day not in keys:
+                keys[day] = timeseries.bucket_start(date.fromordinal(day), bucket).toordinal()
+            return keys[day]
+
+        totals = {}
+        start, stop = history.workout_range(first_day, last_day)
+        for day, duration in zip(history.workout_days[start:stop], history.workout_durations[start:stop]):
+            entry = totals.setdefault(key(day), [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += duration
+
+        start, stop = history.set_range(first_day, last_day)
+        for day, sets, reps, weight in zip(history.set_days[start:stop], history.sets[start:stop],
+                                           history.reps[start:stop], history.weight[start:stop]):
+            volume = sets * reps * weight
+            if volume == volume:
+                totals[key(day)][2] += volume
+
+        return {day: tuple(entry) for day, entry in totals.items()}
+
+    def exercise_counts(self, history):
+        return dict(Counter(history.exercise_ids))
+
+class NumpyAnalytics:
+    """Whole-column versions of the same computations, on zero-copy views of
+    the snapshot's arrays."""
+
+    name = 'numpy'
+
+    def training_load(self, history, first_day, length):
+        start, stop = history.set_range(first_day, first_day + length - 1)
+        days = _view(history.set_days)[start:stop].astype(np.int64) - first_day
+        tonnage = np.nan_to_num(_row_volume(history, start, stop))
+        daily = np.bincount(days, weights=tonnage, minlength=length)
+
+        acute = self._rolling_mean(daily, ACUTE_DAYS)
+        chronic = self._rolling_mean(daily, CHRONIC_DAYS)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(chronic != 0, acute / chronic, np.nan)
+        return daily.tolist(), acute.tolist(), chronic.tolist(), _nan_to_none(ratio)
+
+    def _rolling_mean(self, values, window):
+        prefix = np.concatenate(([0.0], np.cumsum(values)))
+        ends = np.arange(1, len(values) + 1)
+        return (prefix[ends] - prefix[np.maximum(ends - window, 0)]) / window
+
+    def progress(self, history, exercise_id, first_day=None, last_day=None):
+        start, stop = history.set_range(first_day, last_day)
+        reps = _view(history.reps)[start:stop]
+        weight = _view(history.weight)[start:stop]
+        with np.errstate(invalid='ignore'):
+            selected = (_view(history.exercise_ids)[start:stop] == exercise_id) & (weight > 0) & (reps > 0)
+        if not selected.any():
+            return [], [], [], []
+        days = _view(history.set_days)[start:stop][selected]
+        reps, weight = reps[selected], weight[selected]
+
+        epley = weight * (1 + reps / 30)  # as records.estimated_one_rep_max
+        with np.errstate(divide='ignore', invalid='ignore'):
+            brzycki = np.where(reps < BRZYCKI_MAX_REPS, weight * 36 / (37 - reps), np.nan)
+
+        # Sets are ordered by day, so each day is one contiguous run
+        starts = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1])))
+        return (
+            days[starts].tolist(),
+            np.maximum.reduceat(weight, starts).tolist(),
+            np.maximum.reduceat(epley, starts).tolist(),
+            _nan_to_none(np.fmax.reduceat(brzycki, starts))  # fmax skips NaN
+        )
+
+    def trend(self, days, values):
+        y = np.asarray([np.nan if value is None else value for value in values], dtype=float)
+        x = np.asarray(days, dtype=float)[~np.isnan(y)]
+        y = y[~np.isnan(y)]
+        if len(x) < 2:
+            return None
+        dx = x - x.mean()
+        variance = np.dot(dx, dx)
+        if not variance:
+            return None
+        slope = np.dot(dx, y - y.mean()) / variance
+        return float(slope), float(y.mean() - slope * x.mean())
+
+    def buckets(self, history, bucket, first_day, last_day):
+        start, stop = history.workout_range(first_day, last_day)
+        keys, workout_index = np.unique(_bucket_keys(_view(history.workout_days)[start:stop], bucket), return_inverse=True)
+        counts = np.bincount(workout_index, minlength=len(keys))
+        durations = np.bincount(workout_index, weights=_view(history.workout_durations)[start:stop], minlength=len(keys))
+
+        # Every set belongs to a workout on the same day, so its bucket is in `keys`
+        start, stop = history.set_range(first_day, last_day)
+        set_index = np.searchsorted(keys, _bucket_keys(_view(history.set_days)[start:stop], bucket))
+        volumes = np.bincount(set_index, weights=np.nan_to_num(_row_volume(history, start, stop)), minlength=len(keys))
+
+        return {
+            day: (count, int(round(duration)), volume)
+            for day, count, duration, volume in zip(keys.tolist(), counts.tolist(), durations.tolist(), volumes.tolist())
+        }
+
+    def exercise_counts(self, history):
+        exercise_ids, counts = np.unique(_view(history.exercise_ids), return_counts=True)
+        return dict(zip(exercise_ids.tolist(), counts.tolist()))
+
+def _view(column):
+    dtype = np.dtype(column.typecode)  # 'i', 'q' and 'd' are numpy type codes too
+    return np.frombuffer(column, dtype=dtype) if len(column) else np.empty(0, dtype=dtype)
+
+def _row_volume(history, start, stop):
+    return _view(history.sets)[start:stop] * _view(history.reps)[start:stop] * _view(history.weight)[start:stop]
+
+def _bucket_keys(days, bucket):
+    # Bucket start ordinals, matching timeseries.bucket_start
+    days = days.astype(np.int64)
+    if bucket == 'day':
+        return days
+    if bucket == 'week':
+        return days - (days - 1) % 7  # ordinal 1 is a Monday
+    unit = 'datetime64[M]' if bucket == 'month' else 'datetime64[Y]'
+    since_epoch = (days - EPOCH_ORDINAL).astype('datetime64[D]')
+    return since_epoch.astype(unit).astype('datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+
+def _nan_to_none(array):
+    return [None if value != value else value for value in array.tolist()]
+
+ANALYTICS_BACKENDS = {
+    'python': PythonAnalytics,
+    'numpy': NumpyAnalytics
+}
+
+def analytics_backend(name='auto'):
+    if name == 'auto':
+        name = 'numpy' if np is not None else 'python'
+    if name == 'numpy' and np is None:
+        raise RuntimeError("ANALYTICS_BACKEND is 'numpy' but numpy is not installed")
+    if name not in ANALYTICS_BACKENDS:
+        raise ValueError(f"Unknown ANALYTICS_BACKEND '{name}', expected auto, numpy or python")
+    return ANALYTICS_BACKENDS[name]()
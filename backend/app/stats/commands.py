@@ -0,0 +1,19 @@
+import click
+from app import db
+from app.models import User
+from app.stats import stats_bp, rollup
+
+@stats_bp.cli.command('rebuild')
+@click.option('--user-id', type=int, help='Only rebuild the rollup for this user.')
+def rebuild_command(user_id):
+    """Backfill or repair the per-user stats rollups and personal records."""
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = [id for (id,) in db.session.query(User.id).order_by(User.id)]
+
+    for id in user_ids:
+        rollup.rebuild(id)
+        db.session.commit()
+
+    click.echo(f'Rebuilt stats for {len(user_ids)} user(s)')
@@ -0,0 +1,171 @@
+import math
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from flask import current_app, g
+from sqlalchemy import Integer, cast, func, literal, select
+from app import db
+from app.cache import LRUCache
+from app.models import Workout, WorkoutExercise, UserStats
+
+NAN = math.nan
+
+class UserHistory:
+    """One user's workouts and exercise rows as typed columns, sorted by day.
+
+    Days are date ordinals. Workout durations are minutes, 0 when unset, held
+    as 64-bit integers like SQLite's.
+    Sets, reps and weight are floats with NaN for unset, so a product that
+    involves a missing value is NaN, as NULL is in SQL. Snapshots are never
+    modified once built; a write replaces the whole snapshot.
+    """
+
+    __slots__ = ('version', 'workout_days', 'workout_durations', 'set_days', 'exercise_ids', 'sets', 'reps', 'weight')
+
+    COLUMNS = ('workout_days', 'workout_durations', 'set_days', 'exercise_ids', 'sets', 'reps', 'weight')
+
+    def __init__(self, version, workouts, exercise_rows):
+        self.version = version
+        days, durations = _columns(workouts, 2)
+        self.workout_days = array('i', days)
+        self.workout_durations = array('q', [duration or 0 for duration in durations])
+        days, exercise_ids, sets, reps, weight = _columns(exercise_rows, 5)
+        self.set_days = array('i', days)
+        self.exercise_ids = array('i', exercise_ids)
+        self.sets = array('d', [NAN if value is None else value for value in sets])
+        self.reps = array('d', [NAN if value is None else value for value in reps])
+        self.weight = array('d', [NAN if value is None else value for value in weight])
+
+    @classmethod
+    def load(cls, user_id, version=None):
+        # Two queries, both along the (user_id, date) index. They run as Core
+        # statements on the session's connection, which skips the ORM's
+        # per-row work on what can be hundreds of thousands of rows.
+        day = _ordinal(Workout.date)
+        workouts = select(day, Workout.duration).where(Workout.user_id == user_id).order_by(Workout.date)
+        exercise_rows = select(
+            day, WorkoutExercise.exercise_id, WorkoutExercise.sets, WorkoutExercise.reps, WorkoutExercise.weight
+        ).join(
+            Workout, Workout.id == WorkoutExercise.workout_id
+        ).where(
+            Workout.user_id == user_id
+        ).order_by(Workout.date)
+
+        connection = db.session.connection(bind_arguments={'clause': workouts})
+        return cls(version, connection.execute(workouts).all(), connection.execute(exercise_rows).all())
+
+    @property
+    def nbytes(self):
+        return sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, column)) for column in self.COLUMNS)
+
+    def workout_range(self, first_day=None, last_day=None):
+        # [start, stop) indexes of the workouts between the two days, inclusive
+        return _range(self.workout_days, first_day, last_day)
+
+    def set_range(self, first_day=None, last_day=None):
+        return _range(self.set_days, first_day, last_day)
+
+def _columns(rows, width):
+    columns = list(zip(*rows))
+    return columns if columns else [()] * width
+
+def _range(days, first_day, last_day):
+    start = 0 if first_day is None else bisect_left(days, first_day)
+    stop = len(days) if last_day is None else bisect_right(days, last_day)
+    return start, max(start, stop)
+
+def _ordinal(column):
+    # date.toordinal() computed in the database
+    if db.engine.dialect.name == 'sqlite':
+        return cast(func.julianday(column) - 1721424.5, Integer)  # julianday of day 1 is 1721425.5
+    return cast(column - literal('0001-01-01').cast(db.Date), Integer) + 1
+
+class HistoryCache(LRUCache):
+    """Per-user history snapshots, bounded by total size in bytes.
+
+    Entries are checked against the user's rollup version, which every write
+    bumps, so a snapshot another process made stale is rebuilt rather than
+    served. Write paths in this process also drop the entry straight away.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        super().__init__(maxsize=sys.maxsize)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['HISTORY_CACHE_MAX_MB'] * 1024 * 1024)
+
+    def snapshot(self, user_id, version):
+        with self._lock:
+            history = self._data.get(user_id)
+            if history is not None and version is not None and history.version == version:
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return history
+            self.misses += 1
+
+        # Built outside the lock; two requests may race to build the same one
+        history = UserHistory.load(user_id, version)
+        if version is not None:  # without a rollup row there is nothing to check it against later
+            self.set(user_id, history)
+        return history
+
+    def _store(self, key, value):
+        previous = self._data.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous.nbytes
+        if value.nbytes > self.max_bytes:
+            return
+        self._data[key] = value
+        self.bytes += value.nbytes
+        while self.bytes > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def invalidate(self, user_id):
+        if self.pop(user_id) is not None:
+            self.invalidations += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            history = self._data.pop(key, None)
+            if history is None:
+                return default
+            self.bytes -= history.nbytes
+            return history
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+def history_cache():
+    return current_app.extensions['history_cache']
+
+def user_history(user_id):
+    # The conditional GET validator has usually read the version already
+    version = g.get('stats_versions', {}).get(user_id)
+    if version is None:
+        version = db.session.query(UserStats.version).filter_by(user_id=user_id).scalar()
+    return history_cache().snapshot(user_id, version)
+
+def invalidate(user_id):
+    history_cache().invalidate(user_id)
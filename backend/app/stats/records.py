@@ -0,0 +1,118 @@
+from sqlalchemy import and_, case, func
+from app import db
+from app.models import Workout, WorkoutExercise, PersonalRecord
+
+# Personal records are part of the per-user rollup: rollup.rebuild() rebuilds
+# them, and the write paths call changed() after flushing, like the rollup
+# hooks. A new value only has to beat the stored one; removing a value that
+# held a record recomputes just that (user, exercise) pair from its rows.
+
+RECORD_FIELDS = ('max_weight', 'max_reps', 'max_distance', 'best_duration', 'estimated_one_rep_max')
+
+def estimated_one_rep_max(weight, reps):
+    # Epley's formula, for weighted sets only
+    if weight is None or reps is None or weight <= 0 or reps <= 0:
+        return None
+    return weight * (1 + reps / 30)
+
+def entry(exercise_id, weight=None, reps=None, distance=None, duration=None):
+    """The (exercise_id, values) one workout exercise row contributes."""
+    return exercise_id, {
+        'max_weight': weight,
+        'max_reps': reps,
+        'max_distance': distance,
+        'best_duration': duration,
+        'estimated_one_rep_max': estimated_one_rep_max(weight, reps)
+    }
+
+def entry_of(workout_exercise):
+    return entry(workout_exercise.exercise_id, workout_exercise.weight, workout_exercise.reps,
+                 workout_exercise.distance, workout_exercise.duration)
+
+def compute_live(user_id, exercise_ids=None):
+    # {exercise_id: values} straight from the workout tables, in one GROUP BY.
+    # Exercises logged without any measurement have no record.
+    one_rep_max = case((
+        and_(WorkoutExercise.weight > 0, WorkoutExercise.reps > 0),
+        WorkoutExercise.weight * (1 + WorkoutExercise.reps / 30.0)
+    ))
+    query = db.session.query(
+        WorkoutExercise.exercise_id,
+        func.max(WorkoutExercise.weight),
+        func.max(WorkoutExercise.reps),
+        func.max(WorkoutExercise.distance),
+        func.max(WorkoutExercise.duration),
+        func.max(one_rep_max)
+    ).join(
+        Workout, Workout.id == WorkoutExercise.workout_id
+    ).filter(
+        Workout.user_id == user_id
+    )
+    if exercise_ids is not None:
+        query = query.filter(WorkoutExercise.exercise_id.in_(exercise_ids))
+
+    return {
+        exercise_id: dict(zip(RECORD_FIELDS, values))
+        for exercise_id, *values in query.group_by(WorkoutExercise.exercise_id)
+        if any(value is not None for value in values)
+    }
+
+def rebuild(user_id):
+    PersonalRecord.query.filter_by(user_id=user_id).delete()
+    for exercise_id, values in compute_live(user_id).items():
+        db.session.add(PersonalRecord(user_id=user_id, exercise_id=exercise_id, **values))
+
+def changed(user_id, added=(), removed=()):
+    # `added` and `removed` are entry() pairs; an edited row is removed with
+    # its old values and added with its new ones. All affected records are
+    # read in one query.
+    added, removed = list(added), list(removed)
+    exercise_ids = {exercise_id for exercise_id, _ in added + removed}
+    if not exercise_ids:
+        return
+
+    records = {record.exercise_id: record for record in PersonalRecord.query.filter(
+        PersonalRecord.user_id == user_id,
+        PersonalRecord.exercise_id.in_(exercise_ids)
+    )}
+
+    # A removed value below the record can't have been the record
+    stale = {
+        exercise_id for exercise_id, values in removed
+        if any(_beats(value, records.get(exercise_id), field, ties=True) for field, value in values.items())
+    }
+    if stale:
+        live = compute_live(user_id, stale)
+        for exercise_id in stale:
+            _store(user_id, records, exercise_id, live.get(exercise_id))
+
+    for exercise_id, values in added:
+        if exercise_id in stale:  # the recomputed values already include it
+            continue
+        record = records.get(exercise_id)
+        raised = {field: value for field, value in values.items() if _beats(value, record, field)}
+        if raised:
+            _store(user_id, records, exercise_id, dict(_values(record), **raised))
+
+def _beats(value, record, field, ties=False):
+    if value is None:
+        return False
+    current = getattr(record, field) if record is not None else None
+    return current is None or value > current or (ties and value == current)
+
+def _values(record):
+    return {field: getattr(record, field) for field in RECORD_FIELDS} if record is not None else {}
+
+def _store(user_id, records, exercise_id, values):
+    record = records.get(exercise_id)
+    if values is None:
+        if record is not None:
+            db.session.delete(record)
+            del records[exercise_id]
+        return
+
+    if record is None:
+        record = records[exercise_id] = PersonalRecord(user_id=user_id, exercise_id=exercise_id)
+        db.session.add(record)
+    for field in RECORD_FIELDS:
+        setattr(record, field, values.get(field))
@@ -0,0 +1,217 @@
+from datetime import datetime
+from sqlalchemy import func
+from app import db
+from app.models import Workout, WorkoutExercise, UserStats, UserExerciseStats
+from app.stats import records, streaks
+
+# The write hooks below expect the triggering change to already be flushed, so
+# that a missing rollup row can be built from the live tables without
+# double-counting it. They never commit; the caller's transaction does.
+# Every hook bumps the row's version, which backs the conditional GET
+# validators in app/conditional.py.
+
+def compute_live(user_id):
+    # Summary values straight from the workout tables
+    total_workouts, total_duration, last_workout_date = db.session.query(
+        func.count(Workout.id),
+        func.coalesce(func.sum(Workout.duration), 0),
+        func.max(Workout.date)
+    ).filter(Workout.user_id == user_id).one()
+
+    exercise_counts = dict(db.session.query(
+        WorkoutExercise.exercise_id, func.count(WorkoutExercise.id)
+    ).join(
+        Workout, Workout.id == WorkoutExercise.workout_id
+    ).filter(
+        Workout.user_id == user_id
+    ).group_by(
+        WorkoutExercise.exercise_id
+    ).all())
+
+    return {
+        'total_workouts': total_workouts,
+        'total_duration': total_duration,
+        'last_workout_date': last_workout_date,
+        'exercise_counts': exercise_counts
+    }
+
+def rebuild(user_id):
+    live = compute_live(user_id)
+
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        stats = UserStats(user_id=user_id)
+        db.session.add(stats)
+
+    stats.total_workouts = live['total_workouts']
+    stats.total_duration = live['total_duration']
+    stats.last_workout_date = live['last_workout_date']
+
+    UserExerciseStats.query.filter_by(user_id=user_id).delete()
+    for exercise_id, count in live['exercise_counts'].items():
+        db.session.add(UserExerciseStats(user_id=user_id, exercise_id=exercise_id, count=count))
+
+    _set_most_frequent(stats, _top_exercise(live['exercise_counts']))
+    records.rebuild(user_id)
+    streaks.rebuild(user_id, stats)
+    _touch(stats)
+    db.session.flush()
+
+    return stats
+
+def workout_added(workout):
+    stats = db.session.get(UserStats, workout.user_id)
+    if stats is None:
+        rebuild(workout.user_id)
+        return
+
+    stats.total_workouts += 1
+    stats.total_duration += workout.duration or 0
+    if workout.date and (stats.last_workout_date is None or workout.date > stats.last_workout_date):
+        stats.last_workout_date = workout.date
+    streaks.day_added(stats, workout.date)
+    _touch(stats)
+
+def workout_updated(workout, old_date, old_duration):
+    stats = db.session.get(UserStats, workout.user_id)
+    if stats is None:
+        rebuild(workout.user_id)
+        return
+
+    stats.total_duration += (workout.duration or 0) - (old_duration or 0)
+    if workout.date != old_date:
+        if workout.date and (stats.last_workout_date is None or workout.date > stats.last_workout_date):
+            stats.last_workout_date = workout.date
+        elif old_date == stats.last_workout_date:
+            stats.last_workout_date = _last_workout_date(workout.user_id)
+        streaks.day_removed(stats, old_date)
+        streaks.day_added(stats, workout.date)
+    _touch(stats)
+
+def workout_deleted(user_id, date, duration, exercise_ids):
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        rebuild(user_id)
+        return
+
+    stats.total_workouts -= 1
+    stats.total_duration -= duration or 0
+    if date == stats.last_workout_date:
+        stats.last_workout_date = _last_workout_date(user_id)
+
+    for exercise_id in exercise_ids:
+        _decrement_exercise(stats, exercise_id)
+    streaks.day_removed(stats, date)
+    _touch(stats)
+
+def exercise_added(user_id, exercise_id):
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        rebuild(user_id)
+        return
+
+    row = db.session.get(UserExerciseStats, (user_id, exercise_id))
+    if row is None:
+        row = UserExerciseStats(user_id=user_id, exercise_id=exercise_id, count=0)
+        db.session.add(row)
+    row.count += 1
+
+    # Ties go to the lowest exercise id, matching rebuild()
+    if (row.count, -exercise_id) > (stats.most_frequent_exercise_count, -(stats.most_frequent_exercise_id or 0)):
+        _set_most_frequent(stats, (exercise_id, row.count))
+    _touch(stats)
+
+def exercise_updated(user_id):
+    # Sets, reps and the like aren't rolled up, but cached responses change
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        rebuild(user_id)
+        return
+
+    _touch(stats)
+
+def exercise_removed(user_id, exercise_id):
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        rebuild(user_id)
+        return
+
+    _decrement_exercise(stats, exercise_id)
+    _touch(stats)
+
+def exercises_changed(user_id, deltas):
+    # Batch form of exercise_added/exercise_removed for {exercise_id: net
+    # change}, reading every affected counter in one query
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        rebuild(user_id)
+        return
+
+    deltas = {exercise_id: delta for exercise_id, delta in deltas.items() if delta}
+    rows = {row.exercise_id: row for row in UserExerciseStats.query.filter(
+        UserExerciseStats.user_id == user_id,
+        UserExerciseStats.exercise_id.in_(deltas)
+    )} if deltas else {}
+
+    top_decreased = False
+    for exercise_id, delta in sorted(deltas.items()):
+        row = rows.get(exercise_id)
+        if row is None:
+            if delta < 0:
+                continue
+            row = UserExerciseStats(user_id=user_id, exercise_id=exercise_id, count=0)
+            db.session.add(row)
+        row.count += delta
+        if row.count <= 0:
+            db.session.delete(row)
+
+        if delta < 0 and exercise_id == stats.most_frequent_exercise_id:
+            top_decreased = True
+        elif delta > 0 and (row.count, -exercise_id) > (stats.most_frequent_exercise_count, -(stats.most_frequent_exercise_id or 0)):
+            _set_most_frequent(stats, (exercise_id, row.count))
+
+    if top_decreased:
+        db.session.flush()
+        _set_most_frequent(stats, _stored_top_exercise(user_id))
+    _touch(stats)
+
+def _stored_top_exercise(user_id):
+    return db.session.query(
+        UserExerciseStats.exercise_id, UserExerciseStats.count
+    ).filter(
+        UserExerciseStats.user_id == user_id
+    ).order_by(
+        UserExerciseStats.count.desc(), UserExerciseStats.exercise_id.asc()
+    ).first()
+
+def _decrement_exercise(stats, exercise_id):
+    row = db.session.get(UserExerciseStats, (stats.user_id, exercise_id))
+    if row is None:
+        return
+
+    row.count -= 1
+    if row.count <= 0:
+        db.session.delete(row)
+
+    if exercise_id == stats.most_frequent_exercise_id:
+        db.session.flush()
+        _set_most_frequent(stats, _stored_top_exercise(stats.user_id))
+
+def _touch(stats):
+    stats.version = (stats.version or 0) + 1
+    stats.updated_at = datetime.utcnow()
+
+def _last_workout_date(user_id):
+    db.session.flush()
+    return db.session.query(func.max(Workout.date)).filter(Workout.user_id == user_id).scalar()
+
+def _top_exercise(exercise_counts):
+    if not exercise_counts:
+        return None
+    return min(exercise_counts.items(), key=lambda item: (-item[1], item[0]))
+
+def _set_most_frequent(stats, top):
+    if top:
+        stats.most_frequent_exercise_id, stats.most_frequent_exercise_count = top
+    else:
+        stats.most_frequent_exercise_id, stats.most_frequent_exercise_count = None, 0
@@ -1,126 +1,314 @@
-from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func, extract
-from datetime import datetime, timedelta
+import calendar
+from flask import request, jsonify, current_app
+from flask_jwt_extended import jwt_required, current_user
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, contains_eager
+from datetime import date, datetime, timedelta
 from app import db
-from app.models import Workout, WorkoutExercise, Exercise
-from app.stats import stats_bp
+from app.models import Workout, Exercise, UserStats, PersonalRecord
+from app.stats import stats_bp, rollup, timeseries, analytics, history, streaks
+from app.conditional import conditional
+from app.database import use_primary
 
 @stats_bp.route('/summary', methods=['GET'])
 @jwt_required()
+@conditional(daily=True)
 def get_summary_stats():
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     
-    # Get total workouts
-    total_workouts = Workout.query.filter_by(user_id=user_id).count()
+    # Totals, most frequent exercise and last workout come from the rollup row,
+    # which is built on first access for users that don't have one yet
+    user_stats = db.session.get(UserStats, user_id, options=[joinedload(UserStats.most_frequent_exercise)])
+    if user_stats is None:
+        # The replica may just be behind, so the rebuild reads the primary
+        with use_primary():
+            user_stats = rollup.rebuild(user_id)
+            db.session.commit()
     
-    # Get total workout duration
-    total_duration = db.session.query(func.sum(Workout.duration)).filter(Workout.user_id == user_id).scalar() or 0
+    most_frequent_exercise = user_stats.most_frequent_exercise
     
-    # Get workout counts by category (last 30 days)
+    # The 30-day window slides with the calendar, so it is counted from the
+    # user's history snapshot
     thirty_days_ago = datetime.utcnow().date() - timedelta(days=30)
-    workouts_last_30_days = Workout.query.filter(
-        Workout.user_id == user_id,
-        Workout.date >= thirty_days_ago
-    ).count()
-    
-    # Get most frequent exercise
-    most_frequent_exercise = db.session.query(
-        Exercise.name, func.count(WorkoutExercise.exercise_id).label('count')
-    ).join(
-        WorkoutExercise, WorkoutExercise.exercise_id == Exercise.id
-    ).join(
-        Workout, Workout.id == WorkoutExercise.workout_id
-    ).filter(
-        Workout.user_id == user_id
-    ).group_by(
-        Exercise.name
-    ).order_by(
-        func.count(WorkoutExercise.exercise_id).desc()
-    ).first()
-    
-    most_frequent_exercise_name = most_frequent_exercise[0] if most_frequent_exercise else None
-    
-    # Get last workout date
-    last_workout = Workout.query.filter_by(user_id=user_id).order_by(Workout.date.desc()).first()
-    last_workout_date = last_workout.date.isoformat() if last_workout else None
+    start, stop = history.user_history(user_id).workout_range(thirty_days_ago.toordinal())
+    workouts_last_30_days = stop - start
     
     return jsonify({
-        'total_workouts': total_workouts,
-        'total_duration_minutes': total_duration,
+        'total_workouts': user_stats.total_workouts,
+        'total_duration_minutes': user_stats.total_duration,
         'workouts_last_30_days': workouts_last_30_days,
-        'most_frequent_exercise': most_frequent_exercise_name,
-        'last_workout_date': last_workout_date
+        'most_frequent_exercise': most_frequent_exercise.name if most_frequent_exercise else None,
+        'last_workout_date': user_stats.last_workout_date.isoformat() if user_stats.last_workout_date else None
     })
 
 @stats_bp.route('/monthly', methods=['GET'])
 @jwt_required()
+@conditional(daily=True)
 def get_monthly_stats():
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     
     # Get monthly workout counts for the last 12 months
-    current_month = datetime.utcnow().month
-    current_year = datetime.utcnow().year
-    
-    monthly_stats = []
-    
-    for i in range(12):
-        # Calculate month and year (going backwards from current month)
-        month = (current_month - i) % 12
-        month = 12 if month == 0 else month  # Handle December
-        year = current_year if month <= current_month else current_year - 1
-        
-        # Count workouts for this month
-        count = Workout.query.filter(
-            Workout.user_id == user_id,
-            extract('month', Workout.date) == month,
-            extract('year', Workout.date) == year
-        ).count()
-        
-        # Calculate total duration for this month
-        duration = db.session.query(func.sum(Workout.duration)).filter(
-            Workout.user_id == user_id,
-            extract('month', Workout.date) == month,
-            extract('year', Workout.date) == year
-        ).scalar() or 0
-        
-        monthly_stats.append({
-            'year': year,
-            'month': month,
-            'count': count,
-            'duration': duration
-        })
+    today = datetime.utcnow().date()
+    series = timeseries.aggregate(user_id, 'month', timeseries.shift_buckets(today, 'month', 11), today)
+    
+    monthly_stats = [{
+        'year': int(entry['start'][:4]),
+        'month': int(entry['start'][5:7]),
+        'count': entry['count'],
+        'duration': entry['duration']
+    } for entry in reversed(series)]
     
     return jsonify(monthly_stats)
 
+@stats_bp.route('/calendar', methods=['GET'])
+@jwt_required()
+@conditional(daily=True)
+def get_calendar():
+    user_id = current_user.id
+    today = datetime.utcnow().date()
+    
+    try:
+        year = int(request.args.get('year', today.year))
+        first_day = date(year, 1, 1)
+    except ValueError:
+        return jsonify({'error': "'year' must be a year between 1 and 9999"}), 400
+    
+    # One GROUP BY over the year's range of the (user_id, date) index, laid
+    # out as dense arrays: slot i is January 1st + i days, and slot 365 stays
+    # 0 outside leap years
+    counts, durations = [0] * 366, [0] * 366
+    rows = db.session.query(
+        Workout.date,
+        func.count(Workout.id),
+        func.coalesce(func.sum(Workout.duration), 0)
+    ).filter(
+        Workout.user_id == user_id,
+        Workout.date >= first_day,
+        Workout.date <= date(year, 12, 31)
+    ).group_by(Workout.date)
+    for day, count, duration in rows:
+        slot = (day - first_day).days
+        counts[slot], durations[slot] = count, duration
+    
+    # Streaks are kept up to date on every write, as part of the rollup
+    user_stats = db.session.get(UserStats, user_id)
+    if user_stats is None:
+        with use_primary():
+            user_stats = rollup.rebuild(user_id)
+            db.session.commit()
+    
+    return jsonify({
+        'year': year,
+        'days': 366 if calendar.isleap(year) else 365,
+        'counts': counts,
+        'durations': durations,
+        'current_streak': streaks.current(user_id, today),
+        'longest_streak': user_stats.longest_streak
+    })
+
+@stats_bp.route('/timeseries', methods=['GET'])
+@jwt_required()
+@conditional(daily=True)
+def get_timeseries_stats():
+    user_id = current_user.id
+    bucket = request.args.get('bucket', 'month')
+    
+    if bucket not in timeseries.BUCKETS:
+        return jsonify({'error': f"Bucket must be one of: {', '.join(timeseries.BUCKETS)}"}), 400
+    
+    try:
+        end = _parse_date(request.args.get('to')) or datetime.utcnow().date()
+        start = _parse_date(request.args.get('from')) or timeseries.shift_buckets(end, bucket, 11)
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    
+    if start > end:
+        return jsonify({'error': "'from' must not be after 'to'"}), 400
+    if timeseries.count_buckets(start, end, bucket) > timeseries.MAX_BUCKETS:
+        return jsonify({'error': f'Range spans more than {timeseries.MAX_BUCKETS} buckets'}), 400
+    
+    return jsonify({
+        'bucket': bucket,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'series': timeseries.aggregate(user_id, bucket, start, end)
+    })
+
+def _parse_date(value):
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+@stats_bp.route('/rebuild', methods=['POST'])
+@jwt_required()
+def rebuild_stats():
+    from app.jobs import accepted
+    from app.jobs.queue import enqueue
+    
+    # Recomputed by the background worker; poll the job for the new totals
+    job = enqueue('stats.rebuild', current_user.id)
+    db.session.commit()
+    
+    return accepted(job)
+
 @stats_bp.route('/exercises', methods=['GET'])
 @jwt_required()
+@conditional()
 def get_exercise_stats():
-    user_id = get_jwt_identity()
-    
-    # Get exercise frequency
-    exercise_stats = db.session.query(
-        Exercise.id,
-        Exercise.name,
-        Exercise.category,
-        func.count(WorkoutExercise.exercise_id).label('count')
-    ).join(
-        WorkoutExercise, WorkoutExercise.exercise_id == Exercise.id
-    ).join(
-        Workout, Workout.id == WorkoutExercise.workout_id
-    ).filter(
-        Workout.user_id == user_id
-    ).group_by(
-        Exercise.id, Exercise.name, Exercise.category
-    ).order_by(
-        func.count(WorkoutExercise.exercise_id).desc()
-    ).all()
+    user_id = current_user.id
+    
+    # Exercise frequency from the history snapshot; only the names are queried
+    counts = current_app.extensions['analytics'].exercise_counts(history.user_history(user_id))
+    exercises = {exercise.id: exercise for exercise in Exercise.query.filter(Exercise.id.in_(counts))} if counts else {}
     
     result = [{
-        'id': stat[0],
-        'name': stat[1],
-        'category': stat[2],
-        'count': stat[3]
-    } for stat in exercise_stats]
+        'id': exercise_id,
+        'name': exercises[exercise_id].name,
+        'category': exercises[exercise_id].category,
+        'count': count
+    } for exercise_id, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
     
     return jsonify(result)
+
+@stats_bp.route('/records', methods=['GET'])
+@jwt_required()
+@conditional()
+def get_personal_records():
+    user_id = current_user.id
+    
+    # Records are kept up to date on every write, so this is a read of the
+    # user's rows rather than a scan of their history
+    query = PersonalRecord.query.join(
+        Exercise, Exercise.id == PersonalRecord.exercise_id
+    ).options(
+        contains_eager(PersonalRecord.exercise)
+    ).filter(
+        PersonalRecord.user_id == user_id
+    ).order_by(Exercise.name)
+    
+    personal_records = query.all()
+    if not personal_records and _build_rollup(user_id):
+        personal_records = query.all()
+    
+    return jsonify([record.to_dict() for record in personal_records])
+
+@stats_bp.route('/records/<int:exercise_id>', methods=['GET'])
+@jwt_required()
+@conditional()
+def get_personal_record(exercise_id):
+    user_id = current_user.id
+    query = PersonalRecord.query.options(joinedload(PersonalRecord.exercise)).filter_by(user_id=user_id, exercise_id=exercise_id)
+    
+    record = query.first()
+    if record is None and _build_rollup(user_id):
+        record = query.first()
+    if record is None:
+        return jsonify({'error': 'No record for this exercise'}), 404
+    
+    return jsonify(record.to_dict())
+
+def _build_rollup(user_id):
+    # Users whose rollup was never built have no records yet either
+    if db.session.query(UserStats.user_id).filter_by(user_id=user_id).first() is not None:
+        return False
+    with use_primary():
+        rollup.rebuild(user_id)
+        db.session.commit()
+    return True
+
+@stats_bp.route('/cache', methods=['GET'])
+@jwt_required()
+def get_history_cache_stats():
+    # Footprint and hit rate of this process's history snapshots
+    return jsonify(history.history_cache().stats())
+
+@stats_bp.route('/load', methods=['GET'])
+@jwt_required()
+@conditional(daily=True)
+def get_training_load():
+    user_id = current_user.id
+    
+    try:
+        end = _parse_date(request.args.get('to')) or datetime.utcnow().date()
+        start = _parse_date(request.args.get('from')) or end - timedelta(days=min(89, end.toordinal() - 1))
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    
+    # The chronic window needs the weeks before the range too, and datetime
+    # can't represent days before 0001-01-01
+    earliest = date.min + timedelta(days=analytics.CHRONIC_DAYS - 1)
+    if start > end:
+        return jsonify({'error': "'from' must not be after 'to'"}), 400
+    if start < earliest:
+        return jsonify({'error': f"'from' must not be before {earliest.isoformat()}"}), 400
+    if (end - start).days >= timeseries.MAX_BUCKETS:
+        return jsonify({'error': f'Range spans more than {timeseries.MAX_BUCKETS} days'}), 400
+    
+    history_start = start - timedelta(days=analytics.CHRONIC_DAYS - 1)
+    first_day = history_start.toordinal()
+    tonnage, acute, chronic, ratio = current_app.extensions['analytics'].training_load(
+        history.user_history(user_id), first_day, (end - history_start).days + 1
+    )
+    
+    skip = analytics.CHRONIC_DAYS - 1
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'acute_days': analytics.ACUTE_DAYS,
+        'chronic_days': analytics.CHRONIC_DAYS,
+        'series': [{
+            'date': date.fromordinal(first_day + i).isoformat(),
+            'tonnage': round(tonnage[i], 1),
+            'acute': round(acute[i], 1),
+            'chronic': round(chronic[i], 1),
+            'ratio': round(ratio[i], 2) if ratio[i] is not None else None
+        } for i in range(skip, len(tonnage))]
+    })
+
+@stats_bp.route('/progress/<int:exercise_id>', methods=['GET'])
+@jwt_required()
+@conditional()
+def get_exercise_progress(exercise_id):
+    user_id = current_user.id
+    exercise = db.session.get(Exercise, exercise_id)
+    if exercise is None:
+        return jsonify({'error': 'Exercise not found'}), 404
+    
+    try:
+        start = _parse_date(request.args.get('from'))
+        end = _parse_date(request.args.get('to'))
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    
+    backend = current_app.extensions['analytics']
+    days, max_weight, epley, brzycki = backend.progress(
+        history.user_history(user_id), exercise_id,
+        start.toordinal() if start else None,
+        end.toordinal() if end else None
+    )
+    
+    return jsonify({
+        'exercise_id': exercise.id,
+        'exercise': exercise.name,
+        'points': [{
+            'date': date.fromordinal(day).isoformat(),
+            'max_weight': max_weight[i],
+            'epley': round(epley[i], 1),
+            'brzycki': round(brzycki[i], 1) if brzycki[i] is not None else None
+        } for i, day in enumerate(days)],
+        'trend': {
+            'epley': _trend_line(backend.trend(days, epley), days),
+            'brzycki': _trend_line(backend.trend(days, brzycki), days)
+        }
+    })
+
+def _trend_line(fit, days):
+    # Slope per week and the fitted values at both ends of the history
+    if fit is None:
+        return None
+    slope, intercept = fit
+    return {
+        'slope_per_week': round(slope * 7, 2),
+        'start': round(slope * days[0] + intercept, 1),
+        'end': round(slope * days[-1] + intercept, 1)
+    }
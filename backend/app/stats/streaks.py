@@ -0,0 +1,101 @@
+from datetime import timedelta
+from sqlalchemy import func
+from app import db
+from app.models import Workout, WorkoutStreak
+
+# Workout streaks are part of the per-user rollup. A user's training days are
+# stored as their maximal runs of consecutive days, so a workout landing on a
+# new day extends or joins the runs next to it, and removing a day's last
+# workout splits the run around it; neither looks at the rest of the history.
+# UserStats.longest_streak is recomputed from the runs only when the longest
+# run itself is split.
+
+def runs(days):
+    # [(start, end)] for sorted, distinct dates
+    result = []
+    for day in days:
+        if result and result[-1][1] == day - timedelta(days=1):
+            result[-1][1] = day
+        else:
+            result.append([day, day])
+    return [tuple(run) for run in result]
+
+def compute_live(user_id):
+    days = [day for (day,) in db.session.query(Workout.date).filter(
+        Workout.user_id == user_id, Workout.date.isnot(None)
+    ).group_by(Workout.date).order_by(Workout.date)]
+    return runs(days)
+
+def rebuild(user_id, stats):
+    WorkoutStreak.query.filter_by(user_id=user_id).delete()
+    longest = 0
+    for start, end in compute_live(user_id):
+        length = (end - start).days + 1
+        db.session.add(WorkoutStreak(user_id=user_id, start_date=start, end_date=end, days=length))
+        longest = max(longest, length)
+    stats.longest_streak = longest
+
+def current(user_id, today):
+    # The latest run counts while it ends today or yesterday
+    run = _run_at_or_before(user_id, today)
+    if run is None or run.end_date < today - timedelta(days=1):
+        return 0
+    return (min(run.end_date, today) - run.start_date).days + 1
+
+def day_added(stats, day):
+    # After a workout was flushed on `day`
+    if day is None:
+        return
+    one = timedelta(days=1)
+    before = _run_at_or_before(stats.user_id, day)
+    if before is not None and before.end_date >= day:
+        return  # already a training day
+
+    after = db.session.get(WorkoutStreak, (stats.user_id, day + one))
+    end = after.end_date if after is not None else day
+    if after is not None:
+        db.session.delete(after)
+    if before is not None and before.end_date == day - one:
+        _set_end(before, end)
+        run = before
+    else:
+        run = WorkoutStreak(user_id=stats.user_id, start_date=day, end_date=end, days=(end - day).days + 1)
+        db.session.add(run)
+    stats.longest_streak = max(stats.longest_streak, run.days)
+
+def day_removed(stats, day):
+    # After a workout on `day` was deleted or moved away and flushed
+    if day is None or db.session.query(Workout.id).filter(
+        Workout.user_id == stats.user_id, Workout.date == day
+    ).first() is not None:
+        return
+
+    run = _run_at_or_before(stats.user_id, day)
+    if run is None or run.end_date < day:
+        return
+    one = timedelta(days=1)
+    was_longest = run.days == stats.longest_streak
+    end = run.end_date
+
+    if run.start_date == day:
+        db.session.delete(run)
+    else:
+        _set_end(run, day - one)
+    if end > day:
+        db.session.add(WorkoutStreak(user_id=stats.user_id, start_date=day + one, end_date=end, days=(end - day).days))
+
+    if was_longest:
+        stats.longest_streak = db.session.query(
+            func.coalesce(func.max(WorkoutStreak.days), 0)
+        ).filter(WorkoutStreak.user_id == stats.user_id).scalar()
+
+def _run_at_or_before(user_id, day):
+    # The run starting on or closest before `day`, along the primary key
+    return WorkoutStreak.query.filter(
+        WorkoutStreak.user_id == user_id,
+        WorkoutStreak.start_date <= day
+    ).order_by(WorkoutStreak.start_date.desc()).first()
+
+def _set_end(run, end):
+    run.end_date = end
+    run.days = (end - run.start_date).days + 1
@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+from flask import current_app
+from app.stats.history import user_history
+
+BUCKETS = ('day', 'week', 'month', 'year')
+
+# Upper bound on zero-filled buckets per request (a little over 5 years of days)
+MAX_BUCKETS = 2000
+
+def bucket_start(day, bucket):
+    # Weeks start on Monday, matching SQLite's 'weekday 1' modifier
+    if bucket == 'day':
+        return day
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    if bucket == 'year':
+        return day.replace(month=1, day=1)
+    raise ValueError(f'Unknown bucket: {bucket}')
+
+def next_bucket(start, bucket):
+    if bucket == 'day':
+        return start + timedelta(days=1)
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    if bucket == 'year':
+        return start.replace(year=start.year + 1)
+    raise ValueError(f'Unknown bucket: {bucket}')
+
+def shift_buckets(day, bucket, count):
+    # Start of the bucket `count` periods before the one containing `day`,
+    # stopping at the first day datetime can represent
+    start = bucket_start(day, bucket)
+    try:
+        if bucket == 'day':
+            return start - timedelta(days=count)
+        if bucket == 'week':
+            return start - timedelta(weeks=count)
+        if bucket == 'month':
+            months = start.year * 12 + start.month - 1 - count
+            return date(months // 12, months % 12 + 1, 1)
+        return start.replace(year=start.year - count)
+    except (OverflowError, ValueError):
+        return date.min
+
+def iter_buckets(start, end, bucket):
+    current = bucket_start(start, bucket)
+    while current <= end:
+        yield current
+        try:
+            current = next_bucket(current, bucket)
+        except (OverflowError, ValueError):
+            return  # the last bucket datetime can represent
+
+def count_buckets(start, end, bucket):
+    if bucket == 'day':
+        return (end - start).days + 1
+    if bucket == 'week':
+        return (bucket_start(end, 'week') - bucket_start(start, 'week')).days // 7 + 1
+    if bucket == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return end.year - start.year + 1
+
+def aggregate(user_id, bucket, start, end):
+    if bucket not in BUCKETS:
+        raise ValueError(f'Unknown bucket: {bucket}')
+
+    # Workout count, minutes and exercise volume (sets x reps x weight) per
+    # bucket, from the user's cached history
+    totals = current_app.extensions['analytics'].buckets(user_history(user_id), bucket, start.toordinal(), end.toordinal())
+
+    # Zero-fill buckets that had no workouts
+    series = []
+    for bucket_date in iter_buckets(start, end, bucket):
+        count, duration, total_volume = totals.get(bucket_date.toordinal(), (0, 0, 0))
+        series.append({
+            'start': bucket_date.isoformat(),
+            'count': count,
+            'duration': duration,
+            'volume': total_volume
+        })
+
+    return series
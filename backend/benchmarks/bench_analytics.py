@@ -0,0 +1,86 @@
+"""Stats computations over one user's long history, from the cached snapshot.
+
+Times building the user's history snapshot (the cost of the first stats
+request after a write), each analytics backend on the snapshot, and the
+stats endpoints end to end with a warm and a cold cache.
+
+    python benchmarks/bench_analytics.py --rows 50000
+"""
+import argparse
+import statistics
+import time
+from datetime import date
+
+from common import bench_app, auth_headers
+import dataset
+
+def timed(function, repeat, before=None):
+    timings = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000, help='Exercise rows for the user')
+    parser.add_argument('--exercises-per-workout', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with bench_app() as app:
+        from app import db
+        from app.models import User, WorkoutExercise
+        from app.stats import analytics, history
+        from sqlalchemy import func
+
+        ids = dataset.generate(users=1, workouts=args.rows // args.exercises_per_workout,
+                               exercises_per_workout=args.exercises_per_workout)
+        user = db.session.get(User, ids['user_ids'][0])
+        exercise_id = db.session.query(WorkoutExercise.exercise_id).group_by(
+            WorkoutExercise.exercise_id
+        ).order_by(func.count().desc()).first()[0]
+        _, headers = auth_headers(app, user.username)
+        client = app.test_client()
+        cache = history.history_cache()
+
+        # The dataset spans 2020-2023; the load range covers all of it
+        start, end = date(2020, 1, 1), date(2023, 12, 31)
+        first_day, length = date(2019, 12, 5).toordinal(), (end - date(2019, 12, 5)).days + 1
+
+        snapshot = history.UserHistory.load(user.id)
+        print(f'{len(snapshot.workout_days)} workouts, {len(snapshot.set_days)} exercise rows, '
+              f'{snapshot.nbytes / 1024:.0f} KiB snapshot')
+        print(f"{'build snapshot':32} {timed(lambda: history.UserHistory.load(user.id), args.repeat):8.2f} ms")
+
+        backends = ['python'] + (['numpy'] if analytics.np is not None else [])
+        for name in backends:
+            backend = analytics.analytics_backend(name)
+            computations = {
+                'training_load': lambda: backend.training_load(snapshot, first_day, length),
+                'progress + trend': lambda: backend.trend(*backend.progress(snapshot, exercise_id)[::2]),
+                'weekly buckets': lambda: backend.buckets(snapshot, 'week', start.toordinal(), end.toordinal()),
+                'exercise_counts': lambda: backend.exercise_counts(snapshot)
+            }
+            for label, compute in computations.items():
+                print(f'{name + " " + label:32} {timed(compute, args.repeat):8.2f} ms')
+
+        paths = ['/stats/summary', '/stats/exercises', '/stats/timeseries?bucket=week&from=2020-01-01&to=2023-12-31',
+                 f'/stats/load?from={start}&to={end}', f'/stats/progress/{exercise_id}']
+        for name in backends:
+            app.extensions['analytics'] = analytics.analytics_backend(name)
+            for path in paths:
+                fetch = lambda: client.get(path, headers=headers).get_data()
+                warm = timed(fetch, args.repeat)
+                cold = timed(fetch, args.repeat, before=cache.clear)
+                print(f'{name + " GET " + path.split("?")[0][:20]:32} {warm:8.2f} ms warm {cold:8.2f} ms cold')
+
+        print(f'cache: {cache.stats()}')
+        if analytics.np is None:
+            print('numpy is not installed; only the pure-Python backend was measured')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Per-row requests vs. one PATCH for the same edit to a workout's exercises.
+
+Each round starts from a workout with 2 * --ops rows and applies --ops adds,
+--ops updates and --ops deletes, either as one POST/PUT/DELETE request each
+or as a single PATCH /api/workouts/<id>/exercises.
+
+    python benchmarks/bench_batch_exercises.py --ops 5 --rounds 50
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import event, insert
+
+from common import bench_app, auth_headers, seed_exercises
+
+EXERCISES = ['Squats', 'Bench Press', 'Deadlift', 'Running', 'Rowing', 'Pull-ups', 'Push-ups', 'Lunges']
+
+def new_workout(user_id, exercise_ids, rows):
+    from app import db
+    from app.models import Workout, WorkoutExercise
+
+    workout = Workout(user_id=user_id, name='Batch', duration=60)
+    db.session.add(workout)
+    db.session.flush()
+    db.session.execute(insert(WorkoutExercise), [
+        {'workout_id': workout.id, 'exercise_id': exercise_ids[i % len(exercise_ids)], 'sets': 3, 'reps': 10}
+        for i in range(rows)
+    ])
+    db.session.commit()
+    row_ids = [row.id for row in WorkoutExercise.query.filter_by(workout_id=workout.id).order_by(WorkoutExercise.id)]
+    return workout.id, row_ids
+
+def per_row(client, headers, workout_id, exercise_ids, row_ids, ops):
+    for i in range(ops):
+        client.post(f'/api/workouts/{workout_id}/exercises', json={'exercise_id': exercise_ids[i % len(exercise_ids)], 'sets': 4},
+                    headers=headers)
+    for row_id in row_ids[:ops]:
+        client.put(f'/api/workouts/{workout_id}/exercises/{row_id}', json={'reps': 12}, headers=headers)
+    for row_id in row_ids[ops:2 * ops]:
+        client.delete(f'/api/workouts/{workout_id}/exercises/{row_id}', headers=headers)
+
+def batched(client, headers, workout_id, exercise_ids, row_ids, ops):
+    operations = [{'op': 'add', 'exercise_id': exercise_ids[i % len(exercise_ids)], 'sets': 4} for i in range(ops)]
+    operations += [{'op': 'update', 'id': row_id, 'reps': 12} for row_id in row_ids[:ops]]
+    operations += [{'op': 'delete', 'id': row_id} for row_id in row_ids[ops:2 * ops]]
+    response = client.patch(f'/api/workouts/{workout_id}/exercises', json=operations, headers=headers)
+    assert response.status_code == 200, response.json
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ops', type=int, default=5, help='Adds, updates and deletes each')
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    with bench_app() as app:
+        from app import db
+
+        exercise_ids = [exercise.id for exercise in seed_exercises(EXERCISES)]
+        user, headers = auth_headers(app)
+        client = app.test_client()
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+
+        for name, apply in (('per-row', per_row), ('batched', batched)):
+            timings, queries = [], []
+            for _ in range(args.rounds):
+                workout_id, row_ids = new_workout(user.id, exercise_ids, 2 * args.ops)
+                statements.clear()
+                started = time.perf_counter()
+                apply(client, headers, workout_id, exercise_ids, row_ids, args.ops)
+                timings.append((time.perf_counter() - started) * 1000)
+                queries.append(len(statements))
+            requests = 3 * args.ops if apply is per_row else 1
+            print(f'{name:8} {requests:3} requests  median {statistics.median(timings):7.2f} ms  '
+                  f'queries {max(queries)}')
+
+if __name__ == '__main__':
+    main()
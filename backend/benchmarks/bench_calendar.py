@@ -0,0 +1,57 @@
+"""Calendar heatmap and streak upkeep for one user with a long history.
+
+Times GET /stats/calendar, the incremental streak hooks on workout create and
+delete, and the full streak recompute those hooks replace.
+
+    python benchmarks/bench_calendar.py --workouts 20000
+"""
+import argparse
+import statistics
+import time
+
+from common import bench_app, auth_headers
+import dataset
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workouts', type=int, default=20000)
+    parser.add_argument('--days', type=int, help='Days the workouts are spread over (default: twice --workouts)')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with bench_app() as app:
+        from app import db
+        from app.models import User, UserStats, WorkoutStreak
+        from app.stats import streaks
+
+        ids = dataset.generate(users=1, workouts=args.workouts, exercises_per_workout=1, days=args.days or 2 * args.workouts)
+        user = db.session.get(User, ids['user_ids'][0])
+        _, headers = auth_headers(app, user.username)
+        client = app.test_client()
+        stats = db.session.get(UserStats, user.id)
+        print(f'{args.workouts} workouts, {WorkoutStreak.query.filter_by(user_id=user.id).count()} runs, '
+              f'longest streak {stats.longest_streak} days')
+
+        calendar = timed(lambda: client.get('/stats/calendar?year=2022', headers=headers).get_data(), args.repeat)
+        print(f"{'GET /stats/calendar':28} {calendar:8.2f} ms")
+
+        def create_and_delete():
+            workout = client.post('/api/workouts', json={'name': 'Bench', 'date': '2022-06-15'}, headers=headers).json
+            client.delete(f"/api/workouts/{workout['id']}", headers=headers)
+        print(f"{'POST + DELETE workout':28} {timed(create_and_delete, args.repeat):8.2f} ms  (incremental streaks)")
+
+        def recompute():
+            streaks.rebuild(user.id, db.session.get(UserStats, user.id))
+            db.session.commit()
+        print(f"{'streaks.rebuild':28} {timed(recompute, args.repeat // 5 or 1):8.2f} ms  (what each write would cost)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""Latency, SQL query count and peak memory for every route on synthetic data.
+
+Seeds N users x M workouts x K exercise rows with benchmarks/dataset.py, then
+calls each endpoint --repeat times as the first user through the test client.
+Results are written as JSON; pass an earlier file to --compare to diff them.
+
+    python benchmarks/bench_endpoints.py --users 20 --workouts 500 --output benchmarks/baseline.json
+    python benchmarks/bench_endpoints.py --compare benchmarks/baseline.json --output /tmp/current.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from common import bench_app
+import dataset
+
+def _workout_exercise(ctx):
+    response = ctx.client.post(f"/api/workouts/{ctx.workout_id}/exercises", json={'exercise_id': ctx.exercise_id, 'sets': 3},
+                               headers=ctx.headers)
+    return response.json['id']
+
+def _new_workout(ctx):
+    return ctx.client.post('/api/workouts', json={'name': 'Disposable', 'duration': 20}, headers=ctx.headers).json['id']
+
+def _new_exercise(ctx):
+    return ctx.client.post('/api/exercises', json={'name': f'Disposable {next(ctx.counter)}', 'category': 'strength'},
+                           headers=ctx.headers).json['id']
+
+def _import_body(ctx):
+    return '\n'.join(json.dumps({'date': f'2024-03-{day:02d}', 'workout': 'Imported', 'exercise': 'Exercise 000', 'sets': 3})
+                     for day in range(1, 11))
+
+# name -> callable(ctx) returning (method, path, request kwargs). Anything a
+# request needs to exist beforehand is created in the callable, untimed.
+ENDPOINTS = {
+    'POST /auth/register': lambda ctx: ('POST', '/auth/register', {'json': {
+        'username': f'bench{next(ctx.counter)}', 'email': f'bench{next(ctx.counter)}@example.com', 'password': 'password'}}),
+    'POST /auth/login': lambda ctx: ('POST', '/auth/login', {'json': {'username': ctx.username, 'password': 'password'}}),
+    'GET /auth/profile': lambda ctx: ('GET', '/auth/profile', {}),
+    'PUT /auth/profile': lambda ctx: ('PUT', '/auth/profile', {'json': {'email': f'moved{next(ctx.counter)}@example.com'}}),
+    'GET /auth/hashing': lambda ctx: ('GET', '/auth/hashing', {}),
+    'GET /auth/principals': lambda ctx: ('GET', '/auth/principals', {}),
+
+    'GET /api/exercises': lambda ctx: ('GET', '/api/exercises?per_page=50', {}),
+    'GET /api/exercises?cursor': lambda ctx: ('GET', '/api/exercises?cursor=&per_page=50&category=strength', {}),
+    'GET /api/exercises?q': lambda ctx: ('GET', '/api/exercises?q=press&per_page=50', {}),
+    'GET /api/exercises/suggest': lambda ctx: ('GET', '/api/exercises/suggest?prefix=pr', {}),
+    'GET /api/exercises/<id>': lambda ctx: ('GET', f'/api/exercises/{ctx.exercise_id}', {}),
+    'GET /api/exercises/cache': lambda ctx: ('GET', '/api/exercises/cache', {}),
+    'POST /api/exercises': lambda ctx: ('POST', '/api/exercises', {'json': {'name': f'New {next(ctx.counter)}', 'category': 'cardio'}}),
+    'PUT /api/exercises/<id>': lambda ctx: ('PUT', f'/api/exercises/{ctx.exercise_id}', {'json': {'description': f'Edit {next(ctx.counter)}'}}),
+    'DELETE /api/exercises/<id>': lambda ctx: ('DELETE', f'/api/exercises/{_new_exercise(ctx)}', {}),
+
+    'GET /api/workouts': lambda ctx: ('GET', '/api/workouts?per_page=50', {}),
+    'GET /api/workouts?include=exercises': lambda ctx: ('GET', '/api/workouts?per_page=50&include=exercises', {}),
+    'GET /api/workouts?cursor': lambda ctx: ('GET', '/api/workouts?cursor=&per_page=50', {}),
+    'GET /api/workouts?filters': lambda ctx: ('GET', f'/api/workouts?from=2021-03-01&to=2021-12-31&exercise_id={ctx.record_exercise_id}&min_duration=30', {}),
+    'GET /api/workouts/<id>': lambda ctx: ('GET', f'/api/workouts/{ctx.workout_id}', {}),
+    'POST /api/workouts': lambda ctx: ('POST', '/api/workouts', {'json': {'name': 'Benchmarked', 'duration': 45}}),
+    'PUT /api/workouts/<id>': lambda ctx: ('PUT', f'/api/workouts/{ctx.workout_id}', {'json': {'duration': 40 + next(ctx.counter) % 20}}),
+    'DELETE /api/workouts/<id>': lambda ctx: ('DELETE', f'/api/workouts/{_new_workout(ctx)}', {}),
+    'POST /api/workouts/<id>/exercises': lambda ctx: ('POST', f'/api/workouts/{ctx.workout_id}/exercises',
+                                                      {'json': {'exercise_id': ctx.exercise_id, 'sets': 4}}),
+    'PUT /api/workouts/<id>/exercises/<id>': lambda ctx: ('PUT', f'/api/workouts/{ctx.workout_id}/exercises/{ctx.workout_exercise_id}',
+                                                          {'json': {'reps': next(ctx.counter) % 15}}),
+    'DELETE /api/workouts/<id>/exercises/<id>': lambda ctx: ('DELETE', f'/api/workouts/{ctx.workout_id}/exercises/{_workout_exercise(ctx)}', {}),
+    'PATCH /api/workouts/<id>/exercises': lambda ctx: ('PATCH', f'/api/workouts/{ctx.workout_id}/exercises',
+                                                       {'json': [{'op': 'update', 'id': ctx.workout_exercise_id, 'sets': 1 + next(ctx.counter) % 5}]}),
+    'GET /api/workouts/export': lambda ctx: ('GET', '/api/workouts/export', {}),
+    'POST /api/workouts/import': lambda ctx: ('POST', '/api/workouts/import', {'data': _import_body(ctx), 'content_type': 'application/x-ndjson'}),
+
+    'GET /stats/summary': lambda ctx: ('GET', '/stats/summary', {}),
+    'GET /stats/monthly': lambda ctx: ('GET', '/stats/monthly', {}),
+    'GET /stats/calendar': lambda ctx: ('GET', '/stats/calendar?year=2023', {}),
+    'GET /stats/timeseries': lambda ctx: ('GET', '/stats/timeseries?bucket=week&from=2020-01-01&to=2023-12-31', {}),
+    'GET /stats/exercises': lambda ctx: ('GET', '/stats/exercises', {}),
+    'GET /stats/records': lambda ctx: ('GET', '/stats/records', {}),
+    'GET /stats/records/<id>': lambda ctx: ('GET', f'/stats/records/{ctx.record_exercise_id}', {}),
+    'GET /stats/load': lambda ctx: ('GET', '/stats/load?from=2023-01-01&to=2023-12-31', {}),
+    'GET /stats/progress/<id>': lambda ctx: ('GET', f'/stats/progress/{ctx.record_exercise_id}', {}),
+    'GET /stats/cache': lambda ctx: ('GET', '/stats/cache', {}),
+    'POST /stats/rebuild': lambda ctx: ('POST', '/stats/rebuild', {}),
+    'GET /api/jobs/<id>': lambda ctx: ('GET', f'/api/jobs/{ctx.job_id}', {}),
+
+    'GET /metrics': lambda ctx: ('GET', '/metrics', {}),
+}
+
+class Context:
+    def __init__(self, app, user_id):
+        from flask_jwt_extended import create_access_token
+        from app import db
+        from app.models import User, Workout, PersonalRecord
+
+        user = db.session.get(User, user_id)
+        self.client = app.test_client()
+        self.username = user.username
+        self.headers = {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+        self.workout_id = db.session.query(Workout.id).filter_by(user_id=user_id).order_by(Workout.id).first()[0]
+        self.record_exercise_id = db.session.query(PersonalRecord.exercise_id).filter_by(user_id=user_id).first()[0]
+        self.counter = itertools.count()
+        self.exercise_id = _new_exercise(self)
+        self.workout_exercise_id = _workout_exercise(self)
+        self.job_id = self.client.post('/stats/rebuild', headers=self.headers).json['id']
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def measure(ctx, make, repeat, statements):
+    latencies, queries = [], []
+    for i in range(repeat + 1):
+        method, path, kwargs = make(ctx)
+        statements.clear()
+        started = time.perf_counter()
+        response = ctx.client.open(path, method=method, headers=ctx.headers, **kwargs)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method} {path} returned {response.status_code}')
+        if i:  # the first call warms caches and is not counted
+            latencies.append(elapsed * 1000)
+            queries.append(len(statements))
+
+    # One more call under tracemalloc, which is too slow to leave on
+    method, path, kwargs = make(ctx)
+    tracemalloc.start()
+    ctx.client.open(path, method=method, headers=ctx.headers, **kwargs).get_data()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'queries': max(queries),
+        'peak_kib': round(peak / 1024, 1)
+    }
+
+def uncovered_routes(app, ctx):
+    # Endpoints that no entry in ENDPOINTS reaches; new routes belong above
+    adapter = app.url_map.bind('localhost')
+    covered = set()
+    for make in ENDPOINTS.values():
+        method, path, _ = make(ctx)
+        covered.add(adapter.match(path.split('?')[0], method=method)[0])
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != 'static'} - covered)
+
+def compare(previous, current, tolerance):
+    for key in ('users', 'workouts', 'exercises_per_workout', 'seed'):
+        if previous['meta'].get(key) != current['meta'][key]:
+            print(f"Warning: {key} differs ({previous['meta'].get(key)} before, {current['meta'][key]} now)", file=sys.stderr)
+    print(f"\n{'endpoint':<44} {'p95 before':>11} {'p95 now':>9} {'change':>8}  queries")
+    regressions = 0
+    for name, result in current['endpoints'].items():
+        before = previous['endpoints'].get(name)
+        if before is None:
+            print(f'{name:<44} {"-":>11} {result["p95_ms"]:9.2f} {"new":>8}  {result["queries"]}')
+            continue
+        change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0
+        flag = ''
+        if change > tolerance or result['queries'] > before['queries']:
+            flag = '  <-- regression'
+            regressions += 1
+        print(f"{name:<44} {before['p95_ms']:11.2f} {result['p95_ms']:9.2f} {change:+8.0%}  "
+              f"{before['queries']} -> {result['queries']}{flag}")
+    return regressions
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--workouts', type=int, default=500, help='Workouts per user')
+    parser.add_argument('--exercises-per-workout', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--only', nargs='+', help='Endpoint names (as printed) to run')
+    parser.add_argument('--output', default='benchmarks/baseline.json')
+    parser.add_argument('--compare', help='Earlier results file to diff against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 slowdown before flagging')
+    args = parser.parse_args()
+
+    # Read first: with the default --output, comparing against the committed
+    # baseline would otherwise overwrite it and then compare it with itself
+    previous = None
+    if args.compare:
+        if os.path.realpath(args.compare) == os.path.realpath(args.output):
+            parser.error('--compare and --output must be different files')
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    from sqlalchemy import event
+    from flask import has_request_context
+    from app import db
+
+    # Every POST /stats/rebuild queues a job and no worker drains them here
+    with bench_app(JOB_USER_QUEUE_LIMIT=10 ** 6) as app:
+        started = time.perf_counter()
+        ids = dataset.generate(args.users, args.workouts, args.exercises_per_workout, seed=args.seed)
+        print(f'Seeded {args.users} users x {args.workouts} workouts x {args.exercises_per_workout} exercises '
+              f'in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+        statements = []
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if has_request_context():
+                statements.append(statement)
+
+        ctx = Context(app, ids['user_ids'][0])
+        missing = uncovered_routes(app, ctx)
+        if missing:
+            print(f"Not benchmarked: {', '.join(missing)}", file=sys.stderr)
+
+        results = {}
+        for name, make in ENDPOINTS.items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = measure(ctx, make, args.repeat, statements)
+            r = results[name]
+            print(f"{name:<44} p50={r['p50_ms']:8.2f} p95={r['p95_ms']:8.2f} p99={r['p99_ms']:8.2f} ms  "
+                  f"queries={r['queries']:<3} peak={r['peak_kib']:9.1f} KiB")
+
+    current = {
+        'meta': {
+            'revision': git_revision(),
+            'users': args.users,
+            'workouts': args.workouts,
+            'exercises_per_workout': args.exercises_per_workout,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version
+        },
+        'endpoints': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+        f.write('\n')
+
+    if previous is not None:
+        if compare(previous, current, args.tolerance):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
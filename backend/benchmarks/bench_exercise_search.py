@@ -0,0 +1,78 @@
+"""Exercise catalog search: FTS5 `?q=` and trie autocomplete on a large catalog.
+
+Seeds --exercises generated names, then times building the suggest trie,
+trie lookups on their own and through GET /api/exercises/suggest, and
+GET /api/exercises?q= against the LIKE scan it replaces.
+
+    python benchmarks/bench_exercise_search.py --exercises 12000
+"""
+import argparse
+import itertools
+import statistics
+import time
+
+from sqlalchemy import insert
+
+from common import bench_app, auth_headers
+
+MODIFIERS = ['Seated', 'Standing', 'Incline', 'Decline', 'Single-Arm', 'Paused', 'Tempo', 'Banded', 'Deficit', 'Wide-Grip']
+EQUIPMENT = ['Barbell', 'Dumbbell', 'Kettlebell', 'Cable', 'Machine', 'Smith Machine', 'Landmine', 'Band']
+MOVEMENTS = ['Bench Press', 'Squat', 'Deadlift', 'Row', 'Overhead Press', 'Lunge', 'Curl', 'Extension', 'Fly', 'Raise',
+             'Pull-over', 'Shrug', 'Hip Thrust', 'Good Morning', 'Carry', 'Clean', 'Snatch', 'Split Squat']
+PREFIXES = ['b', 'be', 'bench', 'inc', 'dumbbell r', 'single-arm cab', 'sq', 'pres', 'zzz']
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def catalog(count):
+    names = (f'{modifier} {equipment} {movement}' for modifier, equipment, movement in
+             itertools.product(MODIFIERS, EQUIPMENT, MOVEMENTS))
+    names = itertools.chain(names, (f'{movement} Variation {i}' for i in itertools.count() for movement in MOVEMENTS))
+    return [{'name': name, 'description': f'{name} for {movement.lower()} strength', 'category': 'strength'}
+            for name, movement in zip(itertools.islice(names, count), itertools.cycle(MOVEMENTS))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--exercises', type=int, default=12000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with bench_app() as app:
+        from app import db, search
+        from app.models import Exercise
+
+        db.session.execute(insert(Exercise), catalog(args.exercises))
+        db.session.commit()
+        _, headers = auth_headers(app)
+        client = app.test_client()
+        suggest = app.extensions['exercise_suggest']
+        exercises = db.session.query(Exercise.id, Exercise.name).all()
+
+        print(f'{len(exercises)} exercises')
+        print(f"{'trie build':28} {timed(lambda: search.ExerciseTrie(exercises), 5):9.2f} ms")
+        trie = suggest.trie(app.extensions['catalog_cache'])
+        for prefix in PREFIXES:
+            lookup = timed(lambda: trie.complete(prefix, 10), args.repeat * 10) * 1000
+            endpoint = timed(lambda: client.get(f'/api/exercises/suggest?prefix={prefix}', headers=headers).get_data(), args.repeat)
+            print(f'{"suggest " + repr(prefix):28} {lookup:9.1f} us lookup {endpoint:7.2f} ms GET  '
+                  f'{len(trie.complete(prefix, 10))} results')
+
+        # Uncached: a new catalog version per request
+        for q in ('press', 'dumbbell row', 'banded hip thr'):
+            def fts():
+                app.extensions['catalog_cache'].clear()
+                return client.get(f'/api/exercises?q={q}&per_page=20', headers=headers).json
+
+            like = db.session.query(Exercise.id).filter(*[
+                Exercise.name.ilike(f'%{term}%') | Exercise.description.ilike(f'%{term}%') for term in q.split()
+            ]).order_by(Exercise.name).limit(20)
+            print(f'{"q=" + repr(q):28} {timed(fts, args.repeat // 4):9.2f} ms GET FTS  '
+                  f'{timed(like.all, args.repeat // 4):7.2f} ms LIKE query  {fts()["total"]} matches')
+
+if __name__ == '__main__':
+    main()
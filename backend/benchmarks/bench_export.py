@@ -0,0 +1,53 @@
+"""Peak memory and throughput of GET /api/workouts/export as history grows.
+
+    python benchmarks/bench_export.py --sizes 10000 50000 100000
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from common import bench_app, auth_headers, seed_exercises
+
+def seed_history(user_id, exercise_ids, workouts, exercises_per_workout=5):
+    from sqlalchemy import insert
+    from app import db
+    from app.models import Workout, WorkoutExercise
+
+    start = date(2000, 1, 1)
+    workout_ids = db.session.scalars(
+        insert(Workout).returning(Workout.id, sort_by_parameter_order=True),
+        [{'user_id': user_id, 'name': f'Session {i}', 'date': start + timedelta(days=i // 2), 'duration': 60}
+         for i in range(workouts)]
+    ).all()
+    db.session.execute(insert(WorkoutExercise), [
+        {'workout_id': workout_id, 'exercise_id': exercise_ids[j % len(exercise_ids)], 'sets': 3, 'reps': 10, 'weight': 50.0}
+        for workout_id in workout_ids for j in range(exercises_per_workout)
+    ])
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 100000], help='Exercise rows per run')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='ndjson')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        with bench_app() as app:
+            exercise_ids = [exercise.id for exercise in seed_exercises(['Squats', 'Deadlift', 'Rowing'])]
+            user, headers = auth_headers(app)
+            seed_history(user.id, exercise_ids, size // 5)
+            client = app.test_client()
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            response = client.get(f'/api/workouts/export?format={args.format}', headers=headers, buffered=False)
+            written = sum(len(chunk) for chunk in response.response)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f'{size:>8} rows  {written / 1024 / 1024:7.1f} MiB out  {elapsed:6.2f}s  peak traced memory {peak / 1024 / 1024:.1f} MiB')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Rows/second for POST /api/workouts/import on a generated history file.
+
+    python benchmarks/bench_import.py --rows 100000 --format csv
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from common import bench_app, auth_headers, seed_exercises
+
+EXERCISES = ['Squats', 'Bench Press', 'Deadlift', 'Running', 'Rowing', 'Pull-ups', 'Push-ups', 'Lunges']
+
+def write_history(path, rows, file_format, exercises_per_workout=5):
+    rng = random.Random(42)
+    start = date(2015, 1, 1)
+    with open(path, 'w', newline='') as f:
+        if file_format == 'csv':
+            f.write('date,workout,duration,exercise,sets,reps,weight\n')
+        for i in range(rows):
+            record = {
+                'date': (start + timedelta(days=i // exercises_per_workout)).isoformat(),
+                'workout': f'Session {i // exercises_per_workout}',
+                'duration': 60,
+                'exercise': rng.choice(EXERCISES),
+                'sets': rng.randint(1, 5),
+                'reps': rng.randint(1, 12),
+                'weight': round(rng.uniform(20, 140), 1)
+            }
+            if file_format == 'csv':
+                f.write(','.join(str(record[field]) for field in ('date', 'workout', 'duration', 'exercise', 'sets', 'reps', 'weight')) + '\n')
+            else:
+                f.write(json.dumps(record) + '\n')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='ndjson')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--trace-memory', action='store_true', help='Report peak traced memory (slows the run down)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory, bench_app(IMPORT_BATCH_SIZE=args.batch_size) as app:
+        path = os.path.join(directory, f'history.{args.format}')
+        write_history(path, args.rows, args.format)
+        seed_exercises(EXERCISES)
+        _, headers = auth_headers(app)
+        client = app.test_client()
+        content_type = 'text/csv' if args.format == 'csv' else 'application/x-ndjson'
+
+        if args.trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        with open(path, 'rb') as body:
+            response = client.post('/api/workouts/import', input_stream=body, content_type=content_type,
+                                   headers=dict(headers, **{'Content-Length': str(os.path.getsize(path))}))
+        elapsed = time.perf_counter() - started
+
+        report = response.json
+        print(f"{args.rows} {args.format} rows in {elapsed:.2f}s: {args.rows / elapsed:,.0f} rows/s")
+        print(f"workouts={report['workouts_created']} exercises={report['exercises_created']} errors={report['error_count']}")
+        if args.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"peak traced memory: {peak / 1024 / 1024:.1f} MiB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Login throughput vs. concurrent API latency during a login burst.
+
+Runs the app on a threaded local server, with login clients hammering
+/auth/login while API clients poll GET /api/workouts. Each --workers value
+is one run; 0 hashes inline on the request thread.
+
+    python benchmarks/bench_login.py --workers 0 2 --login-clients 16 --seconds 10
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from common import bench_app, auth_headers
+
+def request(url, data=None, headers=None):
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers=dict(headers or {}, **{'Content-Type': 'application/json'}))
+    try:
+        with urllib.request.urlopen(req) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def run(workers, args):
+    from werkzeug.serving import make_server
+
+    with bench_app(PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_QUEUE=args.queue,
+                   PASSWORD_HASH_ITERATIONS=args.iterations) as app:
+        _, headers = auth_headers(app)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_port}'
+
+        deadline = time.monotonic() + args.seconds
+        logins, rejected, latencies = [], [], []
+
+        def login_client():
+            while time.monotonic() < deadline:
+                status = request(f'{base}/auth/login', {'username': 'bench', 'password': 'password'})
+                (logins if status == 200 else rejected).append(status)
+
+        def api_client():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                request(f'{base}/api/workouts', headers=headers)
+                latencies.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=login_client) for _ in range(args.login_clients)]
+        threads += [threading.Thread(target=api_client) for _ in range(args.api_clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        server.shutdown()
+
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+        print(f'workers={workers:<3} logins/s={len(logins) / args.seconds:7.1f}  rejected={len(rejected):<5} '
+              f'api req/s={len(latencies) / args.seconds:7.1f}  api p50={statistics.median(latencies) * 1000:7.1f} ms  '
+              f'p95={p95 * 1000:7.1f} ms')
+        print(f'            {app.extensions["password_hasher"].executor.stats()}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2])
+    parser.add_argument('--queue', type=int, default=16)
+    parser.add_argument('--iterations', type=int, default=260000)
+    parser.add_argument('--login-clients', type=int, default=16)
+    parser.add_argument('--api-clients', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        run(workers, args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Request profiler overhead: disabled, enabled but idle, sampled and always on.
+
+    python benchmarks/bench_profiler.py --requests 2000
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+from common import bench_app
+import dataset
+
+def run(label, requests, path, extra_headers=None, **overrides):
+    from flask_jwt_extended import create_access_token
+
+    with bench_app(**overrides) as app:
+        ids = dataset.generate(users=1, workouts=500)
+        headers = {'Authorization': f"Bearer {create_access_token(identity=ids['user_ids'][0])}"}
+        headers.update(extra_headers or {})
+        client = app.test_client()
+        client.get(path, headers=headers)
+
+        latencies = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            client.get(path, headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    print(f'{label:<26} mean={statistics.fmean(latencies):7.3f} ms  p50={latencies[len(latencies) // 2]:7.3f} ms  '
+          f'p95={latencies[int(len(latencies) * 0.95)]:7.3f} ms')
+    return statistics.median(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--path', default='/api/workouts?per_page=20')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        profiler = {'PROFILER_ENABLED': True, 'PROFILER_DIR': directory, 'PROFILER_TOKEN': 'bench'}
+        baseline = run('disabled', args.requests, args.path)
+        idle = run('enabled, not triggered', args.requests, args.path, **profiler)
+        run('sampled at 1%', args.requests, args.path, PROFILER_SAMPLE_RATE=0.01, **profiler)
+        run('every request', max(args.requests // 10, 1), args.path, {'X-Profile': 'bench'}, **profiler)
+
+    print(f'Idle overhead on p50: {idle - baseline:+.3f} ms ({(idle - baseline) / baseline:+.1%}), mostly run-to-run noise')
+
+    # The before/after hooks alone, timed without the rest of the request
+    with bench_app(**profiler) as app, app.test_request_context(args.path):
+        hooks = app.extensions['profiler']
+        response = app.response_class()
+        loops = 100000
+        started = time.perf_counter()
+        for _ in range(loops):
+            hooks._start()
+            hooks._finish(response)
+            hooks._abandon()
+        print(f'Idle hook cost: {(time.perf_counter() - started) / loops * 1e6:.2f} us per request')
+
+if __name__ == '__main__':
+    main()
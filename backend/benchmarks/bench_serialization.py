@@ -0,0 +1,50 @@
+"""Serializing workout lists: to_dict() + stdlib JSON vs row serializers.
+
+    python benchmarks/bench_serialization.py --sizes 1000 10000
+"""
+import argparse
+import json
+import timeit
+
+from common import bench_app, auth_headers, seed_exercises
+from bench_export import seed_history
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Workouts per run')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from app import db
+    from app.models import Workout
+    from app.serializers import WORKOUT, JSONProvider, OrjsonProvider, orjson
+
+    for size in args.sizes:
+        with bench_app() as app:
+            exercise_ids = [exercise.id for exercise in seed_exercises(['Squats', 'Deadlift', 'Rowing'])]
+            user, _ = auth_headers(app)
+            user_id = user.id
+            seed_history(user_id, exercise_ids, size, exercises_per_workout=0)
+
+            def orm_to_dict():
+                db.session.expunge_all()
+                workouts = Workout.query.filter_by(user_id=user_id).all()
+                return json.dumps([workout.to_dict() for workout in workouts])
+
+            def rows(provider):
+                def run():
+                    result = db.session.query(*WORKOUT.columns).filter(Workout.user_id == user_id).all()
+                    return provider.dumps(WORKOUT.many(result))
+                return run
+
+            cases = [('orm + to_dict + json', orm_to_dict), ('rows + stdlib provider', rows(JSONProvider(app)))]
+            if orjson:
+                cases.append(('rows + orjson provider', rows(OrjsonProvider(app))))
+
+            print(f'{size} workouts')
+            for name, case in cases:
+                best = min(timeit.repeat(case, number=1, repeat=args.repeat))
+                print(f'  {name:<24} {best * 1000:8.1f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Concurrent workout writes from several processes sharing one SQLite file.
+
+Each writer process creates workouts through POST /api/workouts while reader
+processes page through GET /api/workouts?include=exercises, the way several
+gunicorn workers would. Each --profile value is one run on a fresh file.
+
+    python benchmarks/bench_sqlite_writers.py --profile default production --writers 4 --readers 2
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from common import bench_app, auth_headers
+
+def worker(role, uri, profile, headers, seconds, results):
+    with bench_app(SQLALCHEMY_DATABASE_URI=uri, SQLITE_PROFILE=profile) as app:
+        client = app.test_client()
+        latencies, errors = [], 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                if role == 'writer':
+                    response = client.post('/api/workouts', json={'name': 'Concurrent', 'duration': 30}, headers=headers)
+                else:
+                    response = client.get('/api/workouts?include=exercises&per_page=50', headers=headers)
+                ok = response.status_code < 400
+            except OperationalError:
+                # "database is locked" once the busy timeout runs out
+                from app import db
+                db.session.rollback()
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+        results.put((role, latencies, errors))
+
+def run(profile, args):
+    with tempfile.TemporaryDirectory() as directory:
+        uri = 'sqlite:///' + os.path.join(directory, 'writers.sqlite')
+        with bench_app(SQLALCHEMY_DATABASE_URI=uri, SQLITE_PROFILE=profile) as app:
+            _, headers = auth_headers(app)
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        roles = ['writer'] * args.writers + ['reader'] * args.readers
+        processes = [context.Process(target=worker, args=(role, uri, profile, headers, args.seconds, results)) for role in roles]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    for role in ('writer', 'reader'):
+        latencies = sorted(l for r, ls, _ in collected if r == role for l in ls)
+        errors = sum(e for r, _, e in collected if r == role)
+        if not latencies and not errors:
+            continue
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+        p50 = statistics.median(latencies) * 1000 if latencies else 0
+        print(f'{profile:<11} {role}s: {len(latencies) / args.seconds:8.1f} req/s  errors={errors:<5} '
+              f'p50={p50:7.1f} ms  p95={p95:7.1f} ms')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', nargs='+', default=['default', 'production'])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    for profile in args.profile:
+        run(profile, args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Workout list filters on a large seeded history: query plans and latency.
+
+Seeds --users x --workouts workouts, then requests GET /api/workouts with
+every combination of the date range, name, exercise and duration filters,
+in page and cursor mode. Prints each statement's EXPLAIN QUERY PLAN once
+and flags any full table scan.
+
+    python benchmarks/bench_workout_search.py --users 10 --workouts 10000
+"""
+import argparse
+import itertools
+import re
+import statistics
+import time
+
+from sqlalchemy import event
+
+from common import bench_app, auth_headers
+import dataset
+
+FILTERS = {
+    'dates': {'from': '2021-03-01', 'to': '2021-03-31'},
+    'name': {'name': 'leg'},
+    'exercise': {'exercise_id': None},  # the user's most used exercise
+    'duration': {'min_duration': 45, 'max_duration': 60}
+}
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--workouts', type=int, default=10000, help='Workouts per user')
+    parser.add_argument('--exercises-per-workout', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--plans', action='store_true', help='Print every query plan')
+    args = parser.parse_args()
+
+    with bench_app() as app:
+        from app import db
+        from app.models import User, WorkoutExercise, Workout
+        from sqlalchemy import func
+
+        ids = dataset.generate(users=args.users, workouts=args.workouts, exercises_per_workout=args.exercises_per_workout)
+        user = db.session.get(User, ids['user_ids'][0])
+        FILTERS['exercise']['exercise_id'] = db.session.query(WorkoutExercise.exercise_id).join(Workout).filter(
+            Workout.user_id == user.id
+        ).group_by(WorkoutExercise.exercise_id).order_by(func.count().desc()).first()[0]
+        _, headers = auth_headers(app, user.username)
+        client = app.test_client()
+        print(f'{db.session.query(Workout).count()} workouts, {args.workouts} for the measured user')
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, parameters, *rest:
+                     statements.append((statement, parameters)))
+
+        seen, full_scans = set(), []
+        for size in range(len(FILTERS) + 1):
+            for names in itertools.combinations(FILTERS, size):
+                params = {key: value for name in names for key, value in FILTERS[name].items()}
+                for mode in ({}, {'cursor': ''}):
+                    query_string = dict(params, per_page=20, **mode)
+                    statements.clear()
+                    response = client.get('/api/workouts', query_string=query_string, headers=headers)
+                    assert response.status_code == 200, response.json
+                    timings = []
+                    for _ in range(args.repeat):
+                        started = time.perf_counter()
+                        client.get('/api/workouts', query_string=query_string, headers=headers).get_data()
+                        timings.append((time.perf_counter() - started) * 1000)
+
+                    found = response.json.get('total', len(response.json['workouts']))
+                    label = ' + '.join(names) or 'no filters'
+                    print(f"{label:38} {'cursor' if mode else 'page':6} {statistics.median(timings):8.2f} ms  {found:6} found")
+
+                    for statement, parameters in list(statements):
+                        if 'FROM workouts' not in statement or statement in seen:
+                            continue
+                        seen.add(statement)
+                        plan = [row[3] for row in db.session.connection().exec_driver_sql(
+                            f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                        full_scans += [(label, step) for step in plan if FULL_SCAN.match(step)]
+                        if args.plans:
+                            print('    ' + '\n    '.join(plan))
+
+        print('full table scans:', full_scans or 'none')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+# Benchmarks run as scripts from the backend directory or anywhere else
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@contextmanager
+def bench_app(config_name='testing', **overrides):
+    # A throwaway SQLite file so benchmarks never touch dev or test databases
+    from app import create_app, db
+    from config import config
+
+    with tempfile.TemporaryDirectory() as directory:
+        overrides.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///' + os.path.join(directory, 'bench.sqlite'))
+        config['benchmark'] = type('BenchmarkConfig', (config[config_name],), overrides)
+        app = create_app('benchmark')
+
+        with app.app_context():
+            db.create_all()
+            yield app
+            db.session.remove()
+            db.engine.dispose()
+
+def auth_headers(app, username='bench'):
+    from flask_jwt_extended import create_access_token
+    from app import db
+    from app.models import User
+
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        user = User(username=username, email=f'{username}@example.com', password='password')
+        db.session.add(user)
+        db.session.commit()
+
+    return user, {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+def seed_exercises(names, category='strength'):
+    from app import db
+    from app.models import Exercise
+
+    exercises = [Exercise(name=name, category=category) for name in names]
+    db.session.add_all(exercises)
+    db.session.commit()
+    return exercises
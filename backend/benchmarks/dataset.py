@@ -0,0 +1,64 @@
+"""Deterministic synthetic data: N users x M workouts x K exercise rows each.
+
+The same arguments and seed always produce the same rows, so numbers from
+different commits are measured against identical data.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+CATEGORIES = ['strength', 'cardio', 'flexibility', 'balance']
+WORKOUT_NAMES = ['Push Day', 'Pull Day', 'Leg Day', 'Full Body', 'Long Run', 'Intervals', 'Mobility', 'Core']
+
+def generate(users=10, workouts=200, exercises_per_workout=5, catalog_size=40, seed=42, start=date(2020, 1, 1), days=1460):
+    """Seed the catalog, users and their histories; returns the generated ids.
+
+    Workouts are spread over `days` days from `start`. Rollups are rebuilt
+    once per user at the end, as `flask stats rebuild` would.
+    """
+    from sqlalchemy import insert
+    from app import db
+    from app.models import User, Exercise, Workout, WorkoutExercise
+    from app.passwords import get_hasher
+    from app.stats import rollup
+
+    rng = random.Random(seed)
+    created = datetime(2020, 1, 1)
+
+    exercise_ids = db.session.scalars(
+        insert(Exercise).returning(Exercise.id, sort_by_parameter_order=True),
+        [{'name': f'Exercise {i:03d}', 'description': f'Synthetic exercise {i}', 'category': CATEGORIES[i % len(CATEGORIES)],
+          'created_at': created, 'updated_at': created}
+         for i in range(catalog_size)]
+    ).all()
+
+    # Every synthetic user shares one password hash; hashing each is too slow
+    password_hash = get_hasher().hash('password')
+    user_ids = db.session.scalars(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [{'username': f'user{i:05d}', 'email': f'user{i:05d}@example.com', 'password_hash': password_hash,
+          'created_at': created, 'updated_at': created}
+         for i in range(users)]
+    ).all()
+
+    # Each user favours a few exercises, so per-user stats are not uniform
+    for user_id in user_ids:
+        favourites = rng.sample(exercise_ids, min(8, len(exercise_ids)))
+        workout_ids = db.session.scalars(
+            insert(Workout).returning(Workout.id, sort_by_parameter_order=True),
+            [{'user_id': user_id, 'name': rng.choice(WORKOUT_NAMES), 'date': start + timedelta(days=rng.randrange(days)),
+              'duration': rng.randint(15, 120), 'notes': None, 'created_at': created, 'updated_at': created}
+             for _ in range(workouts)]
+        ).all()
+        rows = [
+            {'workout_id': workout_id,
+             'exercise_id': rng.choice(favourites) if rng.random() < 0.8 else rng.choice(exercise_ids),
+             'sets': rng.randint(1, 5), 'reps': rng.randint(1, 15), 'weight': round(rng.uniform(10, 150), 1),
+             'duration': None, 'distance': None, 'created_at': created, 'updated_at': created}
+            for workout_id in workout_ids for _ in range(exercises_per_workout)
+        ]
+        if rows:
+            db.session.execute(insert(WorkoutExercise), rows)
+        rollup.rebuild(user_id)
+        db.session.commit()
+
+    return {'user_ids': user_ids, 'exercise_ids': exercise_ids}
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -8,6 +9,54 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'hard-to-guess-string'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'default')  # see app/database.py
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))  # reads stay on the primary after a write
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', 'true').lower() == 'true'  # Server-Timing and /metrics
+    SQL_QUERY_BUDGET = int(os.environ.get('SQL_QUERY_BUDGET', 20))  # requests over either budget are logged
+    REQUEST_DURATION_BUDGET_MS = int(os.environ.get('REQUEST_DURATION_BUDGET_MS', 500))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token for /metrics; unset leaves it open, so keep it private
+    # Opt-in request profiling, see app/profiling.py
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_DIR = os.environ.get('PROFILER_DIR') or os.path.join(tempfile.gettempdir(), 'workout-tracker-profiles')
+    PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')  # profiles requests sending it in X-Profile
+    PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0))  # fraction of allowlisted requests
+    PROFILER_ENDPOINTS = [name for name in os.environ.get('PROFILER_ENDPOINTS', '').split(',') if name]
+    PROFILER_USER_IDS = [int(id) for id in os.environ.get('PROFILER_USER_IDS', '').split(',') if id]
+    PROFILER_MAX_FILES = int(os.environ.get('PROFILER_MAX_FILES', 200))
+    PROFILER_MAX_MB = int(os.environ.get('PROFILER_MAX_MB', 50))
+    PROFILER_INTERVAL_MS = int(os.environ.get('PROFILER_INTERVAL_MS', 5))  # stack sampling interval
+    # Background jobs, run by `flask worker`
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))  # in seconds
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    JOB_RETRY_BACKOFF = int(os.environ.get('JOB_RETRY_BACKOFF', 5))  # seconds before the first retry, doubling after
+    JOB_RETRY_BACKOFF_MAX = int(os.environ.get('JOB_RETRY_BACKOFF_MAX', 600))
+    JOB_USER_CONCURRENCY = int(os.environ.get('JOB_USER_CONCURRENCY', 1))  # running jobs per user
+    JOB_USER_QUEUE_LIMIT = int(os.environ.get('JOB_USER_QUEUE_LIMIT', 20))  # queued or running jobs per user
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 900))  # running longer than this counts as abandoned
+    # Async import bodies wait here for a worker. The default is local to the
+    # host, so workers must run next to the web processes or share this path.
+    JOB_SPOOL_DIR = os.environ.get('JOB_SPOOL_DIR') or os.path.join(tempfile.gettempdir(), 'workout-tracker-jobs')
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))  # rows per executemany insert
+    IMPORT_COMMIT_EVERY = int(os.environ.get('IMPORT_COMMIT_EVERY', 10))  # batches per commit
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))  # history rows fetched at a time
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto')  # auto, orjson or stdlib
+    ANALYTICS_BACKEND = os.environ.get('ANALYTICS_BACKEND', 'auto')  # auto, numpy or python
+    PASSWORD_HASH_ALGORITHM = os.environ.get('PASSWORD_HASH_ALGORITHM', 'sha256')
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 260000))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 hashes inline
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))  # keep workers + queue below gunicorn's --threads
+    PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))  # in seconds
+    CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', 256))
+    CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 300))  # in seconds
+    SUGGEST_MAX_RESULTS = int(os.environ.get('SUGGEST_MAX_RESULTS', 20))  # largest ?limit= for exercise autocomplete
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 1024))
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', 60))  # in seconds
+    HISTORY_CACHE_MAX_MB = int(os.environ.get('HISTORY_CACHE_MAX_MB', 64))  # per-user stats snapshots
+
+    # Read-only routes use this bind when set; it must be kept in sync with the primary
+    if os.environ.get('REPLICA_DATABASE_URL'):
+        SQLALCHEMY_BINDS = {'replica': os.environ['REPLICA_DATABASE_URL']}
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -16,10 +65,12 @@ class DevelopmentConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
+    PASSWORD_HASH_ITERATIONS = 1000
     SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'test.sqlite')
 
 class ProductionConfig(Config):
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'production.sqlite')
 
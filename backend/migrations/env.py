@@ -90,6 +90,13 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # The exercise search index (app/search.py) is an FTS5 virtual table and
+    # its shadow tables, which the models don't declare
+    def include_name(name, type_, parent_names):
+        if type_ == 'table':
+            return not name.startswith('exercises_fts')
+        return True
+
     connectable = get_engine()
 
     with connectable.connect() as connection:
@@ -97,6 +104,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=get_metadata(),
             process_revision_directives=process_revision_directives,
+            include_name=include_name,
             **current_app.extensions['migrate'].configure_args
         )
 
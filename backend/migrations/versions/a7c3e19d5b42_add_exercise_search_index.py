@@ -0,0 +1,47 @@
+"""add exercise search index
+
+Revision ID: a7c3e19d5b42
+Revises: 9f2b7c64d1e8
+Create Date: 2025-06-24 10:12:37.418206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e19d5b42'
+down_revision = '9f2b7c64d1e8'
+branch_labels = None
+depends_on = None
+
+# Mirrors app/search.py; other databases search with LIKE and need nothing
+STATEMENTS = (
+    "CREATE VIRTUAL TABLE exercises_fts USING fts5("
+    "name, description, content='exercises', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER exercises_fts_insert AFTER INSERT ON exercises BEGIN "
+    "INSERT INTO exercises_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER exercises_fts_delete AFTER DELETE ON exercises BEGIN "
+    "INSERT INTO exercises_fts(exercises_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER exercises_fts_update AFTER UPDATE OF name, description ON exercises BEGIN "
+    "INSERT INTO exercises_fts(exercises_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO exercises_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    # Indexes the existing catalog
+    "INSERT INTO exercises_fts(exercises_fts) VALUES ('rebuild')"
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in STATEMENTS:
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in ('exercises_fts_update', 'exercises_fts_delete', 'exercises_fts_insert'):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS exercises_fts')
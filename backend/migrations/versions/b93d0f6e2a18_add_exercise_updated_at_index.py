@@ -0,0 +1,25 @@
+"""add exercise updated_at index
+
+Revision ID: b93d0f6e2a18
+Revises: 7e4b2a90c6f1
+Create Date: 2025-07-02 10:21:37.584102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b93d0f6e2a18'
+down_revision = '7e4b2a90c6f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Not in batch mode: recreating `exercises` would drop its search triggers
+    op.create_index('ix_exercises_updated_at', 'exercises', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_exercises_updated_at', table_name='exercises')
@@ -0,0 +1,33 @@
+"""widen users password_hash
+
+Revision ID: e5a93c1f06b2
+Revises: 3b7d0e52c918
+Create Date: 2025-05-20 11:05:19.684302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a93c1f06b2'
+down_revision = '3b7d0e52c918'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # PBKDF2 with sha512 produces hashes longer than 128 characters
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=128),
+               type_=sa.String(length=256),
+               existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=256),
+               type_=sa.String(length=128),
+               existing_nullable=True)
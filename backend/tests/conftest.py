@@ -1,5 +1,6 @@
 import pytest
 import os
+from sqlalchemy import event
 from app import create_app, db
 from app.models import User, Exercise, Workout, WorkoutExercise
 
@@ -21,6 +22,17 @@ def client(app):
 def runner(app):
     return app.test_cli_runner()
 
+@pytest.fixture
+def query_counter(app):
+    statements = []
+    
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', count)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', count)
+
 @pytest.fixture
 def init_database(app):
     with app.app_context():
@@ -1,7 +1,10 @@
 import json
+from datetime import date
 import pytest
 from app import db
-from app.models import Exercise, Workout, WorkoutExercise
+from app.cache import LRUCache
+from app.serializers import json_provider_class
+from app.models import User, Exercise, Workout, WorkoutExercise
 
 def test_get_exercises(client, auth_headers, init_database):
     response = client.get('/api/exercises', headers=auth_headers)
@@ -108,6 +111,24 @@ def test_update_workout(client, auth_headers, init_database):
     assert updated_workout.duration == 60
     assert updated_workout.notes == 'Updated workout notes'
 
+def test_workout_duration_from_form_string(client, auth_headers, init_database):
+    # The web form sends its text fields as strings; the rollup row exists
+    total = client.get('/stats/summary', headers=auth_headers).json['total_duration_minutes']
+    
+    response = client.post('/api/workouts', json={'name': 'Form Workout', 'duration': '15'}, headers=auth_headers)
+    assert response.status_code == 201
+    assert response.json['duration'] == 15
+    
+    response = client.put(f"/api/workouts/{response.json['id']}", json={'duration': '20'}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['duration'] == 20
+    assert client.get('/stats/summary', headers=auth_headers).json['total_duration_minutes'] == total + 20
+    
+    for duration in ('fifteen', '15.5', True, [15], -1, 3000000000, '1e20'):
+        response = client.post('/api/workouts', json={'name': 'Bad', 'duration': duration}, headers=auth_headers)
+        assert response.status_code == 400
+        assert 'duration' in response.json['error']
+
 def test_add_exercise_to_workout(client, auth_headers, init_database):
     workout = Workout.query.first()
     exercise = Exercise.query.filter_by(name='Squats').first()
@@ -132,4 +153,516 @@ def test_add_exercise_to_workout(client, auth_headers, init_database):
     
     assert workout_exercise is not None
     assert workout_exercise.sets == 4
-    assert workout_exercise.reps == 12
\ No newline at end of file
+    assert workout_exercise.reps == 12
+
+def test_batch_update_workout_exercises(client, auth_headers, init_database):
+    workout = Workout.query.first()
+    rows = WorkoutExercise.query.filter_by(workout_id=workout.id).order_by(WorkoutExercise.id).all()
+    squats = Exercise.query.filter_by(name='Squats').first()
+    
+    response = client.patch(f'/api/workouts/{workout.id}/exercises', json=[
+        {'op': 'add', 'exercise_id': squats.id, 'sets': 5, 'reps': 5, 'weight': 100.0},
+        {'op': 'update', 'id': rows[0].id, 'sets': 4, 'notes': 'Harder'},
+        {'op': 'delete', 'id': rows[1].id}
+    ], headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert response.json['id'] == workout.id
+    exercises = response.json['exercises']
+    assert [exercise['exercise']['name'] for exercise in exercises] == ['Push-ups', 'Squats']
+    assert exercises[0]['sets'] == 4
+    assert exercises[0]['reps'] == 10
+    assert exercises[0]['notes'] == 'Harder'
+    assert exercises[1]['weight'] == 100.0
+
+def test_batch_update_is_all_or_nothing(client, auth_headers, init_database):
+    workout = Workout.query.first()
+    squats = Exercise.query.filter_by(name='Squats').first()
+    
+    response = client.patch(f'/api/workouts/{workout.id}/exercises', json=[
+        {'op': 'add', 'exercise_id': squats.id},
+        {'op': 'add', 'exercise_id': 9999}
+    ], headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json['ids'] == [9999]
+    
+    response = client.patch(f'/api/workouts/{workout.id}/exercises', json=[{'op': 'delete', 'id': 9999}], headers=auth_headers)
+    assert response.status_code == 400
+    
+    response = client.patch(f'/api/workouts/{workout.id}/exercises', json=[{'op': 'replace', 'id': 1}], headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json['index'] == 0
+    
+    # JSON true is not an id, even though Python counts bools as ints
+    for operation in ({'op': 'delete', 'id': True}, {'op': 'add', 'exercise_id': True}):
+        response = client.patch(f'/api/workouts/{workout.id}/exercises', json=[operation], headers=auth_headers)
+        assert response.status_code == 400
+    
+    assert WorkoutExercise.query.filter_by(workout_id=workout.id).count() == 2
+
+def test_batch_update_checks_ownership(client, auth_headers, init_database):
+    other = User(username='other', email='other@example.com', password='password')
+    db.session.add(other)
+    db.session.commit()
+    workout = Workout(user_id=other.id, name='Not Yours')
+    db.session.add(workout)
+    db.session.commit()
+    
+    response = client.patch(f'/api/workouts/{workout.id}/exercises', json=[{'op': 'delete', 'id': 1}], headers=auth_headers)
+    assert response.status_code == 404
+
+def test_workout_exercise_numbers_from_form_strings(client, auth_headers, init_database):
+    workout = Workout.query.first()
+    squats = Exercise.query.filter_by(name='Squats').first()
+    path = f'/api/workouts/{workout.id}/exercises'
+    
+    response = client.post(path, json={'exercise_id': squats.id, 'sets': '3', 'reps': '5', 'weight': '110'}, headers=auth_headers)
+    assert response.status_code == 201
+    assert (response.json['sets'], response.json['reps'], response.json['weight']) == (3, 5, 110.0)
+    row_id = response.json['id']
+    
+    response = client.put(f'{path}/{row_id}', json={'weight': '112.5', 'reps': '4'}, headers=auth_headers)
+    assert response.status_code == 200
+    assert (response.json['reps'], response.json['weight']) == (4, 112.5)
+    
+    response = client.patch(path, json=[
+        {'op': 'add', 'exercise_id': squats.id, 'reps': '8', 'weight': '90'},
+        {'op': 'update', 'id': row_id, 'weight': '115'}
+    ], headers=auth_headers)
+    assert response.status_code == 200
+    records = client.get('/stats/records', headers=auth_headers).json
+    
+    for body in ({'exercise_id': squats.id, 'weight': 'heavy'}, {'exercise_id': squats.id, 'reps': '5.5'}):
+        assert client.post(path, json=body, headers=auth_headers).status_code == 400
+    assert client.put(f'{path}/{row_id}', json={'sets': 'three'}, headers=auth_headers).status_code == 400
+    for body in ({'reps': -5}, {'weight': 1e300}, {'sets': 2**63}, {'duration': '1e20'}):
+        response = client.put(f'{path}/{row_id}', json=body, headers=auth_headers)
+        assert response.status_code == 400
+        assert 'between 0 and' in response.json['error']
+    response = client.patch(path, json=[
+        {'op': 'update', 'id': row_id, 'weight': '120'},
+        {'op': 'add', 'exercise_id': squats.id, 'weight': 'heavy'}
+    ], headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json['index'] == 1
+    assert WorkoutExercise.query.get(row_id).weight == 115.0
+    assert client.get('/stats/records', headers=auth_headers).json == records
+
+@pytest.mark.parametrize('operations', [3, 30])
+def test_batch_update_query_count(client, auth_headers, init_database, query_counter, operations):
+    path = f'/api/workouts/{Workout.query.first().id}/exercises'
+    exercise_ids = [exercise.id for exercise in Exercise.query.all()]
+    client.get('/stats/summary', headers=auth_headers)
+    query_counter.clear()
+    
+    response = client.patch(path, json=[
+        {'op': 'add', 'exercise_id': exercise_ids[i % len(exercise_ids)], 'sets': 3, 'reps': 5, 'weight': 20.0 + i}
+        for i in range(operations)
+    ], headers=auth_headers)
+    
+    assert response.status_code == 200
+    # The same for any number of operations: ownership, exercise IN check, one
+    # executemany insert, rollup and record reads and batched writes, the
+    # workout read back
+    assert len(query_counter) == 14
+
+def _add_workouts(count, exercises_per_workout):
+    user = User.query.filter_by(username='testuser').first()
+    exercise_ids = [exercise.id for exercise in Exercise.query.all()]
+    
+    for i in range(count):
+        workout = Workout(user_id=user.id, name=f'Workout {i}', duration=30)
+        for j in range(exercises_per_workout):
+            workout.exercises.append(WorkoutExercise(exercise_id=exercise_ids[j % len(exercise_ids)], sets=3, reps=10))
+        db.session.add(workout)
+    
+    db.session.commit()
+
+@pytest.mark.parametrize('exercises_per_workout', [2, 20])
+def test_get_workout_query_count(client, auth_headers, init_database, query_counter, exercises_per_workout):
+    _add_workouts(1, exercises_per_workout)
+    workout = Workout.query.filter_by(name='Workout 0').first()
+    query_counter.clear()
+    
+    response = client.get(f'/api/workouts/{workout.id}', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert len(response.json['exercises']) == exercises_per_workout
+    assert all(exercise['exercise'] is not None for exercise in response.json['exercises'])
+    # Conditional-GET validator, workout, then exercise rows joined to their catalog entries
+    assert len(query_counter) == 3
+
+@pytest.mark.parametrize('workout_count', [3, 10])
+def test_get_workouts_include_exercises_query_count(client, auth_headers, init_database, query_counter, workout_count):
+    _add_workouts(workout_count, 5)
+    query_counter.clear()
+    
+    response = client.get('/api/workouts?include=exercises&per_page=100', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert len(response.json['workouts']) == workout_count + 1
+    assert all('exercises' in workout for workout in response.json['workouts'])
+    # Validator, page count, page rows, then one batched load for every workout's exercises
+    assert len(query_counter) == 4
+
+def test_get_workouts_without_include(client, auth_headers, init_database):
+    response = client.get('/api/workouts', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert 'exercises' not in response.json['workouts'][0]
+
+def test_get_workouts_cursor_pagination(client, auth_headers, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    for day in (1, 2, 2, 3, 4):
+        db.session.add(Workout(user_id=user.id, name=f'Day {day}', date=date(2024, 1, day)))
+    db.session.commit()
+    
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get(f'/api/workouts?cursor={cursor}&per_page=2', headers=auth_headers)
+        assert response.status_code == 200
+        assert 'total' not in response.json
+        seen.extend(response.json['workouts'])
+        cursor = response.json['next_cursor']
+    
+    expected = Workout.query.filter_by(user_id=user.id).order_by(Workout.date.desc(), Workout.id.desc()).all()
+    assert [workout['id'] for workout in seen] == [workout.id for workout in expected]
+    
+    response = client.get('/api/workouts?cursor=&total=true', headers=auth_headers)
+    assert response.json['total'] == 6
+
+def test_cursor_pagination_edge_cases(client, auth_headers, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    for day in (None, 1, None, 2):
+        db.session.add(Workout(user_id=user.id, name=f'Day {day}', date=date(2024, 1, day) if day else None))
+    db.session.flush()
+    Workout.query.filter(Workout.name == 'Day None').update({'date': None})
+    db.session.commit()
+    
+    # Workouts without a date come last, and a cursor may stop on one
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get(f'/api/workouts?cursor={cursor}&per_page=1', headers=auth_headers)
+        assert response.status_code == 200
+        seen.extend(workout['id'] for workout in response.json['workouts'])
+        cursor = response.json['next_cursor']
+    workouts = {workout.id: workout for workout in Workout.query.filter_by(user_id=user.id)}
+    assert sorted(seen) == sorted(workouts)
+    assert [workouts[id].date is None for id in seen] == [False, False, False, True, True]
+    
+    for path in ('/api/workouts', '/api/exercises'):
+        response = client.get(f'{path}?cursor=&per_page=0', headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json['per_page'] == 1
+
+def test_filter_workouts(client, auth_headers, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    squats, running = (Exercise.query.filter_by(name=name).first() for name in ('Squats', 'Running'))
+    other = User(username='other', email='other@example.com', password='password')
+    db.session.add(other)
+    db.session.flush()
+    for owner, name, day, duration, exercises in (
+        (user, 'Leg Day', date(2024, 3, 4), 60, [squats]),
+        (user, 'leg day 2', date(2024, 3, 18), 40, [squats, running]),
+        (user, 'Easy Run', date(2024, 3, 20), 25, [running]),
+        (user, 'Legs 100%', date(2024, 4, 2), 90, [squats]),
+        (other, 'Leg Day', date(2024, 3, 5), 60, [squats])
+    ):
+        workout = Workout(user_id=owner.id, name=name, date=day, duration=duration)
+        workout.exercises = [WorkoutExercise(exercise_id=exercise.id) for exercise in exercises]
+        db.session.add(workout)
+    db.session.commit()
+    
+    def names(**params):
+        response = client.get('/api/workouts', query_string=params, headers=auth_headers)
+        assert response.status_code == 200
+        return [workout['name'] for workout in response.json['workouts']]
+    
+    # "Squats in March"
+    assert names(exercise_id=squats.id, **{'from': '2024-03-01', 'to': '2024-03-31'}) == ['leg day 2', 'Leg Day']
+    assert names(name='LEG') == ['Legs 100%', 'leg day 2', 'Leg Day']
+    assert names(name='100%') == ['Legs 100%']
+    assert names(name='_') == []
+    assert names(min_duration=40, max_duration=60) == ['leg day 2', 'Leg Day']
+    assert names(exercise_id=[squats.id, running.id]) == ['leg day 2']
+    assert names(**{'from': '2024-03-18', 'to': '2024-03-18'}) == ['leg day 2']
+    
+    # Filters apply in cursor mode too, including the total
+    response = client.get('/api/workouts', query_string={'name': 'leg', 'cursor': '', 'per_page': 2, 'total': 'true'}, headers=auth_headers)
+    assert response.json['total'] == 3
+    response = client.get('/api/workouts', query_string={'name': 'leg', 'cursor': response.json['next_cursor']}, headers=auth_headers)
+    assert [workout['name'] for workout in response.json['workouts']] == ['Leg Day']
+    
+    for params in ({'from': '03/01/2024'}, {'from': '2024-04-01', 'to': '2024-03-01'}, {'exercise_id': 'squats'},
+                   {'min_duration': '-5'}, {'max_duration': 'long'}):
+        response = client.get('/api/workouts', query_string=params, headers=auth_headers)
+        assert response.status_code == 400, params
+        assert 'error' in response.json
+
+def test_get_exercises_cursor_pagination(client, auth_headers, init_database):
+    response = client.get('/api/exercises?cursor=&per_page=2', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert [exercise['name'] for exercise in response.json['exercises']] == ['Push-ups', 'Running']
+    
+    response = client.get(f"/api/exercises?cursor={response.json['next_cursor']}&per_page=2", headers=auth_headers)
+    
+    assert [exercise['name'] for exercise in response.json['exercises']] == ['Squats']
+    assert response.json['next_cursor'] is None
+
+def test_invalid_cursor(client, auth_headers, init_database):
+    response = client.get('/api/workouts?cursor=not-a-cursor', headers=auth_headers)
+    assert response.status_code == 400
+    
+    response = client.get('/api/exercises?cursor=WyJhIl0', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_import_workouts_ndjson(client, auth_headers, init_database):
+    body = '\n'.join([
+        json.dumps({'date': '2023-05-01', 'workout': 'Legs', 'duration': 45, 'exercise': 'squats', 'sets': 5, 'reps': 5, 'weight': 100}),
+        json.dumps({'date': '2023-05-01', 'workout': 'Legs', 'exercise': 'Running', 'exercise_duration': 600, 'distance': 2.5}),
+        '{not json',
+        json.dumps({'date': '2023-05-02', 'workout': 'Rest day'}),
+        json.dumps({'date': '2023-05-03', 'workout': 'Arms', 'exercise': 'Curls'}),
+        json.dumps({'date': '05/04/2023', 'workout': 'Bad date'})
+    ])
+    
+    response = client.post('/api/workouts/import', data=body, content_type='application/x-ndjson', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert response.json['workouts_created'] == 2
+    assert response.json['exercises_created'] == 2
+    assert response.json['errors'] == [
+        {'line': 3, 'error': 'Invalid JSON'},
+        {'line': 5, 'error': "Unknown exercise 'Curls'"},
+        {'line': 6, 'error': "'date' must be in YYYY-MM-DD format"}
+    ]
+    
+    legs = Workout.query.filter_by(name='Legs').first()
+    assert legs.duration == 45
+    assert [(we.exercise.name, we.weight, we.distance) for we in legs.exercises] == [('Squats', 100.0, None), ('Running', None, 2.5)]
+    
+    response = client.get('/stats/summary', headers=auth_headers)
+    assert response.json['total_workouts'] == 3
+
+def test_import_workouts_csv(client, auth_headers, init_database, app):
+    app.config['IMPORT_BATCH_SIZE'] = 2
+    rows = ['date,workout,duration,exercise,sets,reps']
+    for day in range(1, 11):
+        rows.append(f'2023-06-{day:02d},Session {day},30,Push-ups,3,{day}')
+        rows.append(f'2023-06-{day:02d},Session {day},30,Squats,3,x')
+    
+    response = client.post('/api/workouts/import', data='\n'.join(rows), content_type='text/csv', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert response.json['workouts_created'] == 10
+    assert response.json['exercises_created'] == 10
+    assert response.json['error_count'] == 10
+    assert response.json['errors'][0] == {'line': 3, 'error': "'reps' must be a number"}
+    assert Workout.query.filter(Workout.name.like('Session %')).count() == 10
+
+@pytest.mark.parametrize('import_format', ['ndjson', 'csv'])
+def test_import_reports_bad_lines(client, auth_headers, init_database, import_format):
+    records = [
+        {'date': '2023-07-01', 'workout': 'Good', 'exercise': 'Squats', 'reps': 5},
+        {'date': '2023-07-02', 'workout': 'Caf\xe9', 'exercise': 'Squats', 'reps': 5},
+        {'date': '2023-07-03', 'workout': 'Partial reps', 'exercise': 'Squats', 'reps': 3.7},
+        {'date': '2023-07-04', 'workout': 'Whole', 'exercise': 'Squats', 'reps': 4.0}
+    ]
+    if import_format == 'csv':
+        lines = ['date,workout,exercise,reps'] + [','.join(str(value) for value in record.values()) for record in records]
+    else:
+        lines = [json.dumps(record, ensure_ascii=False) for record in records]
+    # Latin-1 rather than UTF-8 for the second record
+    body = b'\n'.join(line.encode('latin-1' if 'Caf' in line else 'utf-8') for line in lines)
+    
+    response = client.post(f'/api/workouts/import?format={import_format}', data=body, headers=auth_headers)
+    
+    assert response.status_code == 200
+    first = 2 if import_format == 'csv' else 1
+    assert response.json['errors'] == [
+        {'line': first + 1, 'error': 'Invalid UTF-8'},
+        {'line': first + 2, 'error': "'reps' must be a whole number"}
+    ]
+    assert sorted(name for (name,) in db.session.query(Workout.name).filter(Workout.date.between(date(2023, 7, 1), date(2023, 7, 31)))) == ['Good', 'Whole']
+    assert WorkoutExercise.query.join(Workout).filter(Workout.name == 'Whole').one().reps == 4
+
+def test_import_failure_keeps_rollup_current(client, auth_headers, init_database, app, monkeypatch):
+    from app.api.imports import WorkoutImporter
+    
+    app.config['IMPORT_BATCH_SIZE'] = 2
+    app.config['IMPORT_COMMIT_EVERY'] = 1
+    records = [{'date': f'2023-08-{day:02d}', 'workout': f'Session {day}', 'duration': 30} for day in range(1, 9)]
+    records[2]['duration'] = 10**20
+    records[7]['exercise'] = 'Squats'
+    body = '\n'.join(json.dumps(record) for record in records)
+    
+    summary = client.get('/stats/summary', headers=auth_headers)
+    
+    # The last record fails after two batches were committed
+    def resolve(self, name):
+        raise RuntimeError('catalog unavailable')
+    monkeypatch.setattr(WorkoutImporter, '_resolve_exercise', resolve)
+    with pytest.raises(RuntimeError):
+        client.post('/api/workouts/import', data=body, content_type='application/x-ndjson', headers=auth_headers)
+    
+    committed = Workout.query.filter(Workout.name.like('Session %')).count()
+    assert committed == 4
+    response = client.get('/stats/summary', headers={**auth_headers, 'If-None-Match': summary.headers['ETag']})
+    assert response.status_code == 200
+    assert response.json['total_workouts'] == summary.json['total_workouts'] + committed
+    
+    monkeypatch.undo()
+    response = client.post('/api/workouts/import', data=json.dumps(records[2]), content_type='application/x-ndjson', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['errors'] == [{'line': 1, 'error': "'duration' must be between 0 and 100000"}]
+
+def test_export_workouts_ndjson(client, auth_headers, init_database):
+    client.post('/api/workouts', json={'name': 'Old', 'date': '2020-01-01'}, headers=auth_headers)
+    
+    response = client.get('/api/workouts/export?since=2021-01-01', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record['exercise'] for record in records] == ['Push-ups', 'Running']
+    assert records[0]['workout'] == 'Test Workout'
+    assert records[0]['sets'] == 3
+    assert records[1]['exercise_duration'] == 600
+    assert 'weight' not in records[0]
+
+def test_export_import_round_trip(client, auth_headers, init_database):
+    response = client.get('/api/workouts/export?format=csv', headers=auth_headers)
+    
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    body = response.get_data(as_text=True)
+    assert body.splitlines()[0].startswith('date,workout,duration')
+    
+    token = client.post('/auth/register', json={
+        'username': 'importer', 'email': 'importer@example.com', 'password': 'password'
+    }).json['access_token']
+    other_headers = {'Authorization': f'Bearer {token}'}
+    
+    response = client.post('/api/workouts/import', data=body, content_type='text/csv', headers=other_headers)
+    
+    assert response.json['workouts_created'] == 1
+    assert response.json['exercises_created'] == 2
+    assert client.get('/api/workouts/export?format=csv', headers=other_headers).get_data(as_text=True) == body
+
+def test_export_invalid_arguments(client, auth_headers, init_database):
+    assert client.get('/api/workouts/export?format=xml', headers=auth_headers).status_code == 400
+    assert client.get('/api/workouts/export?since=yesterday', headers=auth_headers).status_code == 400
+
+def test_exercise_catalog_cache(client, auth_headers, init_database, query_counter):
+    response = client.get('/api/exercises?category=strength', headers=auth_headers)
+    etag = response.headers['ETag']
+    
+    assert response.status_code == 200
+    assert etag.startswith('W/')
+    
+    # Same page again is served from the cache, a matching ETag gets a 304
+    query_counter.clear()
+    response = client.get('/api/exercises?category=strength', headers=auth_headers)
+    assert response.json['exercises'][0]['name'] == 'Push-ups'
+    response = client.get('/api/exercises?category=strength', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert query_counter == []
+    
+    stats = client.get('/api/exercises/cache', headers=auth_headers).json
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    
+    # Writes bump the version, so the old ETag no longer matches
+    client.post('/api/exercises', json={'name': 'Deadlift', 'category': 'strength'}, headers=auth_headers)
+    response = client.get('/api/exercises?category=strength', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert [exercise['name'] for exercise in response.json['exercises']] == ['Deadlift', 'Push-ups', 'Squats']
+
+def test_exercise_etag_does_not_hide_missing_ids(client, auth_headers, init_database):
+    exercise = Exercise.query.first()
+    etag = client.get(f'/api/exercises/{exercise.id}', headers=auth_headers).headers['ETag']
+    headers = dict(auth_headers, **{'If-None-Match': etag})
+    
+    assert client.get(f'/api/exercises/{exercise.id}', headers=headers).status_code == 304
+    assert client.get('/api/exercises/9999', headers=headers).status_code == 404
+
+def test_search_exercises(client, auth_headers, init_database):
+    def search(q, **params):
+        response = client.get('/api/exercises', query_string=dict(params, q=q), headers=auth_headers)
+        assert response.status_code == 200
+        return [exercise['name'] for exercise in response.json['exercises']]
+    
+    assert sorted(search('body')) == ['Push-ups', 'Squats']
+    assert search('lower bod') == ['Squats']
+    assert search('RUN') == ['Running']
+    assert search('body', category='cardio') == []
+    assert search('!!!') == []
+    assert search('body', cursor='', per_page=1) == ['Push-ups']
+    
+    # The triggers keep the index in step with catalog writes
+    running = Exercise.query.filter_by(name='Running').first()
+    client.put(f'/api/exercises/{running.id}', json={'description': 'Outdoor jog'}, headers=auth_headers)
+    assert search('jog') == ['Running']
+    assert search('cardio') == []
+    created = client.post('/api/exercises', json={'name': 'Jogging Intervals'}, headers=auth_headers).json
+    assert search('jog') == ['Jogging Intervals', 'Running']  # name matches rank first
+    client.delete(f"/api/exercises/{created['id']}", headers=auth_headers)
+    assert search('jog') == ['Running']
+
+def test_suggest_exercises(app, client, auth_headers, init_database, query_counter):
+    for name in ('Bench Press', 'Press-ups', 'Overhead Press', 'Pull-ups'):
+        client.post('/api/exercises', json={'name': name}, headers=auth_headers)
+    
+    def suggest(prefix, **params):
+        response = client.get('/api/exercises/suggest', query_string=dict(params, prefix=prefix), headers=auth_headers)
+        assert response.status_code == 200
+        return [exercise['name'] for exercise in response.json]
+    
+    # Start-of-name matches first, then matches on a later word
+    assert suggest('pre') == ['Press-ups', 'Bench Press', 'Overhead Press']
+    assert suggest('P') == ['Press-ups', 'Pull-ups', 'Push-ups', 'Bench Press', 'Overhead Press']
+    assert suggest('p', limit=2) == ['Press-ups', 'Pull-ups']
+    assert suggest('bench  PR') == ['Bench Press']
+    assert suggest('x') == []
+    assert suggest('') == []
+    
+    # Served from the trie without touching the database
+    query_counter.clear()
+    assert suggest('squ') == ['Squats']
+    assert query_counter == []
+    
+    client.put(f"/api/exercises/{Exercise.query.filter_by(name='Squats').first().id}", json={'name': 'Back Squats'}, headers=auth_headers)
+    assert suggest('squ') == ['Back Squats']
+    assert app.extensions['exercise_suggest'].builds == 2
+
+def test_lru_cache_eviction():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 2, 'misses': 1}
+
+@pytest.mark.parametrize('provider', ['stdlib', 'orjson'])
+def test_row_serializers_match_to_dict(app, client, auth_headers, init_database, provider):
+    if provider == 'orjson':
+        pytest.importorskip('orjson')
+    app.json = json_provider_class(provider)(app)
+    workout = Workout.query.first()
+    
+    response = client.get(f'/api/workouts/{workout.id}', headers=auth_headers)
+    assert response.json == workout.to_dict(include_exercises=True)
+    
+    response = client.get('/api/workouts?include=exercises', headers=auth_headers)
+    assert response.json['workouts'] == [workout.to_dict(include_exercises=True)]
+    
+    response = client.get('/api/exercises', headers=auth_headers)
+    assert response.json['exercises'] == [exercise.to_dict() for exercise in Exercise.query.order_by(Exercise.name)]
@@ -1,7 +1,10 @@
 import json
+import threading
+import time
 import pytest
 from app import db
 from app.models import User
+from app.passwords import PasswordHasher, HashingExecutor, HashingBusy
 
 def test_register(client):
     response = client.post('/auth/register', json={
@@ -69,3 +72,89 @@ def test_update_profile(client, auth_headers, init_database):
     user = User.query.filter_by(username='updateduser').first()
     assert user is not None
     assert user.email == 'updated@example.com'
+
+def test_profile_served_from_cached_principal(client, auth_headers, init_database, query_counter):
+    query_counter.clear()
+    response = client.get('/auth/profile', headers=auth_headers)
+    
+    # Login cached the principal, so neither the token nor the profile reads users
+    assert response.status_code == 200
+    assert response.json['username'] == 'testuser'
+    assert query_counter == []
+    
+    client.put('/auth/profile', json={'email': 'updated@example.com'}, headers=auth_headers)
+    response = client.get('/auth/profile', headers=auth_headers)
+    assert response.json['email'] == 'updated@example.com'
+
+def test_deleted_user_token_is_revoked(app, client, auth_headers, init_database, query_counter):
+    user = User.query.filter_by(username='testuser').first()
+    db.session.delete(user)
+    db.session.commit()
+    
+    query_counter.clear()
+    response = client.get('/api/workouts', headers=auth_headers)
+    
+    assert response.status_code == 401
+    assert query_counter == []
+    assert app.extensions['principal_cache'].stats()['revoked'] == 1
+
+def test_principal_cache_expires_entries(app, client, auth_headers, init_database):
+    cache = app.extensions['principal_cache']
+    cache.ttl = 0
+    cache.clear()
+    misses = cache.misses
+    
+    assert client.get('/auth/profile', headers=auth_headers).status_code == 200
+    assert client.get('/auth/profile', headers=auth_headers).status_code == 200
+    
+    assert cache.misses == misses + 2
+    assert cache.hits == 0
+
+def test_login_rehashes_outdated_password(app, client, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    assert user.password_hash.startswith('pbkdf2:sha256:1000$')
+    
+    app.extensions['password_hasher'] = PasswordHasher('sha256', 2000)
+    response = client.post('/auth/login', json={'username': 'testuser', 'password': 'password'})
+    
+    assert response.status_code == 200
+    user = User.query.filter_by(username='testuser').first()
+    assert user.password_hash.startswith('pbkdf2:sha256:2000$')
+    assert user.check_password('password')
+
+def test_hashing_executor_rejects_when_full():
+    release = threading.Event()
+    executor = HashingExecutor(workers=1, max_queue=1, timeout=5)
+    
+    # One hash running and one waiting fills the executor
+    threads = []
+    for field in ('running', 'queue_depth'):
+        threads.append(threading.Thread(target=executor.run, args=(release.wait,)))
+        threads[-1].start()
+        while executor.stats()[field] < 1:
+            time.sleep(0.01)
+    
+    with pytest.raises(HashingBusy):
+        executor.run(lambda: None)
+    
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    stats = executor.stats()
+    assert stats['completed'] == 2
+    assert stats['rejected'] == 1
+    assert stats['peak_queue_depth'] == 1
+    assert stats['queue_depth'] == 0
+
+def test_login_returns_503_when_hashing_is_saturated(app, client, init_database):
+    executor = app.extensions['password_hasher'].executor
+    
+    def busy(*args):
+        raise HashingBusy()
+    executor.run = busy
+    
+    response = client.post('/auth/login', json={'username': 'testuser', 'password': 'password'})
+    
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
@@ -0,0 +1,116 @@
+import pytest
+from app import create_app, db
+from config import config
+from app.models import Workout
+
+@pytest.fixture
+def production_app(tmp_path, monkeypatch):
+    monkeypatch.setitem(config, 'wal', type('WALConfig', (config['testing'],), {
+        'SQLITE_PROFILE': 'production',
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'wal.sqlite')
+    }))
+    app = create_app('wal')
+    
+    with app.app_context():
+        yield app
+        db.engine.dispose()
+
+def test_production_profile_sets_pragmas(production_app):
+    connection = db.session.connection()
+    
+    def pragma(name):
+        return connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+    
+    assert pragma('journal_mode') == 'wal'
+    assert pragma('synchronous') == 1  # NORMAL
+    assert pragma('busy_timeout') == 5000
+    assert pragma('cache_size') == -16000
+    assert db.engine.pool.size() == 5
+
+def test_production_profile_sets_replica_pragmas(tmp_path, monkeypatch):
+    monkeypatch.setitem(config, 'wal_replica', type('WALReplicaConfig', (config['testing'],), {
+        'SQLITE_PROFILE': 'production',
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'wal.sqlite'),
+        'SQLALCHEMY_BINDS': {'replica': 'sqlite:///' + str(tmp_path / 'replica.sqlite')}
+    }))
+    app = create_app('wal_replica')
+    
+    with app.app_context():
+        try:
+            with db.engines['replica'].connect() as connection:
+                assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+                assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+        finally:
+            for engine in db.engines.values():
+                engine.dispose()
+            db.metadatas.pop('replica', None)
+
+def test_default_profile_leaves_sqlite_defaults(app):
+    assert db.session.connection().exec_driver_sql('PRAGMA journal_mode').scalar() == 'delete'
+
+def test_unknown_profile_is_rejected(monkeypatch):
+    monkeypatch.setitem(config, 'typo', type('TypoConfig', (config['testing'],), {'SQLITE_PROFILE': 'fast'}))
+    
+    with pytest.raises(ValueError):
+        create_app('typo')
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    monkeypatch.setitem(config, 'replica', type('ReplicaConfig', (config['testing'],), {
+        'SQLALCHEMY_BINDS': {'replica': 'sqlite:///' + str(tmp_path / 'replica.sqlite')}
+    }))
+    app = create_app('replica')
+    
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        db.drop_all(bind_key=None)
+        for engine in db.engines.values():
+            engine.dispose()
+        # db is shared by every app; later apps have no 'replica' bind
+        db.metadatas.pop('replica', None)
+
+def sync_replica():
+    # Stands in for replication: copies the primary file onto the replica
+    db.session.commit()
+    primary = db.engines[None].raw_connection()
+    replica = db.engines['replica'].raw_connection()
+    primary.driver_connection.backup(replica.driver_connection)
+    primary.close()
+    replica.close()
+
+def test_read_only_routes_use_replica(replica_app):
+    client = replica_app.test_client()
+    response = client.post('/auth/register', json={'username': 'reader', 'email': 'reader@example.com', 'password': 'password'})
+    headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+    user_id = response.json['user']['id']
+    client.post('/api/workouts', json={'name': 'Synced', 'duration': 30}, headers=headers)
+    sync_replica()
+    replica_app.extensions['replica_router'].recent_writers.clear()
+    
+    # Written straight to the primary, so only the primary has it
+    db.session.add(Workout(user_id=user_id, name='Unsynced', duration=10))
+    db.session.commit()
+    
+    assert client.get('/api/workouts', headers=headers).json['total'] == 1
+    assert client.get('/stats/summary', headers=headers).json['workouts_last_30_days'] == 1
+    
+    sync_replica()
+    assert client.get('/api/workouts', headers=headers).json['total'] == 2
+
+def test_reads_after_write_stay_on_primary(replica_app):
+    client = replica_app.test_client()
+    response = client.post('/auth/register', json={'username': 'writer', 'email': 'writer@example.com', 'password': 'password'})
+    headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+    sync_replica()
+    
+    # The replica never sees this workout, but its author reads it back at once
+    client.post('/api/workouts', json={'name': 'Fresh', 'duration': 30}, headers=headers)
+    response = client.get('/api/workouts', headers=headers)
+    
+    assert [workout['name'] for workout in response.json['workouts']] == ['Fresh']
+    assert replica_app.extensions['replica_router'].is_sticky(response.json['workouts'][0]['user_id'])
+
+def test_replica_routing_is_off_without_bind(app):
+    assert app.extensions['replica_router'] is None
@@ -0,0 +1,56 @@
+import logging
+import pytest
+import re
+
+def test_server_timing_header(client, auth_headers, init_database):
+    response = client.get('/api/workouts?include=exercises', headers=auth_headers)
+    
+    timing = response.headers['Server-Timing']
+    assert re.match(r'db;dur=[\d.]+;desc="4 queries", app;dur=[\d.]+, total;dur=[\d.]+$', timing)
+
+def test_requests_over_budget_are_logged(app, client, auth_headers, init_database, caplog):
+    app.extensions['instrumentation'].query_budget = 2
+    
+    with caplog.at_level(logging.WARNING):
+        client.get('/api/workouts/1', headers=auth_headers)
+        client.get('/auth/profile', headers=auth_headers)
+    
+    over_budget = [record.getMessage() for record in caplog.records if 'over budget' in record.getMessage()]
+    assert len(over_budget) == 1
+    assert 'GET /api/workouts/1' in over_budget[0]
+    assert 'with 3 queries' in over_budget[0]
+
+def test_metrics_endpoint(client, auth_headers, init_database):
+    client.get('/stats/summary', headers=auth_headers)
+    client.get('/stats/summary', headers=auth_headers)
+    
+    response = client.get('/metrics')
+    body = response.get_data(as_text=True)
+    
+    assert response.mimetype == 'text/plain'
+    assert '# TYPE http_request_duration_seconds histogram' in body
+    assert 'http_request_duration_seconds_count{endpoint="stats.get_summary_stats",method="GET"} 2' in body
+    assert 'http_request_queries_bucket{endpoint="auth.login",method="POST",le="+Inf"} 1' in body
+    assert re.search(r'http_request_queries_sum\{endpoint="stats.get_summary_stats",method="GET"\} \d+', body)
+
+def test_failed_requests_are_recorded(app, client):
+    def fail():
+        raise RuntimeError('boom')
+    app.add_url_rule('/fail', 'fail', fail)
+    
+    # Testing propagates the exception past after_request
+    with pytest.raises(RuntimeError):
+        client.get('/fail')
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    assert client.get('/fail').status_code == 500
+    
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{endpoint="fail",method="GET"} 2' in body
+
+def test_metrics_token(app, client):
+    app.extensions['instrumentation'].metrics_token = 'scrape-secret'
+    
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer caf\xe9'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
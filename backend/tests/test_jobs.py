@@ -0,0 +1,175 @@
+import os
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models import Job, User, UserStats
+from app.jobs.queue import HANDLERS, JobWorker, handler, claim, enqueue, requeue_stale
+
+@pytest.fixture
+def worker(app):
+    return JobWorker(app, threads=1, poll_interval=0)
+
+@pytest.fixture
+def flaky_handler():
+    calls = []
+    
+    @handler('test.flaky')
+    def flaky(job, payload):
+        calls.append(job.attempts)
+        if len(calls) < payload['fail_times'] + 1:
+            raise RuntimeError('temporary failure')
+        return {'calls': len(calls)}
+    
+    yield calls
+    del HANDLERS['test.flaky']
+
+def test_stats_rebuild_runs_in_background(client, auth_headers, init_database, worker):
+    response = client.post('/stats/rebuild', headers=auth_headers)
+    job_id = response.json['id']
+    
+    assert response.status_code == 202
+    assert response.headers['Location'] == f'/api/jobs/{job_id}'
+    assert client.get(f'/api/jobs/{job_id}', headers=auth_headers).json['status'] == 'queued'
+    
+    worker.work_once()
+    
+    job = client.get(f'/api/jobs/{job_id}', headers=auth_headers).json
+    assert job['status'] == 'succeeded'
+    assert job['attempts'] == 1
+    assert job['result'] == {'total_workouts': 1, 'total_duration': 30}
+
+def test_job_status_is_private(client, auth_headers, init_database):
+    other = User(username='other', email='other@example.com', password='password')
+    db.session.add(other)
+    db.session.commit()
+    job = enqueue('stats.rebuild', other.id)
+    db.session.commit()
+    
+    assert client.get(f'/api/jobs/{job.id}', headers=auth_headers).status_code == 404
+
+def test_failed_jobs_retry_with_backoff(app, init_database, worker, flaky_handler):
+    user = User.query.filter_by(username='testuser').first()
+    job = enqueue('test.flaky', user.id, {'fail_times': 1})
+    db.session.commit()
+    
+    started = datetime.utcnow()
+    worker.work_once()
+    job = db.session.get(Job, job.id)
+    assert job.status == 'queued'
+    assert 'temporary failure' in job.error
+    assert job.run_after >= started + timedelta(seconds=app.config['JOB_RETRY_BACKOFF'])
+    
+    # Not due yet, then due
+    assert worker.work_once() is None
+    job.run_after = datetime.utcnow()
+    db.session.commit()
+    job = worker.work_once()
+    
+    assert job.status == 'succeeded'
+    assert flaky_handler == [1, 2]
+
+def test_jobs_fail_after_max_attempts(app, init_database, worker, flaky_handler):
+    user = User.query.filter_by(username='testuser').first()
+    job = enqueue('test.flaky', user.id, {'fail_times': 10})
+    db.session.commit()
+    
+    for _ in range(app.config['JOB_MAX_ATTEMPTS']):
+        db.session.get(Job, job.id).run_after = datetime.utcnow()
+        db.session.commit()
+        worker.work_once()
+    
+    job = db.session.get(Job, job.id)
+    assert job.status == 'failed'
+    assert job.attempts == app.config['JOB_MAX_ATTEMPTS']
+    assert job.finished_at is not None
+
+def test_claim_respects_per_user_concurrency(init_database):
+    user = User.query.filter_by(username='testuser').first()
+    other = User(username='other', email='other@example.com', password='password')
+    db.session.add(other)
+    db.session.commit()
+    first = enqueue('stats.rebuild', user.id)
+    enqueue('stats.rebuild', user.id)
+    third = enqueue('stats.rebuild', other.id)
+    db.session.commit()
+    
+    assert claim('w1').id == first.id
+    # The user's second job waits for the first to finish
+    assert claim('w2').id == third.id
+    assert claim('w3') is None
+
+def test_stale_running_jobs_are_requeued(init_database):
+    user = User.query.filter_by(username='testuser').first()
+    job = enqueue('stats.rebuild', user.id)
+    db.session.commit()
+    claim('w1')
+    db.session.get(Job, job.id).locked_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+    
+    assert requeue_stale(lease_seconds=60) == 1
+    assert db.session.get(Job, job.id, populate_existing=True).status == 'queued'
+
+def test_stale_sweep_skips_the_running_workers_jobs(app, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    job = enqueue('stats.rebuild', user.id)
+    db.session.commit()
+    claim('host:1/0')
+    db.session.get(Job, job.id).locked_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+    
+    # Still running in this worker, just slow
+    JobWorker(app, name='host:1').requeue_stale(own_jobs_alive=True)
+    assert db.session.get(Job, job.id, populate_existing=True).status == 'running'
+    
+    JobWorker(app, name='host:10').requeue_stale(own_jobs_alive=True)
+    assert db.session.get(Job, job.id, populate_existing=True).status == 'queued'
+
+def test_stale_jobs_without_attempts_left_fail(init_database):
+    # A crashed import may have committed some batches; running it again would duplicate them
+    user = User.query.filter_by(username='testuser').first()
+    job = enqueue('workouts.import', user.id, {'path': 'missing.ndjson', 'format': 'ndjson'})
+    db.session.commit()
+    claim('w1')
+    db.session.get(Job, job.id).locked_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+    
+    assert requeue_stale(lease_seconds=60) == 0
+    job = db.session.get(Job, job.id, populate_existing=True)
+    assert (job.status, job.attempts, job.locked_by) == ('failed', 1, None)
+    assert job.finished_at is not None
+    assert claim('w2') is None
+
+def test_queue_limit_returns_429(app, client, auth_headers, init_database):
+    app.config['JOB_USER_QUEUE_LIMIT'] = 1
+    
+    assert client.post('/stats/rebuild', headers=auth_headers).status_code == 202
+    response = client.post('/stats/rebuild', headers=auth_headers)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+
+def test_async_import(app, client, auth_headers, init_database, tmp_path, worker):
+    app.config['JOB_SPOOL_DIR'] = str(tmp_path)
+    body = '{"date": "2024-02-01", "workout": "Imported", "exercise": "Squats", "sets": 3}\n'
+    
+    response = client.post('/api/workouts/import?async=true', data=body, content_type='application/x-ndjson', headers=auth_headers)
+    assert response.status_code == 202
+    assert len(os.listdir(tmp_path)) == 1
+    
+    worker.work_once()
+    
+    job = client.get(f"/api/jobs/{response.json['id']}", headers=auth_headers).json
+    assert job['status'] == 'succeeded'
+    assert job['result']['workouts_created'] == 1
+    assert job['max_attempts'] == 1
+    assert os.listdir(tmp_path) == []
+    user = User.query.filter_by(username='testuser').first()
+    assert db.session.get(UserStats, user.id, populate_existing=True).total_workouts == 2
+
+def test_worker_command_drains_queue(app, runner, client, auth_headers, init_database):
+    client.post('/stats/rebuild', headers=auth_headers)
+    client.post('/stats/rebuild', headers=auth_headers)
+    
+    result = runner.invoke(args=['worker', '--burst', '--threads', '1'])
+    
+    assert 'Processed 2 job(s)' in result.output
+    assert Job.query.filter_by(status='succeeded').count() == 2
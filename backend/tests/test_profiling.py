@@ -0,0 +1,57 @@
+import os
+import pstats
+import pytest
+from app import create_app, db
+from config import config
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Replaces the conftest app so the shared fixtures run with profiling on
+    monkeypatch.setitem(config, 'profiled', type('ProfiledConfig', (config['testing'],), {
+        'PROFILER_ENABLED': True,
+        'PROFILER_DIR': str(tmp_path / 'profiles'),
+        'PROFILER_TOKEN': 'let-me-profile',
+        'PROFILER_MAX_FILES': 2
+    }))
+    app = create_app('profiled')
+    
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def test_profile_header_writes_pstats_and_collapsed_stacks(app, client, auth_headers, init_database):
+    response = client.get('/api/workouts', headers=dict(auth_headers, **{'X-Profile': 'let-me-profile'}))
+    profile_id = response.headers['X-Profile-Id']
+    path = os.path.join(app.config['PROFILER_DIR'], profile_id)
+    
+    assert response.status_code == 200
+    assert 'api.get_workouts' in profile_id
+    stats = pstats.Stats(path + '.pstats')
+    assert any(function == 'get_workouts' for _, _, function in stats.stats)
+    assert os.path.exists(path + '.collapsed')
+
+def test_unauthorized_header_is_ignored(client, auth_headers, init_database):
+    for guess in ('guess', 'caf\xe9'):
+        response = client.get('/api/workouts', headers=dict(auth_headers, **{'X-Profile': guess}))
+        
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response.headers
+
+def test_sampling_honours_endpoint_allowlist(app, client, auth_headers, init_database):
+    profiler = app.extensions['profiler']
+    profiler.sample_rate = 1.0
+    profiler.endpoints = frozenset(['stats.get_summary_stats'])
+    
+    assert 'X-Profile-Id' in client.get('/stats/summary', headers=auth_headers).headers
+    assert 'X-Profile-Id' not in client.get('/api/workouts', headers=auth_headers).headers
+
+def test_profile_directory_is_capped(app, client, auth_headers, init_database):
+    headers = dict(auth_headers, **{'X-Profile': 'let-me-profile'})
+    profile_ids = [client.get('/auth/profile', headers=headers).headers['X-Profile-Id'] for _ in range(3)]
+    
+    # Two profiles of two files each are kept, the oldest is removed
+    remaining = sorted(os.listdir(app.config['PROFILER_DIR']))
+    assert len(remaining) == 4
+    assert not any(name.startswith(profile_ids[0]) for name in remaining)
@@ -0,0 +1,114 @@
+import re
+import pytest
+from flask import has_request_context
+from sqlalchemy import event
+from app import db
+from app.models import Exercise, Workout
+
+# Matches a plain full table scan; index scans read "SCAN <table> USING ..."
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+
+def _exercise_routes(client, auth_headers):
+    # Hits every blueprint route at least once, returning (method, path) pairs
+    workout = Workout.query.first()
+    exercise = Exercise.query.filter_by(name='Squats').first()
+    calls = []
+
+    def call(method, path, **kwargs):
+        response = client.open(path, method=method, headers=auth_headers, **kwargs)
+        assert response.status_code < 400, (method, path, response.status_code)
+        calls.append((method, path))
+        return response
+
+    call('POST', '/auth/register', json={'username': 'planner', 'email': 'planner@example.com', 'password': 'password'})
+    call('POST', '/auth/login', json={'username': 'testuser', 'password': 'password'})
+    call('GET', '/auth/profile')
+    call('PUT', '/auth/profile', json={'email': 'changed@example.com'})
+    call('GET', '/auth/hashing')
+    call('GET', '/auth/principals')
+
+    call('GET', '/api/exercises')
+    call('GET', '/api/exercises?category=strength')
+    call('GET', '/api/exercises?q=body&category=strength')
+    call('GET', '/api/exercises?q=squ&cursor=&per_page=1')
+    call('GET', '/api/exercises/suggest?prefix=sq')
+    next_cursor = call('GET', '/api/exercises?cursor=&per_page=1&total=true').json['next_cursor']
+    call('GET', f'/api/exercises?cursor={next_cursor}&per_page=1&category=strength')
+    call('GET', f'/api/exercises/{exercise.id}')
+    call('GET', '/api/exercises/cache')
+    new_exercise = call('POST', '/api/exercises', json={'name': 'Lunges', 'category': 'strength'}).json
+    call('PUT', f"/api/exercises/{new_exercise['id']}", json={'description': 'Alternating legs'})
+    call('DELETE', f"/api/exercises/{new_exercise['id']}")
+
+    new_workout = call('POST', '/api/workouts', json={'name': 'Plan Check', 'duration': 20}).json
+    call('GET', '/api/workouts')
+    call('GET', '/api/workouts?include=exercises')
+    next_cursor = call('GET', '/api/workouts?cursor=&per_page=1&total=true').json['next_cursor']
+    call('GET', f'/api/workouts?cursor={next_cursor}&per_page=1')
+    call('GET', f'/api/workouts?from=2020-01-01&to=2030-12-31&name=test&exercise_id={exercise.id}&min_duration=10&max_duration=90')
+    call('GET', f'/api/workouts?cursor=&exercise_id={exercise.id}&min_duration=10')
+    call('GET', f'/api/workouts/{workout.id}')
+    call('PUT', f"/api/workouts/{new_workout['id']}", json={'duration': 25, 'date': '2024-01-01'})
+    workout_exercise = call('POST', f"/api/workouts/{new_workout['id']}/exercises", json={'exercise_id': exercise.id}).json
+    call('PUT', f"/api/workouts/{new_workout['id']}/exercises/{workout_exercise['id']}", json={'sets': 5})
+    call('DELETE', f"/api/workouts/{new_workout['id']}/exercises/{workout_exercise['id']}")
+    call('PATCH', f"/api/workouts/{new_workout['id']}/exercises", json=[{'op': 'add', 'exercise_id': exercise.id}])
+    call('DELETE', f"/api/workouts/{new_workout['id']}")
+    call('GET', '/api/workouts/export?since=2024-01-01').get_data()
+    call('POST', '/api/workouts/import', data='{"date": "2024-02-01", "workout": "Imported", "exercise": "Squats"}', content_type='application/x-ndjson')
+
+    call('GET', '/stats/summary')
+    call('GET', '/stats/monthly')
+    call('GET', '/stats/calendar?year=2024')
+    call('GET', '/stats/timeseries?bucket=week&from=2024-01-01&to=2024-03-31')
+    call('GET', '/stats/exercises')
+    personal_records = call('GET', '/stats/records').json
+    call('GET', f"/stats/records/{personal_records[0]['exercise_id']}")
+    call('GET', '/stats/load?from=2024-01-01&to=2024-03-31')
+    call('GET', f'/stats/progress/{exercise.id}')
+    call('GET', '/stats/cache')
+    job = call('POST', '/stats/rebuild').json
+    call('GET', f"/api/jobs/{job['id']}")
+    
+    call('GET', '/metrics')
+
+    return calls
+
+@pytest.fixture
+def captured_statements(app):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # Only statements issued while serving a request, not test setup
+        if has_request_context() and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', capture)
+
+def test_every_route_is_covered(app, client, auth_headers, init_database):
+    calls = _exercise_routes(client, auth_headers)
+
+    adapter = app.url_map.bind('localhost')
+    covered = {adapter.match(path.split('?')[0], method=method)[0] for method, path in calls}
+    routes = {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != 'static'}
+
+    # New routes must be added to _exercise_routes so their queries get checked
+    assert routes - covered == set()
+
+def test_hot_queries_use_indexes(app, client, auth_headers, init_database, captured_statements):
+    _exercise_routes(client, auth_headers)
+
+    tables = set(db.metadata.tables)
+    connection = db.session.connection()
+    full_scans = []
+    for statement, parameters in dict.fromkeys(captured_statements):
+        if not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            continue
+        for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters):
+            match = FULL_SCAN.match(row[3])
+            if match and match.group(1) in tables:
+                full_scans.append((match.group(1), statement))
+
+    assert full_scans == []
@@ -0,0 +1,531 @@
+import random
+from datetime import date, datetime, timedelta
+import pytest
+from app import db
+from app.cache import VersionedCache
+from app.models import User, Exercise, Workout, WorkoutExercise, UserStats, UserExerciseStats, PersonalRecord, WorkoutStreak
+from app.stats import rollup, records, streaks, timeseries, analytics
+from app.stats.history import UserHistory, HistoryCache
+
+def test_bucket_start():
+    day = date(2024, 3, 14)  # Thursday
+
+    assert timeseries.bucket_start(day, 'day') == day
+    assert timeseries.bucket_start(day, 'week') == date(2024, 3, 11)
+    assert timeseries.bucket_start(day, 'month') == date(2024, 3, 1)
+    assert timeseries.bucket_start(day, 'year') == date(2024, 1, 1)
+    assert timeseries.shift_buckets(day, 'month', 3) == date(2023, 12, 1)
+    assert list(timeseries.iter_buckets(date(2023, 11, 20), date(2024, 2, 1), 'month')) == [
+        date(2023, 11, 1), date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 1)
+    ]
+
+def test_timeseries_week(client, auth_headers, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    squats = Exercise.query.filter_by(name='Squats').first()
+
+    monday = Workout(user_id=user.id, name='Monday', date=date(2024, 3, 11), duration=40)
+    sunday = Workout(user_id=user.id, name='Sunday', date=date(2024, 3, 17), duration=20)
+    later = Workout(user_id=user.id, name='Later', date=date(2024, 3, 27), duration=15)
+    db.session.add_all([monday, sunday, later])
+    db.session.commit()
+
+    db.session.add_all([
+        WorkoutExercise(workout_id=monday.id, exercise_id=squats.id, sets=3, reps=10, weight=50.0),
+        WorkoutExercise(workout_id=monday.id, exercise_id=squats.id, sets=2, reps=5, weight=60.0)
+    ])
+    db.session.commit()
+
+    response = client.get('/stats/timeseries?bucket=week&from=2024-03-11&to=2024-03-31', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json['bucket'] == 'week'
+    assert response.json['series'] == [
+        {'start': '2024-03-11', 'count': 2, 'duration': 60, 'volume': 2100.0},
+        {'start': '2024-03-18', 'count': 0, 'duration': 0, 'volume': 0},
+        {'start': '2024-03-25', 'count': 1, 'duration': 15, 'volume': 0}
+    ]
+
+def test_timeseries_invalid_arguments(client, auth_headers, init_database):
+    response = client.get('/stats/timeseries?bucket=hour', headers=auth_headers)
+    assert response.status_code == 400
+
+    response = client.get('/stats/timeseries?from=2024-13-01', headers=auth_headers)
+    assert response.status_code == 400
+
+    response = client.get('/stats/timeseries?from=2024-03-02&to=2024-03-01', headers=auth_headers)
+    assert response.status_code == 400
+
+    response = client.get('/stats/timeseries?bucket=day&from=1900-01-01&to=2024-01-01', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_timeseries_at_calendar_edges(client, auth_headers, init_database):
+    # The default range stops at the first representable day
+    response = client.get('/stats/timeseries?bucket=day&to=0001-01-03', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['from'] == '0001-01-01'
+    assert len(response.json['series']) == 3
+
+    # Buckets stop at the last one before year 10000
+    response = client.get('/stats/timeseries?bucket=month&from=9999-01-01&to=9999-12-31', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['series'][-1]['start'] == '9999-12-01'
+    assert len(response.json['series']) == 12
+
+    for bucket in ('week', 'year'):
+        response = client.get(f'/stats/timeseries?bucket={bucket}&from=9999-12-01&to=9999-12-31', headers=auth_headers)
+        assert response.status_code == 200
+
+def test_monthly_stats(client, auth_headers, init_database):
+    response = client.get('/stats/monthly', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(response.json) == 12
+
+    today = datetime.utcnow().date()
+    assert response.json[0]['year'] == today.year
+    assert response.json[0]['month'] == today.month
+    assert response.json[0]['count'] == 1
+    assert response.json[0]['duration'] == 30
+    assert all(entry['count'] == 0 for entry in response.json[1:])
+
+def _assert_rollup_consistent(user_id):
+    live = rollup.compute_live(user_id)
+    stats = db.session.get(UserStats, user_id)
+
+    assert stats.total_workouts == live['total_workouts']
+    assert stats.total_duration == live['total_duration']
+    assert stats.last_workout_date == live['last_workout_date']
+    assert {row.exercise_id: row.count for row in UserExerciseStats.query.filter_by(user_id=user_id)} == live['exercise_counts']
+
+    top = max(live['exercise_counts'].values(), default=0)
+    assert stats.most_frequent_exercise_count == top
+    if top:
+        assert live['exercise_counts'][stats.most_frequent_exercise_id] == top
+
+    stored_records = {
+        record.exercise_id: {field: getattr(record, field) for field in records.RECORD_FIELDS}
+        for record in PersonalRecord.query.filter_by(user_id=user_id)
+    }
+    assert stored_records == records.compute_live(user_id)
+
+    live_runs = streaks.compute_live(user_id)
+    stored_runs = WorkoutStreak.query.filter_by(user_id=user_id).order_by(WorkoutStreak.start_date).all()
+    assert [(run.start_date, run.end_date) for run in stored_runs] == live_runs
+    assert all(run.days == (run.end_date - run.start_date).days + 1 for run in stored_runs)
+    assert stats.longest_streak == max((run.days for run in stored_runs), default=0)
+
+def test_summary_stats(client, auth_headers, init_database):
+    response = client.get('/stats/summary', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json['total_workouts'] == 1
+    assert response.json['total_duration_minutes'] == 30
+    assert response.json['workouts_last_30_days'] == 1
+    assert response.json['most_frequent_exercise'] == 'Push-ups'
+    assert response.json['last_workout_date'] == Workout.query.first().date.isoformat()
+
+def test_rollup_matches_live_queries(client, auth_headers, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    running = Exercise.query.filter_by(name='Running').first()
+    squats = Exercise.query.filter_by(name='Squats').first()
+
+    # Build the rollup from the fixture data
+    client.get('/stats/summary', headers=auth_headers)
+    _assert_rollup_consistent(user.id)
+
+    response = client.post('/api/workouts', json={'name': 'Leg Day', 'date': '2030-01-05', 'duration': 50}, headers=auth_headers)
+    workout_id = response.json['id']
+    _assert_rollup_consistent(user.id)
+
+    for exercise in (running, squats, running):
+        response = client.post(f'/api/workouts/{workout_id}/exercises', json={'exercise_id': exercise.id}, headers=auth_headers)
+    _assert_rollup_consistent(user.id)
+    assert db.session.get(UserStats, user.id).most_frequent_exercise_id == running.id
+
+    client.put(f'/api/workouts/{workout_id}', json={'date': '2020-01-05', 'duration': 20}, headers=auth_headers)
+    _assert_rollup_consistent(user.id)
+
+    client.delete(f"/api/workouts/{workout_id}/exercises/{response.json['id']}", headers=auth_headers)
+    _assert_rollup_consistent(user.id)
+
+    client.delete(f'/api/workouts/{workout_id}', headers=auth_headers)
+    _assert_rollup_consistent(user.id)
+
+    response = client.get('/stats/summary', headers=auth_headers)
+    assert response.json['total_workouts'] == 1
+    assert response.json['total_duration_minutes'] == 30
+
+def test_rollup_after_batch_exercise_changes(client, auth_headers, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    workout = Workout.query.filter_by(user_id=user.id).first()
+    push_ups, running, squats = (Exercise.query.filter_by(name=name).first() for name in ('Push-ups', 'Running', 'Squats'))
+    client.get('/stats/summary', headers=auth_headers)
+    push_up_row = WorkoutExercise.query.filter_by(workout_id=workout.id, exercise_id=push_ups.id).first()
+
+    # Removing the current favourite while adding others in the same batch
+    client.patch(f'/api/workouts/{workout.id}/exercises', json=[
+        {'op': 'delete', 'id': push_up_row.id},
+        {'op': 'add', 'exercise_id': squats.id},
+        {'op': 'add', 'exercise_id': squats.id},
+        {'op': 'add', 'exercise_id': running.id}
+    ], headers=auth_headers)
+
+    _assert_rollup_consistent(user.id)
+    assert db.session.get(UserStats, user.id).most_frequent_exercise_id == running.id
+
+def test_stats_rebuild_command(runner, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    db.session.add(UserStats(user_id=user.id, total_workouts=99, total_duration=0, most_frequent_exercise_count=0))
+    db.session.commit()
+
+    result = runner.invoke(args=['stats', 'rebuild'])
+
+    assert 'Rebuilt stats for 1 user(s)' in result.output
+    _assert_rollup_consistent(user.id)
+
+def test_conditional_get(client, auth_headers, init_database, query_counter):
+    client.get('/stats/summary', headers=auth_headers)
+    response = client.get('/stats/summary', headers=auth_headers)
+    etag = response.headers['ETag']
+    last_modified = response.headers['Last-Modified']
+    
+    assert response.headers['Cache-Control'] in ('private, no-cache', 'no-cache, private')
+    
+    # Unchanged data: only the validator query runs
+    query_counter.clear()
+    response = client.get('/stats/summary', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+    assert len(query_counter) == 1
+    
+    response = client.get('/stats/summary', headers=dict(auth_headers, **{'If-Modified-Since': last_modified}))
+    assert response.status_code == 304
+    
+    # Any write to the user's workouts invalidates every validator in scope
+    workout = Workout.query.first()
+    workout_exercise = workout.exercises[0]
+    client.put(f'/api/workouts/{workout.id}/exercises/{workout_exercise.id}', json={'reps': 12}, headers=auth_headers)
+    
+    response = client.get('/stats/summary', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    
+    response = client.get(f'/api/workouts/{workout.id}', headers=auth_headers)
+    etag = response.headers['ETag']
+    response = client.get(f'/api/workouts/{workout.id}', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+    
+    # Catalog edits change exercise names embedded in the response
+    client.put(f'/api/exercises/{workout_exercise.exercise_id}', json={'name': 'Press-ups'}, headers=auth_headers)
+    response = client.get(f'/api/workouts/{workout.id}', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert response.json['exercises'][0]['exercise']['name'] == 'Press-ups'
+
+def test_conditional_get_is_process_independent(app, client, auth_headers, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    assert db.session.get(UserStats, user.id) is None
+    
+    # No rollup row yet: an ETag but no Last-Modified, and still a 304
+    response = client.get('/api/workouts', headers=auth_headers)
+    etag = response.headers['ETag']
+    assert 'Last-Modified' not in response.headers
+    response = client.get('/api/workouts', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+    
+    # Another worker, or this one after the catalog cache's TTL rollover,
+    # hands out the same tag for the same data
+    app.extensions['catalog_cache'] = VersionedCache(prefix='catalog')
+    response = client.get('/api/workouts', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+
+def test_personal_records(client, auth_headers, init_database):
+    workout = Workout.query.first()
+    squats = Exercise.query.filter_by(name='Squats').first()
+    running = Exercise.query.filter_by(name='Running').first()
+    
+    response = client.get('/stats/records', headers=auth_headers)
+    assert response.status_code == 200
+    assert [record['exercise'] for record in response.json] == ['Push-ups', 'Running']
+    assert response.json[0]['max_reps'] == 10
+    assert response.json[1]['best_duration'] == 600
+    
+    client.post(f'/api/workouts/{workout.id}/exercises', json={'exercise_id': squats.id, 'sets': 3, 'reps': 5, 'weight': 100.0}, headers=auth_headers)
+    heavier = client.post(f'/api/workouts/{workout.id}/exercises', json={'exercise_id': squats.id, 'reps': 1, 'weight': 110.0}, headers=auth_headers).json
+    
+    response = client.get(f'/stats/records/{squats.id}', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['max_weight'] == 110.0
+    assert response.json['max_reps'] == 5
+    assert response.json['estimated_one_rep_max'] == 116.7  # 100 kg x 5 beats 110 kg x 1
+    
+    # Deleting the heaviest set falls back to the next best one
+    client.delete(f"/api/workouts/{workout.id}/exercises/{heavier['id']}", headers=auth_headers)
+    response = client.get(f'/stats/records/{squats.id}', headers=auth_headers)
+    assert response.json['max_weight'] == 100.0
+    
+    client.delete(f'/api/workouts/{workout.id}', headers=auth_headers)
+    assert client.get(f'/stats/records/{squats.id}', headers=auth_headers).status_code == 404
+    assert client.get(f'/stats/records/{running.id}', headers=auth_headers).status_code == 404
+    assert client.get('/stats/records', headers=auth_headers).json == []
+
+def test_personal_records_match_live_queries(client, auth_headers, init_database):
+    # Random edits through every write path, checking the stored records
+    # against a full recompute after each one
+    rng = random.Random(7)
+    user = User.query.filter_by(username='testuser').first()
+    exercise_ids = [exercise.id for exercise in Exercise.query.all()]
+    client.get('/stats/records', headers=auth_headers)
+    _assert_rollup_consistent(user.id)
+    
+    def values():
+        return {
+            'weight': rng.choice([None, 40.0, 60.0, 80.0]),
+            'reps': rng.choice([None, 5, 8, 12]),
+            'distance': rng.choice([None, None, 5.0, 10.0]),
+            'duration': rng.choice([None, None, 600, 1200])
+        }
+    
+    workout_ids = [workout.id for workout in Workout.query.filter_by(user_id=user.id)]
+    for step in range(60):
+        workout_id = rng.choice(workout_ids)
+        row_ids = [row.id for row in WorkoutExercise.query.filter_by(workout_id=workout_id)]
+        action = rng.choice(['add', 'add', 'update', 'remove', 'batch', 'workout'])
+        
+        if action == 'add' or (action in ('update', 'remove') and not row_ids):
+            client.post(f'/api/workouts/{workout_id}/exercises', json=dict(values(), exercise_id=rng.choice(exercise_ids)), headers=auth_headers)
+        elif action == 'update':
+            client.put(f'/api/workouts/{workout_id}/exercises/{rng.choice(row_ids)}', json=values(), headers=auth_headers)
+        elif action == 'remove':
+            client.delete(f'/api/workouts/{workout_id}/exercises/{rng.choice(row_ids)}', headers=auth_headers)
+        elif action == 'batch':
+            operations = [dict(values(), op='add', exercise_id=rng.choice(exercise_ids)) for _ in range(rng.randint(0, 3))]
+            for row_id in rng.sample(row_ids, min(len(row_ids), rng.randint(0, 3))):
+                operations.append(dict(values(), op='update', id=row_id) if rng.random() < 0.5 else {'op': 'delete', 'id': row_id})
+            if operations:
+                client.patch(f'/api/workouts/{workout_id}/exercises', json=operations, headers=auth_headers)
+        elif len(workout_ids) > 1:
+            client.delete(f'/api/workouts/{workout_id}', headers=auth_headers)
+            workout_ids.remove(workout_id)
+        else:
+            workout_ids.append(client.post('/api/workouts', json={'name': f'Workout {step}'}, headers=auth_headers).json['id'])
+        
+        _assert_rollup_consistent(user.id)
+    
+    assert PersonalRecord.query.filter_by(user_id=user.id).count() > 0
+
+BACKENDS = ['python', pytest.param('numpy', marks=pytest.mark.skipif(analytics.np is None, reason='numpy is not installed'))]
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_training_load(app, client, auth_headers, init_database, backend):
+    app.extensions['analytics'] = analytics.analytics_backend(backend)
+    user = User.query.filter_by(username='testuser').first()
+    squats = Exercise.query.filter_by(name='Squats').first()
+    
+    for day, weight in ((date(2024, 3, 1), 100.0), (date(2024, 3, 8), 50.0)):
+        workout = Workout(user_id=user.id, name='Legs', date=day, duration=45)
+        workout.exercises.append(WorkoutExercise(exercise_id=squats.id, sets=2, reps=5, weight=weight))
+        workout.exercises.append(WorkoutExercise(exercise_id=squats.id, sets=1, reps=5))  # no weight, no tonnage
+        db.session.add(workout)
+    db.session.commit()
+    
+    response = client.get('/stats/load?from=2024-03-01&to=2024-03-10', headers=auth_headers)
+    
+    assert response.status_code == 200
+    series = response.json['series']
+    assert [entry['date'] for entry in series] == [f'2024-03-{day:02d}' for day in range(1, 11)]
+    assert [entry['tonnage'] for entry in series] == [1000.0] + [0.0] * 6 + [500.0, 0.0, 0.0]
+    # The first session leaves the 7-day window on the 8th but stays in the 28-day one
+    assert series[6]['acute'] == round(1000 / 7, 1)
+    assert series[7]['acute'] == round(500 / 7, 1)
+    assert series[7]['chronic'] == round(1500 / 28, 1)
+    assert series[7]['ratio'] == 1.33
+    
+    response = client.get('/stats/load?from=2024-03-10&to=2024-03-01', headers=auth_headers)
+    assert response.status_code == 400
+    
+    # The chronic window can't reach back before 0001-01-01
+    for query in ('from=0001-01-05&to=0001-01-10', 'to=0001-01-10'):
+        response = client.get(f'/stats/load?{query}', headers=auth_headers)
+        assert response.status_code == 400
+        assert response.json['error'] == "'from' must not be before 0001-01-28"
+    assert client.get('/stats/load?from=0001-01-28&to=0001-01-30', headers=auth_headers).status_code == 200
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_exercise_progress(app, client, auth_headers, init_database, backend):
+    app.extensions['analytics'] = analytics.analytics_backend(backend)
+    user = User.query.filter_by(username='testuser').first()
+    squats = Exercise.query.filter_by(name='Squats').first()
+    
+    for week, sets in enumerate([[(100.0, 5), (90.0, 8)], [(105.0, 5)], [(110.0, 5), (60.0, 40)]]):
+        workout = Workout(user_id=user.id, name='Legs', date=date(2024, 3, 4) + timedelta(weeks=week), duration=45)
+        for weight, reps in sets:
+            workout.exercises.append(WorkoutExercise(exercise_id=squats.id, sets=3, reps=reps, weight=weight))
+        db.session.add(workout)
+    db.session.commit()
+    
+    response = client.get(f'/stats/progress/{squats.id}', headers=auth_headers)
+    
+    assert response.status_code == 200
+    points = response.json['points']
+    assert [point['date'] for point in points] == ['2024-03-04', '2024-03-11', '2024-03-18']
+    assert [point['max_weight'] for point in points] == [100.0, 105.0, 110.0]
+    assert points[0]['epley'] == 116.7  # 100 x 5 beats 90 x 8 (114.0)
+    assert points[0]['brzycki'] == 112.5
+    assert points[2]['epley'] == 140.0  # 60 x 40
+    assert points[2]['brzycki'] == 123.8  # 60 x 40 is past Brzycki's range
+    assert response.json['trend']['brzycki']['slope_per_week'] == 5.62
+    
+    assert client.get('/stats/progress/9999', headers=auth_headers).status_code == 404
+
+def test_calendar(client, auth_headers, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    today = datetime.utcnow().date()
+    client.get('/stats/summary', headers=auth_headers)
+    
+    # Five days running over 2024's leap day, with two workouts on one day
+    for day, duration in ((1, 30), (2, 45), (2, 15), (3, None), (4, 20), (5, 60), (7, 30)):
+        workout_date = date(2024, 2, 24) + timedelta(days=day)
+        client.post('/api/workouts', json={'name': 'Run', 'date': workout_date.isoformat(), 'duration': duration}, headers=auth_headers)
+    client.post('/api/workouts', json={'name': 'Run', 'date': '2024-12-31', 'duration': 10}, headers=auth_headers)
+    
+    response = client.get('/stats/calendar?year=2024', headers=auth_headers)
+    assert response.status_code == 200
+    calendar = response.json
+    assert calendar['days'] == 366
+    assert len(calendar['counts']) == len(calendar['durations']) == 366
+    assert calendar['counts'][55:62] == [1, 2, 1, 1, 1, 0, 1]  # February 25th to March 2nd
+    assert calendar['durations'][55:62] == [30, 60, 0, 20, 60, 0, 30]
+    assert calendar['counts'][365] == 1
+    assert sum(calendar['counts']) == 8
+    assert calendar['longest_streak'] == 5
+    
+    response = client.get('/stats/calendar?year=2023', headers=auth_headers)
+    assert response.json['days'] == 365
+    assert response.json['counts'] == [0] * 366
+    
+    # The fixture workout is today's; yesterday's extends the current streak
+    assert client.get('/stats/calendar', headers=auth_headers).json['current_streak'] == 1
+    yesterday = client.post('/api/workouts', json={'name': 'Lift', 'date': (today - timedelta(days=1)).isoformat()},
+                            headers=auth_headers).json
+    assert client.get('/stats/calendar', headers=auth_headers).json['current_streak'] == 2
+    client.put(f"/api/workouts/{yesterday['id']}", json={'date': (today - timedelta(days=2)).isoformat()}, headers=auth_headers)
+    assert client.get('/stats/calendar', headers=auth_headers).json['current_streak'] == 1
+    
+    # Splitting the longest run recomputes the longest streak
+    workout = Workout.query.filter_by(user_id=user.id, date=date(2024, 2, 27)).first()
+    client.delete(f'/api/workouts/{workout.id}', headers=auth_headers)
+    assert client.get('/stats/calendar?year=2024', headers=auth_headers).json['longest_streak'] == 2
+    _assert_rollup_consistent(user.id)
+    
+    for year in ('0', '10000', 'soon'):
+        assert client.get(f'/stats/calendar?year={year}', headers=auth_headers).status_code == 400
+
+def test_streaks_match_live_queries(client, auth_headers, init_database):
+    # Random creates, date moves and deletes inside a short window, so runs
+    # keep getting joined and split
+    rng = random.Random(11)
+    user = User.query.filter_by(username='testuser').first()
+    client.get('/stats/summary', headers=auth_headers)
+    
+    def day():
+        return (date(2024, 1, 1) + timedelta(days=rng.randrange(20))).isoformat()
+    
+    workout_ids = []
+    for step in range(80):
+        action = rng.choice(['create', 'create', 'move', 'delete'])
+        if action == 'create' or not workout_ids:
+            workout_ids.append(client.post('/api/workouts', json={'name': f'Workout {step}', 'date': day()}, headers=auth_headers).json['id'])
+        elif action == 'move':
+            client.put(f'/api/workouts/{rng.choice(workout_ids)}', json={'date': day()}, headers=auth_headers)
+        else:
+            workout_id = rng.choice(workout_ids)
+            client.delete(f'/api/workouts/{workout_id}', headers=auth_headers)
+            workout_ids.remove(workout_id)
+        
+        _assert_rollup_consistent(user.id)
+    
+    assert WorkoutStreak.query.filter_by(user_id=user.id).count() > 1
+
+@pytest.mark.skipif(analytics.np is None, reason='numpy is not installed')
+def test_analytics_backends_agree():
+    rng = random.Random(3)
+    first_day = date(2024, 1, 1).toordinal()
+    workouts = sorted(((first_day + rng.randrange(400), rng.choice([None, 20, 45, 3000000000])) for _ in range(250)), key=lambda row: row[0])
+    exercise_rows = sorted((
+        (rng.choice(workouts)[0], rng.choice([1, 2, 3]), rng.choice([None, 1, 3]), rng.choice([None, 1, 5, 12, 40]),
+         rng.choice([None, 0.0, 20.0, 62.5, 140.0]))
+        for _ in range(2000)
+    ), key=lambda row: row[0])
+    snapshot = UserHistory(1, workouts, exercise_rows)
+    python, numpy = analytics.PythonAnalytics(), analytics.NumpyAnalytics()
+    
+    for expected, actual in zip(python.training_load(snapshot, first_day + 50, 300), numpy.training_load(snapshot, first_day + 50, 300)):
+        assert actual == pytest.approx(expected)
+    
+    expected, actual = python.progress(snapshot, 2), numpy.progress(snapshot, 2)
+    assert actual == pytest.approx(expected)
+    assert numpy.trend(actual[0], actual[3]) == pytest.approx(python.trend(expected[0], expected[3]))
+    assert numpy.progress(snapshot, 2, first_day + 100, first_day + 200) == pytest.approx(python.progress(snapshot, 2, first_day + 100, first_day + 200))
+    
+    for bucket in timeseries.BUCKETS:
+        expected, actual = python.buckets(snapshot, bucket, first_day + 30, first_day + 380), numpy.buckets(snapshot, bucket, first_day + 30, first_day + 380)
+        assert actual == pytest.approx(expected)
+    assert numpy.exercise_counts(snapshot) == python.exercise_counts(snapshot)
+
+def test_history_cache(app, client, auth_headers, init_database):
+    user = User.query.filter_by(username='testuser').first()
+    cache = app.extensions['history_cache']
+    
+    # The dashboard's calls share one snapshot
+    for path in ('/stats/summary', '/stats/monthly', '/stats/exercises', '/stats/load'):
+        assert client.get(path, headers=auth_headers).status_code == 200
+    stats = client.get('/stats/cache', headers=auth_headers).json
+    assert stats['size'] == 1
+    assert stats['misses'] == 1
+    assert stats['hits'] == 3
+    assert stats['hit_rate'] == 0.75
+    assert 0 < stats['bytes'] <= stats['max_bytes']
+    
+    # Writes drop the user's snapshot and the next read sees them
+    workout = Workout.query.filter_by(user_id=user.id).first()
+    squats = Exercise.query.filter_by(name='Squats').first()
+    client.post(f'/api/workouts/{workout.id}/exercises', json={'exercise_id': squats.id}, headers=auth_headers)
+    assert cache.stats()['invalidations'] == 1
+    assert len(cache) == 0
+    response = client.get('/stats/exercises', headers=auth_headers)
+    assert {entry['name']: entry['count'] for entry in response.json}['Squats'] == 1
+    
+    # A write this process didn't see still changes the rollup version
+    rollup._touch(db.session.get(UserStats, user.id))
+    db.session.commit()
+    misses = cache.stats()['misses']
+    client.get('/stats/exercises', headers=auth_headers)
+    assert cache.stats()['misses'] == misses + 1
+
+def test_history_holds_large_durations(client, auth_headers, init_database):
+    # Rows stored before durations were bounded can be past 32 bits
+    user = User.query.filter_by(username='testuser').first()
+    db.session.add(Workout(user_id=user.id, name='Ultra', date=date(2024, 3, 1), duration=3000000000))
+    rollup.rebuild(user.id)
+    db.session.commit()
+    
+    for path in ('/stats/summary', '/stats/monthly', '/stats/exercises', '/stats/load', '/stats/timeseries?from=2024-03-01&to=2024-03-31'):
+        assert client.get(path, headers=auth_headers).status_code == 200
+    response = client.get('/stats/timeseries?from=2024-03-01&to=2024-03-31', headers=auth_headers)
+    assert response.json['series'][0]['duration'] == 3000000000
+
+def test_history_cache_eviction():
+    day = date(2024, 1, 1).toordinal()
+    snapshots = [UserHistory(1, [(day + i, 30) for i in range(100)], [(day + i, 1, 3, 10, 50.0) for i in range(100)]) for _ in range(3)]
+    cache = HistoryCache(max_bytes=2 * snapshots[0].nbytes)
+    
+    for user_id, snapshot in enumerate(snapshots):
+        cache.set(user_id, snapshot)
+    
+    # The least recently used snapshot went to stay inside the budget
+    assert cache.stats()['evictions'] == 1
+    assert cache.get(0) is None
+    assert cache.stats()['bytes'] == 2 * snapshots[0].nbytes
+    
+    cache.invalidate(1)
+    assert cache.stats()['bytes'] == snapshots[0].nbytes
+    assert cache.stats()['invalidations'] == 1